@@ -28,3 +28,36 @@ class AppConfig:
         "OUTPUT_DIR",
         os.path.join(ROOT_DIR, "output")
     )
+
+    # Pooled Word workers: "com" (real Word) or "fake" (in-process stand-in for Linux)
+    WORD_POOL_BACKEND = os.environ.get("WORD_POOL_BACKEND", "com").strip().lower()
+    WORD_POOL_SIZE = int(os.environ.get("WORD_POOL_SIZE", "1"))          # Word instances side by side (no clipboard use)
+    WORD_POOL_MAX_JOBS = int(os.environ.get("WORD_POOL_MAX_JOBS", "50"))  # recycle an instance after K jobs
+    WORD_CALL_TIMEOUT = float(os.environ.get("WORD_CALL_TIMEOUT", "180"))  # kill + respawn a hung instance (0 = off)
+
+    # DOCX -> PDF for the PDF template path: "word" (pooled Word) or "soffice" (headless LibreOffice)
+    PDF_CONVERTER = os.environ.get("PDF_CONVERTER", "word").strip().lower()
+    SOFFICE_PATH = os.environ.get("SOFFICE_PATH", "soffice")
+    SOFFICE_TIMEOUT = int(os.environ.get("SOFFICE_TIMEOUT", "120"))
+    # Persistent soffice listeners driven over UNO (services.soffice_pool); 0 = one process per call
+    SOFFICE_POOL_SIZE = int(os.environ.get("SOFFICE_POOL_SIZE", "0"))
+    SOFFICE_POOL_MAX_JOBS = int(os.environ.get("SOFFICE_POOL_MAX_JOBS", "200"))  # restart a listener after K conversions
+    SOFFICE_START_TIMEOUT = int(os.environ.get("SOFFICE_START_TIMEOUT", "60"))
+    SOFFICE_PROFILE_DIR = os.environ.get(                                   # per-listener profiles live here
+        "SOFFICE_PROFILE_DIR",
+        os.path.join(ROOT_DIR, "cache", "soffice")
+    )
+
+    # /extract: confidence (0..1) the DOCX rule reading (services.extract_rules) needs
+    # before the LLM call is skipped; above 1 = always ask the LLM
+    EXTRACT_MIN_CONFIDENCE = float(os.environ.get("EXTRACT_MIN_CONFIDENCE", "0.9"))
+
+    # /extract LLM answers kept on disk (services.llm_cache), keyed by cleaned page-1 text +
+    # OPENAI_MODEL + prompt version; TTL in seconds (0 = no expiry), LRU past the byte cap
+    LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "1").strip().lower() in ("1", "true", "yes")
+    LLM_CACHE_DIR = os.environ.get(
+        "LLM_CACHE_DIR",
+        os.path.join(ROOT_DIR, "cache", "llm")
+    )
+    LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", str(30 * 24 * 3600)))
+    LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(64 * 1024 ** 2)))
@@ -0,0 +1,642 @@
+"""
+services/docx_splice.py
+-----------------------
+Page splice at the OOXML level (no Word; in memory; any OS): the block-level elements of
+one page of word/document.xml are swapped for the blocks of another document, and what
+those blocks refer to comes along.
+
+Pages are found once per body, from the block elements that carry the break:
+  ends a page     a block holding w:br w:type="page", or a paragraph with a non-continuous
+                  section break (w:pPr/w:sectPr)
+  starts a page   a paragraph with w:pageBreakBefore
+The break-carrying blocks themselves are kept, so the page count and the section layout of
+the target do not change (same rule the OOXML fill engine always used for page 3).
+
+Imported with the blocks (services.docx_splice.import_blocks):
+- styles      referenced styles (pStyle/rStyle/tblStyle/numStyleLink + their basedOn/link/next
+              chains) missing in the target are copied; one that exists with a different
+              definition is copied under a new id. Default styles stay the target's.
+- numbering   w:num + w:abstractNum of every numId used, renumbered unless the target has
+              the same list under the same id
+- rels        every r:* reference (images, hyperlinks, charts, ...): external targets are
+              re-pointed, internal parts copied (with their own rels) under free names,
+              content types added
+- ids         wp:docPr ids and bookmark ids that collide with the target are renumbered
+Not imported: footnotes/endnotes/comments referenced from the page.
+
+Functions:
+- DocxParts(data): {part name: bytes} of a DOCX with parsed XML parts on demand; .to_bytes()
+- page_spans(body) -> [(start, end)] per page, end excluding the page's break block
+- replace_page_blocks(root, blocks, page=3): swap the blocks of one page (in place)
+- import_blocks(target, source, blocks): merge styles/numbering/rels for `blocks`
+- splice_page(target_docx, page_docx, page=3, strict=False) -> DOCX bytes (whole body of page_docx)
+- replace_page(target_docx, blocks, page=3) -> DOCX bytes (blocks built by the caller)
+- extract_page(docx, page=3) -> DOCX bytes of that one page (a single-page template)
+- text_paragraphs(lines) -> [w:p]
+"""
+
+import io
+import itertools
+import posixpath
+import re
+import zipfile
+from copy import deepcopy
+
+try:
+    from lxml import etree
+except Exception:
+    etree = None
+
+DOCUMENT_PART = "word/document.xml"
+CONTENT_TYPES = "[Content_Types].xml"
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PR_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+MC_NS = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+WP_NS = "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+NS = {"w": W_NS, "r": R_NS, "pr": PR_NS, "ct": CT_NS, "wp": WP_NS}
+
+REL_STYLES = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"
+REL_NUMBERING = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/numbering"
+CT_STYLES = "application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"
+CT_NUMBERING = "application/vnd.openxmlformats-officedocument.wordprocessingml.numbering+xml"
+
+_STYLE_REFS = ("w:pPr/w:pStyle", "w:rPr/w:rStyle", "w:tblPr/w:tblStyle")
+_STYLE_LINKS = ("w:basedOn", "w:link", "w:next", "w:pPr/w:numPr/w:numStyleLink",
+                "w:pPr/w:numPr/w:styleLink")
+_CONTINUOUS = "continuous"
+_INLINE_CONTENT = {f"{{{W_NS}}}{t}" for t in ("r", "hyperlink", "sdt", "smartTag", "fldSimple", "ins", "del")}
+
+
+def _w(tag: str) -> str:
+    return f"{{{W_NS}}}{tag}"
+
+
+def _require_lxml():
+    if etree is None:
+        raise RuntimeError("lxml not installed. pip install lxml")
+
+
+def _serialize(root) -> bytes:
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+def _rels_name(part: str) -> str:
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, "_rels", f"{name}.rels")
+
+
+def _resolve(part: str, target: str) -> str:
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(part), target))
+
+
+def _canon(el) -> bytes:
+    """Comparable form of a definition: no revision ids, only the namespaces it uses."""
+    el = deepcopy(el)
+    for rsid in el.findall("w:rsid", NS):
+        el.remove(rsid)
+    return etree.tostring(el, method="c14n", exclusive=True)
+
+
+class DocxParts:
+    """
+    A DOCX held in memory: raw parts in zip order, XML parts parsed on first use.
+    Parts changed through set_xml()/set_part() are re-serialized by to_bytes(); the rest
+    are written back as read.
+    """
+
+    def __init__(self, data):
+        _require_lxml()
+        if isinstance(data, (bytes, bytearray)):
+            data = io.BytesIO(data)
+        with zipfile.ZipFile(data) as z:
+            self.infos = {info.filename: info for info in z.infolist()}
+            self.raw = {name: z.read(name) for name in self.infos}
+        self._xml = {}
+        self.changed = set()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.raw
+
+    def xml(self, name: str):
+        root = self._xml.get(name)
+        if root is None:
+            root = self._xml[name] = etree.fromstring(self.raw[name])
+        return root
+
+    def set_xml(self, name: str, root):
+        self._xml[name] = root
+        self.changed.add(name)
+
+    def set_part(self, name: str, data: bytes):
+        self._xml.pop(name, None)
+        self.raw[name] = data
+        self.changed.discard(name)
+        if name not in self.infos:
+            self.infos[name] = zipfile.ZipInfo(name, date_time=self.infos[CONTENT_TYPES].date_time)
+            self.infos[name].compress_type = zipfile.ZIP_DEFLATED
+
+    def part(self, name: str) -> bytes:
+        return _serialize(self._xml[name]) if name in self.changed else self.raw[name]
+
+    def rels(self, part: str):
+        """Relationships root of `part` (created empty if the part has none yet)."""
+        name = _rels_name(part)
+        if name not in self.raw:
+            self.set_part(name, _serialize(etree.Element(f"{{{PR_NS}}}Relationships", nsmap={None: PR_NS})))
+        return self.xml(name)
+
+    def touch_rels(self, part: str):
+        self.changed.add(_rels_name(part))
+
+    def to_bytes(self) -> bytes:
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+            for name, info in self.infos.items():
+                z.writestr(info, self.part(name))
+        return buf.getvalue()
+
+
+# ---------------------------
+# Pages
+# ---------------------------
+def _ends_page(el) -> bool:
+    if el.xpath('.//w:br[@w:type="page"]', namespaces=NS):
+        return True
+    sect = el.find("w:pPr/w:sectPr", NS)
+    if sect is None:
+        return False
+    kind = sect.find("w:type", NS)
+    return kind is None or kind.get(_w("val")) != _CONTINUOUS
+
+
+def _starts_page(el) -> bool:
+    flag = el.find("w:pPr/w:pageBreakBefore", NS)
+    return flag is not None and flag.get(_w("val"), "1") not in ("0", "false", "off")
+
+
+def page_spans(body) -> list[tuple[int, int]]:
+    """
+    (start, end) child indices of every page's content, one pass over the body. `end`
+    stops before the block that ends the page (that block stays where it is); a page
+    opened by w:pageBreakBefore starts at that paragraph. The final w:sectPr is never
+    part of a page.
+    """
+    children = list(body)
+    last = len(children)
+    if last and children[-1].tag == _w("sectPr"):
+        last -= 1
+    spans, start = [], 0
+    for i in range(last):
+        el = children[i]
+        if i > start and _starts_page(el):
+            spans.append((start, i))
+            start = i
+        if _ends_page(el):
+            spans.append((start, i))
+            start = i + 1
+    spans.append((start, last))
+    return spans
+
+
+def _trim_at_break(p, before: bool):
+    """
+    Drop the runs of paragraph `p` on one side of its page break (before: the end of the
+    previous page; after: the start of the next one). The break itself and the paragraph's
+    properties/bookmarks stay. Only breaks in direct w:r children are handled.
+    """
+    run = next((r for r in p.findall("w:r", NS) if r.find('w:br[@w:type="page"]', NS) is not None), None)
+    if run is None:
+        return
+    br = run.find('w:br[@w:type="page"]', NS)
+    items = [k for k in run if k.tag != _w("rPr")]
+    for k in items[:items.index(br)] if before else items[items.index(br) + 1:]:
+        run.remove(k)
+    siblings = list(p)
+    for k in siblings[:siblings.index(run)] if before else siblings[siblings.index(run) + 1:]:
+        if k.tag in _INLINE_CONTENT:
+            p.remove(k)
+
+
+def replace_page_blocks(root, blocks, page: int = 3):
+    """
+    Replace the content of page `page` (1-based) of document root `root` with `blocks`
+    (moved, not copied). Text sharing a paragraph with the page's breaks goes too.
+    A body with fewer pages gets the blocks at its end.
+    """
+    body = root.find("w:body", NS)
+    spans = page_spans(body)
+    start, end = spans[page - 1] if page <= len(spans) else (spans[-1][1], spans[-1][1])
+    children = list(body)
+    if page <= len(spans):
+        if start > 0 and children[start - 1].tag == _w("p"):
+            _trim_at_break(children[start - 1], before=False)
+        if end < len(children) and children[end].tag == _w("p"):
+            _trim_at_break(children[end], before=True)
+    blocks = list(blocks)
+    if start < end and _starts_page(children[start]) and blocks and not _starts_page(blocks[0]):
+        # the replaced page was opened by its first paragraph; keep the page break
+        p = etree.Element(_w("p"))
+        etree.SubElement(etree.SubElement(p, _w("pPr")), _w("pageBreakBefore"))
+        blocks.insert(0, p)
+    for el in children[start:end]:
+        body.remove(el)
+    for offset, el in enumerate(blocks):
+        body.insert(start + offset, el)
+
+
+# ---------------------------
+# Import of referenced parts
+# ---------------------------
+def _part_of_rel(parts: DocxParts, rel_type: str, part: str = DOCUMENT_PART) -> str | None:
+    if _rels_name(part) not in parts:
+        return None
+    for rel in parts.rels(part).findall("pr:Relationship", NS):
+        if rel.get("Type") == rel_type and rel.get("TargetMode") != "External":
+            name = _resolve(part, rel.get("Target"))
+            return name if name in parts else None
+    return None
+
+
+def _free_rid(rels) -> str:
+    used = {rel.get("Id") for rel in rels}
+    return next(f"rId{n}" for n in itertools.count(len(used) + 1) if f"rId{n}" not in used)
+
+
+def _free_name(parts: DocxParts, name: str) -> str:
+    if name not in parts:
+        return name
+    stem, ext = posixpath.splitext(name)
+    stem = re.sub(r"_\d+$", "", stem)
+    return next(f"{stem}_{n}{ext}" for n in itertools.count(2) if f"{stem}_{n}{ext}" not in parts)
+
+
+def _content_type(parts: DocxParts, name: str) -> tuple[str, str] | None:
+    """("Override", type) or ("Default", type) of a part, from [Content_Types].xml."""
+    types = parts.xml(CONTENT_TYPES)
+    for o in types.findall("ct:Override", NS):
+        if o.get("PartName") == f"/{name}":
+            return "Override", o.get("ContentType")
+    ext = posixpath.splitext(name)[1].lstrip(".").lower()
+    for d in types.findall("ct:Default", NS):
+        if d.get("Extension", "").lower() == ext:
+            return "Default", d.get("ContentType")
+    return None
+
+
+def _register_type(target: DocxParts, name: str, kind_type: tuple[str, str] | None):
+    if kind_type is None or (_content_type(target, name) or ("", ""))[1] == kind_type[1]:
+        return
+    kind, ctype = kind_type
+    types = target.xml(CONTENT_TYPES)
+    ext = posixpath.splitext(name)[1].lstrip(".").lower()
+    if kind == "Default" and not any(d.get("Extension", "").lower() == ext for d in types.findall("ct:Default", NS)):
+        etree.SubElement(types, f"{{{CT_NS}}}Default", Extension=ext, ContentType=ctype)
+    else:
+        etree.SubElement(types, f"{{{CT_NS}}}Override", PartName=f"/{name}", ContentType=ctype)
+    target.set_xml(CONTENT_TYPES, types)
+
+
+class _Importer:
+    """One import_blocks() call: keeps the id maps shared by styles, numbering and rels."""
+
+    def __init__(self, target: DocxParts, source: DocxParts):
+        self.target = target
+        self.source = source
+        self.copied_parts = {}          # source part name -> target part name
+
+    # ---- relationships
+    def _copy_part(self, name: str) -> str:
+        done = self.copied_parts.get(name)
+        if done is not None:
+            return done
+        data = self.source.raw[name]
+        if name in self.target and self.target.raw[name] == data:
+            self.copied_parts[name] = name
+            return name
+        new = _free_name(self.target, name)
+        self.copied_parts[name] = new
+        self.target.set_part(new, data)
+        _register_type(self.target, new, _content_type(self.source, name))
+        if _rels_name(name) in self.source:
+            # the part's own references, re-pointed at wherever their targets land
+            rels = deepcopy(self.source.rels(name))
+            for rel in rels.findall("pr:Relationship", NS):
+                if rel.get("TargetMode") == "External":
+                    continue
+                child = _resolve(name, rel.get("Target"))
+                if child in self.source:
+                    moved = self._copy_part(child)
+                    rel.set("Target", posixpath.relpath(moved, posixpath.dirname(new)))
+            self.target.set_part(_rels_name(new), _serialize(rels))
+        return new
+
+    def rels(self, blocks):
+        src_rels = {rel.get("Id"): rel for rel in self.source.rels(DOCUMENT_PART).findall("pr:Relationship", NS)} \
+            if _rels_name(DOCUMENT_PART) in self.source else {}
+        tgt_rels = self.target.rels(DOCUMENT_PART)
+        remap = {}
+        for block in blocks:
+            for el in block.iter():
+                for attr, rid in el.attrib.items():
+                    if not attr.startswith(f"{{{R_NS}}}") or rid not in src_rels:
+                        continue
+                    if rid not in remap:
+                        remap[rid] = self._relate(src_rels[rid], tgt_rels)
+                    el.set(attr, remap[rid])
+        if remap:
+            self.target.touch_rels(DOCUMENT_PART)
+
+    def _relate(self, rel, tgt_rels) -> str:
+        rel_type, external = rel.get("Type"), rel.get("TargetMode") == "External"
+        target = rel.get("Target") if external else None
+        if not external:
+            name = _resolve(DOCUMENT_PART, rel.get("Target"))
+            if name not in self.source:
+                return rel.get("Id")
+            target = posixpath.relpath(self._copy_part(name), "word")
+        for existing in tgt_rels.findall("pr:Relationship", NS):
+            if (existing.get("Type"), existing.get("Target"), existing.get("TargetMode") == "External") \
+                    == (rel_type, target, external):
+                return existing.get("Id")
+        rid = _free_rid(tgt_rels)
+        attrs = {"Id": rid, "Type": rel_type, "Target": target}
+        if external:
+            attrs["TargetMode"] = "External"
+        etree.SubElement(tgt_rels, f"{{{PR_NS}}}Relationship", **attrs)
+        return rid
+
+    # ---- styles and numbering
+    def _definitions_part(self, rel_type: str, ctype: str, root_tag: str, default_name: str) -> str | None:
+        name = _part_of_rel(self.target, rel_type)
+        if name is None:
+            name = _free_name(self.target, default_name)
+            self.target.set_part(name, _serialize(etree.Element(_w(root_tag), nsmap={"w": W_NS})))
+            _register_type(self.target, name, ("Override", ctype))
+            rels = self.target.rels(DOCUMENT_PART)
+            etree.SubElement(rels, f"{{{PR_NS}}}Relationship", Id=_free_rid(rels), Type=rel_type,
+                             Target=posixpath.relpath(name, "word"))
+            self.target.touch_rels(DOCUMENT_PART)
+        return name
+
+    def styles(self, blocks) -> list:
+        """Import referenced styles; returns the imported w:style elements (for numbering)."""
+        src_name = _part_of_rel(self.source, REL_STYLES)
+        if src_name is None:
+            return []
+        src = {s.get(_w("styleId")): s for s in self.source.xml(src_name).findall("w:style", NS)}
+        tgt_name = _part_of_rel(self.target, REL_STYLES)
+        tgt_root = self.target.xml(tgt_name) if tgt_name else None
+        tgt = {s.get(_w("styleId")): s for s in tgt_root.findall("w:style", NS)} if tgt_root is not None else {}
+
+        refs = []
+        for block in blocks:
+            for path in _STYLE_REFS:
+                refs.extend(block.xpath(f"descendant-or-self::*/{path}", namespaces=NS))
+        wanted, queue = {}, [r.get(_w("val")) for r in refs]
+        while queue:                                    # referenced ids + their chains
+            sid = queue.pop()
+            if sid in wanted or sid not in src:
+                continue
+            style = src[sid]
+            if style.get(_w("default")) in ("1", "true", "on") and sid in tgt:
+                wanted[sid] = sid                       # defaults stay the target's
+                continue
+            if sid in tgt and _canon(style) == _canon(tgt[sid]):
+                wanted[sid] = sid
+                continue
+            wanted[sid] = None                          # to import
+            for path in _STYLE_LINKS:
+                linked = style.find(path, NS)
+                if linked is not None:
+                    queue.append(linked.get(_w("val")))
+        todo = [sid for sid, keep in wanted.items() if keep is None]
+        if not todo:
+            return []
+
+        tgt_name = tgt_name or self._definitions_part(REL_STYLES, CT_STYLES, "styles", "word/styles.xml")
+        tgt_root = self.target.xml(tgt_name)
+        names = {n.get(_w("val")) for n in tgt_root.xpath("w:style/w:name", namespaces=NS)}
+        for sid in todo:
+            new = sid
+            if sid in tgt:
+                new = next(f"{sid}{n}" for n in itertools.count(2) if f"{sid}{n}" not in tgt and f"{sid}{n}" not in src)
+            wanted[sid] = new
+            tgt[new] = None
+        imported = []
+        for sid in todo:
+            style = deepcopy(src[sid])
+            style.set(_w("styleId"), wanted[sid])
+            name = style.find("w:name", NS)
+            if name is not None and name.get(_w("val")) in names:
+                name.set(_w("val"), f"{name.get(_w('val'))} ({wanted[sid]})")
+            for path in _STYLE_LINKS:
+                linked = style.find(path, NS)
+                if linked is not None and wanted.get(linked.get(_w("val"))):
+                    linked.set(_w("val"), wanted[linked.get(_w("val"))])
+            tgt_root.append(style)
+            imported.append(style)
+        self.target.set_xml(tgt_name, tgt_root)
+        for ref in refs:
+            if wanted.get(ref.get(_w("val"))):
+                ref.set(_w("val"), wanted[ref.get(_w("val"))])
+        return imported
+
+    def numbering(self, elements):
+        refs = [n for el in elements for n in el.xpath(".//w:numPr/w:numId", namespaces=NS)]
+        ids = {r.get(_w("val")) for r in refs} - {"0", None}
+        src_name = _part_of_rel(self.source, REL_NUMBERING)
+        if not ids or src_name is None:
+            return
+        src_root = self.source.xml(src_name)
+        src_nums = {n.get(_w("numId")): n for n in src_root.findall("w:num", NS)}
+        src_abs = {a.get(_w("abstractNumId")): a for a in src_root.findall("w:abstractNum", NS)}
+
+        tgt_name = _part_of_rel(self.target, REL_NUMBERING)
+        tgt_root = self.target.xml(tgt_name) if tgt_name else None
+        tgt_nums = {n.get(_w("numId")): n for n in tgt_root.findall("w:num", NS)} if tgt_root is not None else {}
+        tgt_abs = {a.get(_w("abstractNumId")): a for a in tgt_root.findall("w:abstractNum", NS)} \
+            if tgt_root is not None else {}
+
+        def abstract_of(abstracts, num):
+            ref = num.find("w:abstractNumId", NS)
+            return abstracts.get(ref.get(_w("val"))) if ref is not None else None
+
+        remap = {}
+        for num_id in sorted(ids, key=int):
+            num = src_nums.get(num_id)
+            if num is None:
+                continue
+            same = tgt_nums.get(num_id)
+            if same is not None and _canon(num) == _canon(same):
+                a, b = abstract_of(src_abs, num), abstract_of(tgt_abs, same)
+                if a is not None and b is not None and _canon(a) == _canon(b):
+                    continue
+            remap[num_id] = num
+        if not remap:
+            return
+
+        tgt_name = tgt_name or self._definitions_part(REL_NUMBERING, CT_NUMBERING, "numbering", "word/numbering.xml")
+        tgt_root = self.target.xml(tgt_name)
+        next_num = max([int(n) for n in tgt_nums] + [0]) + 1
+        next_abs = max([int(a) for a in tgt_abs] + [-1]) + 1
+        abs_map = {}
+        for num_id, num in remap.items():
+            abstract = abstract_of(src_abs, num)
+            new_num = deepcopy(num)
+            new_num.set(_w("numId"), str(next_num))
+            if abstract is not None:
+                old_abs = abstract.get(_w("abstractNumId"))
+                if old_abs not in abs_map:
+                    new_abs = deepcopy(abstract)
+                    new_abs.set(_w("abstractNumId"), str(next_abs))
+                    abs_map[old_abs] = str(next_abs)
+                    next_abs += 1
+                    last = tgt_root.findall("w:abstractNum", NS)
+                    # every w:abstractNum precedes the first w:num
+                    pos = tgt_root.index(last[-1]) + 1 if last else 0
+                    tgt_root.insert(pos, new_abs)
+                new_num.find("w:abstractNumId", NS).set(_w("val"), abs_map[old_abs])
+            tgt_root.append(new_num)
+            remap[num_id] = str(next_num)
+            next_num += 1
+        self.target.set_xml(tgt_name, tgt_root)
+        for ref in refs:
+            if ref.get(_w("val")) in remap:
+                ref.set(_w("val"), remap[ref.get(_w("val"))])
+
+    # ---- ids that must stay unique in the document
+    def unique_ids(self, root, blocks):
+        for xpath, attr in (("descendant-or-self::wp:docPr", "id"),
+                            ("descendant-or-self::w:bookmarkStart | descendant-or-self::w:bookmarkEnd", _w("id"))):
+            used = {el.get(attr) for el in root.xpath(xpath, namespaces=NS)}
+            fresh = itertools.count(max([int(v) for v in used if v and v.isdigit()] + [0]) + 1)
+            remap = {}
+            for block in blocks:
+                for el in block.xpath(xpath, namespaces=NS):
+                    value = el.get(attr)
+                    if value in used:
+                        if value not in remap:
+                            remap[value] = str(next(fresh))
+                        el.set(attr, remap[value])
+
+
+def _merge_namespaces(target_root, source_root):
+    """
+    Target document root that declares every prefix the source root does (lxml cannot add
+    declarations to an existing element, so a new root is built only when some are missing),
+    with mc:Ignorable extended by the source's ignorable prefixes.
+    """
+    missing = {p: u for p, u in source_root.nsmap.items() if p and p not in target_root.nsmap}
+    root = target_root
+    if missing:
+        root = etree.Element(target_root.tag, attrib=dict(target_root.attrib),
+                             nsmap={**missing, **target_root.nsmap})
+        root.text = target_root.text
+        root.extend(list(target_root))
+    ignorable = f"{{{MC_NS}}}Ignorable"
+    have = (root.get(ignorable) or "").split()
+    add = [p for p in (source_root.get(ignorable) or "").split() if p not in have and p in root.nsmap]
+    if add:
+        root.set(ignorable, " ".join(have + add))
+    return root
+
+
+def import_blocks(target: DocxParts, source: DocxParts, blocks, root=None):
+    """
+    Make `blocks` (elements of source's document.xml, about to go into target's) valid in
+    `target`: styles, numbering and related parts are merged into `target`, references in
+    `blocks` are rewritten in place. `root` is the target document root the blocks go into
+    (its ids are kept unique); returns that root, rebuilt if namespaces had to be added.
+    """
+    blocks = list(blocks)
+    imp = _Importer(target, source)
+    styles = imp.styles(blocks)
+    imp.numbering(blocks + styles)
+    imp.rels(blocks)
+    root = target.xml(DOCUMENT_PART) if root is None else root
+    imp.unique_ids(root, blocks)
+    return _merge_namespaces(root, source.xml(DOCUMENT_PART))
+
+
+def _body_blocks(parts: DocxParts) -> list:
+    body = parts.xml(DOCUMENT_PART).find("w:body", NS)
+    return [el for el in body if el.tag != _w("sectPr")]
+
+
+def splice_page(target_docx, page_docx, page: int = 3, strict: bool = False) -> bytes:
+    """
+    `target_docx` (bytes or path) with page `page` replaced by the whole body of
+    `page_docx` (a one-page document), formatting, lists, images and links included.
+    strict: raise ValueError instead of appending when the target has fewer explicit pages
+    (its pages may then only exist in Word's layout).
+    """
+    target, source = DocxParts(_data(target_docx)), DocxParts(_data(page_docx))
+    if strict:
+        pages = len(page_spans(target.xml(DOCUMENT_PART).find("w:body", NS)))
+        if pages < page:
+            raise ValueError(f"Target has {pages} explicit page(s); no page {page} to replace")
+    blocks = _body_blocks(source)
+    root = import_blocks(target, source, blocks)
+    replace_page_blocks(root, blocks, page)
+    target.set_xml(DOCUMENT_PART, root)
+    return target.to_bytes()
+
+
+def replace_page(target_docx, blocks, page: int = 3) -> bytes:
+    """`target_docx` with page `page` replaced by `blocks` (w:p/w:tbl elements using the target's own styles)."""
+    target = DocxParts(_data(target_docx))
+    root = target.xml(DOCUMENT_PART)
+    replace_page_blocks(root, blocks, page)
+    target.set_xml(DOCUMENT_PART, root)
+    return target.to_bytes()
+
+
+def extract_page(docx, page: int = 3) -> bytes:
+    """
+    A one-page DOCX holding page `page` of `docx` (bytes or path): the page's blocks plus
+    the document's final section properties, every other part as is. Suited as the
+    single-page template of a full template whose page carries the tagged controls.
+    """
+    parts = DocxParts(_data(docx))
+    root = parts.xml(DOCUMENT_PART)
+    body = root.find("w:body", NS)
+    spans = page_spans(body)
+    if len(spans) < page:
+        raise ValueError(f"Document has {len(spans)} explicit page(s); no page {page} to extract")
+    start, end = spans[page - 1]
+    children = list(body)
+    for i, el in enumerate(children):
+        if not start <= i < end and el.tag != _w("sectPr"):
+            body.remove(el)
+    for ppr in body.findall("w:p/w:pPr", NS):
+        for sect in ppr.findall("w:sectPr", NS):
+            ppr.remove(sect)
+    parts.set_xml(DOCUMENT_PART, root)
+    return parts.to_bytes()
+
+
+def text_paragraphs(lines) -> list:
+    """One plain w:p per line (empty lines stay empty paragraphs)."""
+    _require_lxml()
+    out = []
+    for line in lines:
+        p = etree.Element(_w("p"), nsmap={"w": W_NS})
+        if line:
+            t = etree.SubElement(etree.SubElement(p, _w("r")), _w("t"))
+            t.text = line
+            if line != line.strip():
+                t.set("{http://www.w3.org/XML/1998/namespace}space", "preserve")
+        out.append(p)
+    return out
+
+
+def _data(docx) -> bytes:
+    if isinstance(docx, (bytes, bytearray)):
+        return bytes(docx)
+    with open(docx, "rb") as fh:
+        return fh.read()
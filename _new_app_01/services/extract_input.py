@@ -3,72 +3,61 @@
 Extract Data From Input
 -----------------------
 Windows + Word required (pywin32). Logic:
-- keep_first_page_and_text(): copy page 1 to a new doc, return (saved_path, text)
+- keep_first_page_and_text(): copy page 1 to a new doc (range transfer, no clipboard), return (saved_path, text)
 - call_llm(): ask OpenAI to extract regions-in-scope + Medical Yes/No (strict JSON)
 - extract_and_map(): orchestration for the /extract route
 
+Regions + Medical are read from the DOCX structure first (services.extract_rules); the LLM
+is only called when that reading's confidence is below AppConfig.EXTRACT_MIN_CONFIDENCE,
+and its answers are cached on disk per page text + model + PROMPT_VERSION (services.llm_cache).
+
 Assumptions:
 - Input is a .docx with page-1 containing the relevant tables/labels.
 - We prefill the GP row (r=16) and MIRROR the same values to MD row (r=17).
 """
 
 from __future__ import annotations
-import os, json, threading, re
+import os, json, re, time
 import tempfile
-import pythoncom
-import win32com.client as com
 import requests
 from config import AppConfig
+from services import extract_rules, llm_cache
 from services.storage import relpath_from_output
+from services.word_pool import run_in_word
+
+# Bump when the prompt or the parsing of its answer changes (part of the LLM cache key)
+PROMPT_VERSION = "1"
 
 # COM constants
 _wdGoToPage = 1          # wdGoToPage
 _wdGoToAbsolute = 1      # wdGoToAbsolute
 
-_WORD_LOCK = threading.Lock()
-
-def _open_word():
-    pythoncom.CoInitialize()
-    app = com.DispatchEx("Word.Application")
-    app.Visible = False
-    app.DisplayAlerts = 0
-    return app
-
-def _quit_word(app):
+def _keep_first_page_in_word(app, src_docx_path: str, page1_path: str) -> str:
+    doc = app.Documents.Open(os.path.abspath(src_docx_path))
+    newdoc = None
     try:
-        app.Quit()
+        # Page 1 = start of page 1 up to the start of page 2 (Document.GoTo: no selection)
+        start = doc.GoTo(What=_wdGoToPage, Which=_wdGoToAbsolute, Count=1).Start
+        end = doc.GoTo(What=_wdGoToPage, Which=_wdGoToAbsolute, Count=2).Start
+        if end <= start:        # single-page input
+            end = doc.Content.End
+
+        # Range-to-range transfer (no clipboard, safe with several pooled instances)
+        newdoc = app.Documents.Add()
+        newdoc.Content.FormattedText = doc.Range(Start=start, End=end).FormattedText
+
+        newdoc.SaveAs2(page1_path)
+        return newdoc.Content.Text or ""
     finally:
-        pythoncom.CoUninitialize()
+        if newdoc is not None:
+            newdoc.Close(SaveChanges=False)
+        doc.Close(SaveChanges=False)
 
 def keep_first_page_and_text(src_docx_path: str, out_dir: str) -> tuple[str, str]:
     os.makedirs(out_dir, exist_ok=True)
     page1_path = os.path.join(out_dir, "input_first_page.docx")
 
-    with _WORD_LOCK:
-        app = _open_word()
-        try:
-            doc = app.Documents.Open(os.path.abspath(src_docx_path))
-            doc.Activate()
-            sel = app.Selection
-
-            sel.GoTo(What=_wdGoToPage, Which=_wdGoToAbsolute, Count=1)
-            start = sel.Start
-            sel.GoTo(What=_wdGoToPage, Which=_wdGoToAbsolute, Count=2)
-            end = sel.Start
-
-            rng = doc.Range(Start=start, End=end)
-            rng.Copy()
-
-            newdoc = app.Documents.Add()
-            newdoc.Range(0, 0).Paste()
-
-            newdoc.SaveAs2(page1_path)
-            page1_text = newdoc.Content.Text or ""
-
-            newdoc.Close(SaveChanges=False)
-            doc.Close(SaveChanges=False)
-        finally:
-            _quit_word(app)
+    page1_text = run_in_word(_keep_first_page_in_word, src_docx_path, page1_path)
 
     return page1_path, page1_text
 
@@ -84,11 +73,21 @@ def call_llm(page1_text: str) -> dict:
       - regions in scope among: "N. America", "EMEA", "LATAM", "APAC"
       - 'Medical' Yes/No as boolean
     """
+    model = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
+    text = _clean_text(page1_text)
+
+    # Same page text + model + prompt -> same answer (services.llm_cache)
+    key = None
+    if AppConfig.LLM_CACHE_ENABLED:
+        key = llm_cache.cache_key(text, model, PROMPT_VERSION)
+        hit = llm_cache.lookup(key)
+        if hit is not None:
+            return {**hit, "cached": True}
+
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY not set in environment.")
-
-    model = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
+    started = time.perf_counter()
 
     system = (
         "You are a precise information extraction engine. "
@@ -116,7 +115,7 @@ Return STRICT JSON with keys exactly:
 }}
 
 PAGE_TEXT:
-\"\"\"{_clean_text(page1_text)[:50000]}\"\"\""""
+\"\"\"{text[:50000]}\"\"\""""
     payload = {
         "model": model,
         "temperature": 0,
@@ -152,7 +151,10 @@ PAGE_TEXT:
         regions[k] = bool(regions.get(k, False))
     medical = bool(data.get("medical", False))
 
-    return {"regions": regions, "medical": medical}
+    result = {"regions": regions, "medical": medical}
+    if key is not None:
+        llm_cache.store(key, result, time.perf_counter() - started, model, PROMPT_VERSION)
+    return {**result, "cached": False}
 
 def build_gp_ticks(regions: dict[str, bool], medical_yes: bool) -> dict[str, bool]:
     """
@@ -186,8 +188,13 @@ def extract_and_map(file_storage, out_dir: str) -> dict:
     # Keep page 1 & read its text
     page1_path, page1_text = keep_first_page_and_text(src_path, out_dir)
 
-    # LLM extraction
-    info = call_llm(page1_text)
+    # Rule-based extraction from the DOCX; LLM only when the rules are not sure
+    info = extract_rules.extract(src_path)
+    confidence = info["confidence"]
+    source = "rules"
+    if confidence < AppConfig.EXTRACT_MIN_CONFIDENCE:
+        info = call_llm(page1_text)
+        source = "llm_cache" if info.get("cached") else "llm"
     regions = info["regions"]
     medical = info["medical"]
 
@@ -214,6 +221,8 @@ def extract_and_map(file_storage, out_dir: str) -> dict:
         "ticks": ticks,  # r16 + r17
         "lines": lines,
         "first_page_docx_rel": relpath_from_output(page1_path),
+        "source": source,                   # "rules", "llm" or "llm_cache" (cached LLM answer)
+        "rules_confidence": confidence,
     }
 
 def datetime_now_string():
@@ -0,0 +1,354 @@
+"""
+services/extract_rules.py
+-------------------------
+Deterministic /extract: regions in scope and "1.0 Medical" read from the DOCX structure
+(word/document.xml + styles.xml), no Word and no LLM.
+
+Rules:
+- Regions: the section under the "Region(s) in scope" heading (a heading paragraph, a
+  "label: value" paragraph or a table row) up to the next heading paragraph. Every line
+  of it is matched against the four labels and their spellings ("North America",
+  "N America", "Latin America", "Asia Pacific", ...):
+    plain list           "North America, EMEA"          -> listed labels in scope
+    yes/no per label     "EMEA | Yes", "EMEA: No, APAC: Yes", "North America (Yes); EMEA (No)"
+                                                        -> the Yes/No between each label and
+                                                           the next one
+    negation             "not EMEA, only N. America", "N. America, excluding EMEA"
+                                                        -> a label right after "not", "except",
+                                                           "excluding", ... is out of scope
+    check boxes          "☒ N. America ☐ EMEA" (glyphs, content-control or legacy boxes)
+                                                        -> the box next to each label
+  "None" / "N/A" -> nothing in scope; "Global" / "Worldwide" -> everything in scope.
+- Medical: the table row "1.0 | Medical: | Yes" (or a "1.0 Medical: Yes" paragraph); the
+  first Yes/No after the label.
+
+Confidence (0..1) is the lower of the two parts: 1.0 when the section/row was found and
+fully understood, less when it holds unknown words, conflicts or a guessed reading, 0.0
+when it is missing. A line naming several labels together with yes/no words, and any
+negated label, is read as above but scored _UNSURE (below the default
+EXTRACT_MIN_CONFIDENCE), so the LLM still gets the final say on such phrasing. services.extract_input falls back to the LLM below
+AppConfig.EXTRACT_MIN_CONFIDENCE.
+
+Functions:
+- extract(docx_path) -> {"regions": {label: bool}, "medical": bool, "confidence": float,
+                         "detail": {"regions": float, "medical": float}}
+"""
+
+import re
+import zipfile
+
+try:
+    from lxml import etree
+except Exception:
+    etree = None
+
+REGION_LABELS = ("N. America", "EMEA", "LATAM", "APAC")
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W14 = "{http://schemas.microsoft.com/office/word/2010/wordml}"
+
+_REGION_PATTERNS = {
+    "N. America": re.compile(r"\b(?:north|n\.?)\s*america\b", re.I),
+    "EMEA": re.compile(r"\bEMEA\b|\beurope,?\s+(?:the\s+)?middle\s+east,?\s*(?:and|&)\s*africa\b", re.I),
+    "LATAM": re.compile(r"\bLATAM\b|\blatin\s+america\b", re.I),
+    "APAC": re.compile(r"\bAPAC\b|\basia[\s-]*pacific\b", re.I),
+}
+_REGIONS_HEADING = re.compile(r"regions?(?:\s*\(s\))?\s+in\s+scope\s*:?", re.I)
+_MEDICAL_LABEL = re.compile(r"^\s*(?:1\.0\s*)?medical\b\s*:?\s*(.*)$", re.I | re.S)
+_MEDICAL_PARAGRAPH = re.compile(r"\b1\.0\s*medical\s*:?\s*(yes|no)\b", re.I)
+_GLOBAL = re.compile(r"\b(?:global(?:ly)?|world\s*-?\s*wide|all\s+regions)\b", re.I)
+_NONE = re.compile(r"^\W*(?:none|n/?a|not\s+applicable|nil)\W*$", re.I)
+_NEGATION = re.compile(r"\b(?:not|non|except|excluding|excl\.?|without)\b", re.I)
+_FILLER = re.compile(r"\b(?:and|or|only|in|scope|regions?|the|yes|no|y|n)\b|[\W_]+", re.I)
+
+_CHECKED, _UNCHECKED = "☒", "☐"
+_BOX_GLYPHS = {"☒": True, "☑": True, "✓": True, "✔": True, "☐": False}
+_YES = {"yes", "y", "true", "x", "☒", "☑", "✓", "✔"}
+_NO = {"no", "n", "false", "☐", "n/a", "na"}
+_SECTION_MAX_BLOCKS = 12            # a heading without a following heading: stop here
+_UNSURE = 0.5                       # a reading the LLM should confirm
+
+
+def _require_lxml():
+    if etree is None:
+        raise RuntimeError("lxml not installed. pip install lxml")
+
+
+# ---------------------------
+# DOCX -> blocks of text
+# ---------------------------
+def _on(el, ns: str) -> bool:
+    """w:checked / w14:checked style flag: present and not val="0"/"false"."""
+    if el is None:
+        return False
+    return el.get(f"{ns}val", "1").lower() not in ("0", "false", "off")
+
+
+def _text(node) -> str:
+    """Visible text of a paragraph/cell; check boxes become ☒/☐, deletions are skipped."""
+    out = []
+
+    def walk(el):
+        for child in el:
+            tag = child.tag
+            if tag == f"{_W}t":
+                out.append(child.text or "")
+            elif tag in (f"{_W}tab", f"{_W}br", f"{_W}cr"):
+                out.append(" ")
+            elif tag in (f"{_W}del", f"{_W}instrText", f"{_W}delText", f"{_W}sdtPr"):
+                continue
+            elif tag == f"{_W}sdt" and child.find(f"{_W}sdtPr/{_W14}checkbox") is not None:
+                box = child.find(f"{_W}sdtPr/{_W14}checkbox")
+                out.append(_CHECKED if _on(box.find(f"{_W14}checked"), _W14) else _UNCHECKED)
+            elif tag == f"{_W}checkBox":                # legacy form field (w:ffData)
+                state = child.find(f"{_W}checked")
+                if state is None:
+                    state = child.find(f"{_W}default")
+                out.append(" " + (_CHECKED if _on(state, _W) else _UNCHECKED) + " ")
+            else:
+                walk(child)
+
+    walk(node)
+    return re.sub(r"\s+", " ", "".join(out)).strip()
+
+
+def _heading_styles(styles) -> set:
+    """Paragraph style ids that are headings (name "heading N"/"title" or an outline level)."""
+    ids = set()
+    if styles is None:
+        return ids
+    for st in styles.iter(f"{_W}style"):
+        if st.get(f"{_W}type") != "paragraph":
+            continue
+        name = st.find(f"{_W}name")
+        name = (name.get(f"{_W}val") if name is not None else "") or ""
+        if re.match(r"^(heading\s*\d|title)$", name.strip(), re.I) or st.find(f"{_W}pPr/{_W}outlineLvl") is not None:
+            ids.add(st.get(f"{_W}styleId"))
+    return ids
+
+
+def _is_heading(p, heading_ids: set) -> bool:
+    ppr = p.find(f"{_W}pPr")
+    if ppr is None:
+        return False
+    lvl = ppr.find(f"{_W}outlineLvl")
+    if lvl is not None:
+        return lvl.get(f"{_W}val") != "9"               # 9 = body text
+    style = ppr.find(f"{_W}pStyle")
+    return style is not None and style.get(f"{_W}val") in heading_ids
+
+
+def _children(el):
+    """Body/row children with block-level content controls unwrapped."""
+    for child in el:
+        if child.tag == f"{_W}sdt":
+            content = child.find(f"{_W}sdtContent")
+            if content is not None:
+                yield from _children(content)
+        else:
+            yield child
+
+
+def _blocks(body, heading_ids: set) -> list:
+    """[("p", text, is_heading) | ("tbl", [[cell text, ...], ...])] in document order."""
+    blocks = []
+    for el in _children(body):
+        if el.tag == f"{_W}p":
+            blocks.append(("p", _text(el), _is_heading(el, heading_ids)))
+        elif el.tag == f"{_W}tbl":
+            rows = []
+            for tr in _children(el):
+                if tr.tag == f"{_W}tr":
+                    rows.append([_text(tc) for tc in _children(tr) if tc.tag == f"{_W}tc"])
+            blocks.append(("tbl", rows))
+    return blocks
+
+
+def _read_blocks(docx_path: str) -> list:
+    with zipfile.ZipFile(docx_path) as z:
+        document = etree.fromstring(z.read("word/document.xml"))
+        names = set(z.namelist())
+        styles = etree.fromstring(z.read("word/styles.xml")) if "word/styles.xml" in names else None
+    body = document.find(f"{_W}body")
+    return _blocks(body if body is not None else document, _heading_styles(styles))
+
+
+# ---------------------------
+# Rules
+# ---------------------------
+def _yes_no(text: str):
+    """True / False for a clear yes/no (word or box glyph), else None."""
+    words = [w for w in re.split(r"[\s:;,.()]+", text.lower()) if w]
+    for w in words:
+        if w in _YES:
+            return True
+        if w in _NO:
+            return False
+    return None
+
+
+def _labels_in(text: str) -> list:
+    return [label for label in REGION_LABELS if _REGION_PATTERNS[label].search(text)]
+
+
+def _label_spans(text: str) -> list:
+    """(start, end, label) of every label mention in `text`, in reading order."""
+    return sorted((m.start(), m.end(), label)
+                  for label, pattern in _REGION_PATTERNS.items() for m in pattern.finditer(text))
+
+
+def _listed_regions(line: str, regions: dict) -> bool:
+    """
+    Labels of a line without check boxes. Each label takes the Yes/No between it and the
+    next label (a single label: anywhere on the line), is out of scope right after a
+    negation word, and otherwise is in scope (a plain list). Returns True when the
+    reading is unsure: negation, or several labels sharing a line with yes/no words.
+    """
+    spans = _label_spans(line)
+    unsure = len({label for _s, _e, label in spans}) > 1 and _yes_no(_leftover_words(line)) is not None
+    prev_end = 0
+    for k, (start, end, label) in enumerate(spans):
+        after = line[end:spans[k + 1][0] if k + 1 < len(spans) else len(line)]
+        value = _yes_no(after)
+        if value is None and len(spans) == 1:
+            value = _yes_no(line[:start])
+        if _NEGATION.search(line[prev_end:start]):
+            value, unsure = False, True
+        regions[label] = regions[label] or (value if value is not None else True)
+        prev_end = end
+    return unsure
+
+
+def _leftover_words(text: str) -> str:
+    """`text` without the region labels (yes/no words kept)."""
+    for pattern in _REGION_PATTERNS.values():
+        text = pattern.sub(" ", text)
+    return text
+
+
+def _leftover(text: str) -> str:
+    return _FILLER.sub("", _NEGATION.sub(" ", _leftover_words(text)))
+
+
+def _regions_section(blocks: list) -> list | None:
+    """Lines of the "Region(s) in scope" section, or None when there is no such section."""
+    for i, block in enumerate(blocks):
+        if block[0] == "tbl":
+            for row in block[1]:
+                for j, cell in enumerate(row):
+                    m = _REGIONS_HEADING.search(cell)
+                    if m:
+                        return [t for t in [cell[m.end():].strip(), *row[j + 1:]] if t]
+            continue
+        m = _REGIONS_HEADING.search(block[1])
+        if not m:
+            continue
+        lines = [block[1][m.end():].strip()]
+        for nxt in blocks[i + 1:i + 1 + _SECTION_MAX_BLOCKS]:
+            if nxt[0] == "p" and nxt[2]:
+                break
+            if nxt[0] == "p":
+                lines.append(nxt[1])
+            else:
+                lines.extend(" | ".join(c for c in row if c) for row in nxt[1])
+        return [t for t in lines if t]
+    return None
+
+
+def _boxed_regions(line: str, regions: dict) -> int:
+    """
+    Labels paired with their check box in `line` (box before label, or after it when the
+    line starts with a label); returns the number of labels paired.
+    """
+    parts = re.split(r"([☒☑✓✔☐])", line)
+    label_first = bool(_labels_in(parts[0]))
+    paired = 0
+    for k in range(1, len(parts), 2):
+        state = _BOX_GLYPHS[parts[k]]
+        text = parts[k - 1] if label_first else parts[k + 1] if k + 1 < len(parts) else ""
+        for label in _labels_in(text):
+            regions[label] = regions[label] or state
+            paired += 1
+    return paired
+
+
+def _rule_regions(blocks: list) -> tuple[dict, float]:
+    regions = {label: False for label in REGION_LABELS}
+    lines = _regions_section(blocks)
+    if lines is None:
+        return regions, 0.0
+    text = " ".join(lines)
+    if not text:
+        return regions, 0.2
+    if _NONE.match(text):
+        return regions, 0.9
+    if _GLOBAL.search(text) and not _labels_in(text):
+        return {label: True for label in REGION_LABELS}, 0.8
+
+    confidence, mentioned = 1.0, set()
+    for line in lines:
+        labels = _labels_in(line)
+        mentioned.update(labels)
+        if any(g in line for g in _BOX_GLYPHS):
+            if _boxed_regions(line, regions) != len(labels):
+                confidence = min(confidence, 0.6)          # a label without its own box
+            continue
+        if _listed_regions(line, regions):
+            confidence = min(confidence, _UNSURE)
+        if _leftover(line):
+            confidence = min(confidence, 0.6)              # words we don't understand
+    if not mentioned:
+        confidence = min(confidence, 0.3)
+    return regions, confidence
+
+
+def _rule_medical(blocks: list) -> tuple[bool, float]:
+    found = []                      # (row starts with "1.0", value or None)
+    for block in blocks:
+        if block[0] == "p":
+            m = _MEDICAL_PARAGRAPH.search(block[1])
+            if m:
+                found.append((True, m.group(1).lower() == "yes"))
+            continue
+        for row in block[1]:
+            for j, cell in enumerate(row):
+                m = _MEDICAL_LABEL.match(cell)
+                if not m:
+                    continue
+                numbered = (j > 0 and row[0].strip() in ("1", "1.0")) or cell.strip().startswith("1.0")
+                value = None
+                for candidate in [m.group(1), *row[j + 1:]]:
+                    value = _yes_no(candidate)
+                    if value is not None:
+                        break
+                found.append((numbered, value))
+                break
+    if not found:
+        return False, 0.0
+    numbered = [v for n, v in found if n]
+    values = {v for v in (numbered or [v for _, v in found]) if v is not None}
+    if not values:
+        return False, 0.3
+    if len(values) > 1:
+        return True in values, 0.5                     # rows disagree
+    return values.pop(), (1.0 if numbered else 0.8)    # no "1.0" row: a guess at which one
+
+
+def extract(docx_path: str) -> dict:
+    """
+    Regions + Medical from the DOCX at `docx_path` with a confidence; an unreadable file
+    (not a DOCX, broken XML) gives confidence 0.
+    """
+    _require_lxml()
+    try:
+        blocks = _read_blocks(docx_path)
+    except (zipfile.BadZipFile, KeyError, etree.XMLSyntaxError):
+        blocks = []
+    regions, c_regions = _rule_regions(blocks)
+    medical, c_medical = _rule_medical(blocks)
+    return {
+        "regions": regions,
+        "medical": medical,
+        "confidence": round(min(c_regions, c_medical), 2),
+        "detail": {"regions": c_regions, "medical": c_medical},
+    }
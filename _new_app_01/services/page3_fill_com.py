@@ -1,23 +1,9 @@
 # services/page3_fill_com.py
 import os
-import pythoncom
-import win32com.client as win32
+from services.word_pool import run_in_word
 
 WD_FORMAT_DOCX = 16  # wdFormatXMLDocument
 
-def _start_word():
-    pythoncom.CoInitialize()
-    app = win32.gencache.EnsureDispatch("Word.Application")
-    app.Visible = False
-    app.DisplayAlerts = 0
-    return app
-
-def _stop_word(app):
-    try:
-        app.Quit()
-    finally:
-        pythoncom.CoUninitialize()
-
 def fill_page3_template_with_snapshot(tpl_path: str, out_path: str, snapshot: dict):
     """
     Open the 1-page page3.tpl.docx, fill values using simple cell-based rules,
@@ -36,10 +22,11 @@ def fill_page3_template_with_snapshot(tpl_path: str, out_path: str, snapshot: di
     tpl_path = os.path.abspath(tpl_path)
     out_path = os.path.abspath(out_path)
 
-    app = _start_word()
-    try:
-        doc = app.Documents.Open(tpl_path)
+    run_in_word(_fill_page3_in_word, tpl_path, out_path, ticks, project_level, capa)
 
+def _fill_page3_in_word(app, tpl_path: str, out_path: str, ticks: dict, project_level, capa):
+    doc = app.Documents.Open(tpl_path)
+    try:
         if doc.Tables.Count >= 1:
             tbl = doc.Tables.Item(1)
 
@@ -72,6 +59,5 @@ def fill_page3_template_with_snapshot(tpl_path: str, out_path: str, snapshot: di
 
         # Save the 1-page filled page
         doc.SaveAs2(out_path, FileFormat=WD_FORMAT_DOCX)
-        doc.Close(False)
     finally:
-        _stop_word(app)
+        doc.Close(False)
@@ -0,0 +1,308 @@
+"""
+services/soffice_pool.py
+------------------------
+DOCX -> PDF with headless LibreOffice, without Word.
+
+Two modes (AppConfig.SOFFICE_POOL_SIZE):
+  0    one `soffice --convert-to pdf` process per call (cold start every time)
+  N>0  N persistent listeners (`soffice --accept=pipe,...;urp;`), each with its own
+       profile directory; a conversion borrows an idle listener and drives it over its
+       local pipe with UNO (load hidden -> storeToURL writer_pdf_export -> close), so the
+       office start-up is paid once per listener, not once per document
+
+Listener life cycle (like services.word_pool for Word):
+    - warm-up: every listener is started and connected when the pool is built
+    - health checks: process alive + one UNO call before each conversion; dead -> restarted
+    - recycling: restarted after AppConfig.SOFFICE_POOL_MAX_JOBS conversions
+    - timeouts: a conversion past AppConfig.SOFFICE_TIMEOUT kills its soffice process
+      (the UNO call then fails) and raises SofficeTimeout; the listener is restarted on
+      its next use
+
+The pool mode needs the LibreOffice Python-UNO bindings (`import uno`: LibreOffice's own
+python, or python3-uno on Debian/Ubuntu).
+
+Functions:
+- docx_to_pdf(docx_path, pdf_path, timeout=None): convert with the configured mode
+- get_soffice_pool() -> SofficePool (process-wide, built from AppConfig)
+- SofficePool(size, max_jobs, timeout, start_timeout, profile_root): .convert(), .stats(), .shutdown()
+"""
+
+import atexit
+import itertools
+import os
+import pathlib
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+from config import AppConfig
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    from com.sun.star.connection import NoConnectException
+except Exception:
+    uno = None
+
+_PDF_FILTER = "writer_pdf_export"
+_CONNECT_POLL = 0.25                # seconds between connection attempts while a listener starts
+
+
+class SofficeTimeout(TimeoutError):
+    """A conversion ran past its timeout; its soffice process was killed."""
+
+
+def _require_uno():
+    if uno is None:
+        raise RuntimeError(
+            "LibreOffice Python-UNO bindings not found (import uno). Run with LibreOffice's "
+            "python or install python3-uno, or set SOFFICE_POOL_SIZE=0."
+        )
+
+
+def _props(**values) -> tuple:
+    return tuple(PropertyValue(Name=k, Value=v) for k, v in values.items())
+
+
+def _convert_once(docx_path: str, pdf_path: str, timeout: float):
+    """
+    One-shot conversion: a fresh soffice process (and throwaway profile) per call;
+    soffice writes <stem>.pdf into --outdir.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        cmd = [
+            AppConfig.SOFFICE_PATH, "--headless", "--norestore",
+            f"-env:UserInstallation={pathlib.Path(tmp, 'profile').as_uri()}",
+            "--convert-to", "pdf", "--outdir", tmp, os.path.abspath(docx_path),
+        ]
+        try:
+            subprocess.run(cmd, check=True, capture_output=True, timeout=timeout)
+        except FileNotFoundError:
+            raise RuntimeError(f"LibreOffice not found ({AppConfig.SOFFICE_PATH}); set SOFFICE_PATH.")
+        produced = os.path.join(tmp, os.path.splitext(os.path.basename(docx_path))[0] + ".pdf")
+        if not os.path.exists(produced):
+            raise RuntimeError("LibreOffice did not produce a PDF.")
+        shutil.move(produced, pdf_path)
+
+
+class _Listener:
+    """One soffice process with its profile, pipe and UNO desktop."""
+
+    __slots__ = ("name", "profile", "pipe", "proc", "desktop", "jobs", "killed")
+
+    def __init__(self, name: str, profile: str):
+        self.name = name
+        self.profile = profile
+        self.pipe = None
+        self.proc = None
+        self.desktop = None
+        self.jobs = 0
+        self.killed = False
+
+
+class SofficePool:
+    """
+    Fixed set of listeners handed out through a queue: a conversion runs on the calling
+    thread with exclusive use of one listener.
+    """
+
+    def __init__(self, size: int = 1, max_jobs: int = 200, timeout: float = 120,
+                 start_timeout: float = 60, profile_root: str | None = None):
+        _require_uno()
+        self.size = max(1, int(size))
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.start_timeout = start_timeout
+        self.profile_root = os.path.join(profile_root or tempfile.gettempdir(), f"soffice-{os.getpid()}")
+        self._generation = itertools.count(1)
+        self._idle = queue.Queue()
+        self._listeners = [
+            _Listener(f"soffice-{n}", os.path.join(self.profile_root, f"worker-{n}")) for n in range(self.size)
+        ]
+        self._lock = threading.Lock()
+        self._stats = {"conversions": 0, "failures": 0, "timeouts": 0, "restarts": 0, "busy_s": 0.0}
+
+        # warm-up: start every listener in parallel before the first conversion
+        errors = []
+
+        def warm(lst):
+            try:
+                self._start(lst)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=warm, args=(lst,), daemon=True) for lst in self._listeners]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if errors:
+            self.shutdown()
+            raise errors[0]
+        for lst in self._listeners:
+            self._idle.put(lst)
+
+    def _count(self, key: str, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    # ---- listener life cycle
+    def _start(self, lst: _Listener):
+        os.makedirs(lst.profile, exist_ok=True)
+        lst.pipe = f"fillpool_{os.getpid()}_{lst.name}_{next(self._generation)}"
+        cmd = [
+            AppConfig.SOFFICE_PATH, "--headless", "--invisible", "--norestore", "--nologo",
+            "--nodefault", "--nolockcheck",
+            f"-env:UserInstallation={pathlib.Path(lst.profile).as_uri()}",
+            f"--accept=pipe,name={lst.pipe};urp;StarOffice.ComponentContext",
+        ]
+        try:
+            lst.proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                        stderr=subprocess.DEVNULL)
+        except FileNotFoundError:
+            raise RuntimeError(f"LibreOffice not found ({AppConfig.SOFFICE_PATH}); set SOFFICE_PATH.")
+
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+        deadline = time.monotonic() + self.start_timeout
+        while True:
+            if lst.proc.poll() is not None:
+                raise RuntimeError(f"{lst.name}: soffice exited with code {lst.proc.returncode} during start-up")
+            try:
+                ctx = resolver.resolve(f"uno:pipe,name={lst.pipe};urp;StarOffice.ComponentContext")
+                break
+            except NoConnectException:
+                if time.monotonic() > deadline:
+                    self._stop(lst)
+                    raise RuntimeError(f"{lst.name}: soffice did not accept connections within {self.start_timeout}s")
+                time.sleep(_CONNECT_POLL)
+        lst.desktop = ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+        lst.jobs = 0
+        lst.killed = False
+
+    def _stop(self, lst: _Listener):
+        if lst.desktop is not None and not lst.killed:
+            try:
+                lst.desktop.terminate()
+            except Exception:
+                pass
+        lst.desktop = None
+        if lst.proc is not None:
+            try:
+                lst.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                lst.proc.kill()
+                lst.proc.wait()
+            lst.proc = None
+
+    def _kill(self, lst: _Listener):
+        """Timer callback (another thread): force the listener's process down."""
+        lst.killed = True
+        if lst.proc is not None:
+            lst.proc.kill()
+
+    def _healthy(self, lst: _Listener) -> bool:
+        if lst.killed or lst.proc is None or lst.proc.poll() is not None or lst.desktop is None:
+            return False
+        try:
+            lst.desktop.getFrames().getCount()
+            return True
+        except Exception:
+            return False
+
+    def _restart(self, lst: _Listener):
+        self._stop(lst)
+        self._start(lst)
+        self._count("restarts")
+
+    # ---- conversions
+    def convert(self, docx_path: str, pdf_path: str, timeout: float | None = None):
+        timeout = self.timeout if timeout is None else timeout
+        lst = self._idle.get()
+        try:
+            if lst.jobs >= self.max_jobs or not self._healthy(lst):
+                self._restart(lst)
+            timer = threading.Timer(timeout, self._kill, (lst,)) if timeout else None
+            started = time.monotonic()
+            try:
+                if timer:
+                    timer.start()
+                self._store_pdf(lst, docx_path, pdf_path)
+            except Exception as e:
+                self._count("failures")
+                if lst.killed:
+                    self._count("timeouts")
+                    raise SofficeTimeout(f"{lst.name}: conversion of {os.path.basename(docx_path)} "
+                                         f"exceeded {timeout}s; soffice killed") from None
+                lst.killed = True       # unknown state: restart before the next conversion
+                raise RuntimeError(f"{lst.name}: conversion failed: {e}") from e
+            finally:
+                if timer:
+                    timer.cancel()
+                self._count("busy_s", time.monotonic() - started)
+            lst.jobs += 1
+            self._count("conversions")
+        finally:
+            self._idle.put(lst)
+
+    def _store_pdf(self, lst: _Listener, docx_path: str, pdf_path: str):
+        url = uno.systemPathToFileUrl(os.path.abspath(docx_path))
+        doc = lst.desktop.loadComponentFromURL(url, "_blank", 0, _props(Hidden=True, ReadOnly=True))
+        if doc is None:
+            raise RuntimeError(f"LibreOffice could not open {docx_path}")
+        try:
+            doc.storeToURL(uno.systemPathToFileUrl(os.path.abspath(pdf_path)), _props(FilterName=_PDF_FILTER))
+        finally:
+            doc.close(True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+        out["size"] = self.size
+        out["idle"] = self._idle.qsize()
+        out["busy_s"] = round(out["busy_s"], 3)
+        out["avg_ms"] = round(out["busy_s"] / out["conversions"] * 1000, 1) if out["conversions"] else 0.0
+        return out
+
+    def shutdown(self):
+        for lst in self._listeners:
+            self._stop(lst)
+        shutil.rmtree(self.profile_root, ignore_errors=True)
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_soffice_pool() -> SofficePool:
+    """
+    Lazily build the process-wide pool from AppConfig.SOFFICE_POOL_SIZE / _MAX_JOBS,
+    SOFFICE_TIMEOUT, SOFFICE_START_TIMEOUT and SOFFICE_PROFILE_DIR.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = SofficePool(
+                size=AppConfig.SOFFICE_POOL_SIZE,
+                max_jobs=AppConfig.SOFFICE_POOL_MAX_JOBS,
+                timeout=AppConfig.SOFFICE_TIMEOUT,
+                start_timeout=AppConfig.SOFFICE_START_TIMEOUT,
+                profile_root=AppConfig.SOFFICE_PROFILE_DIR,
+            )
+            atexit.register(_POOL.shutdown)
+        return _POOL
+
+
+def docx_to_pdf(docx_path: str, pdf_path: str, timeout: float | None = None):
+    """
+    DOCX -> PDF with LibreOffice: on a pooled listener when AppConfig.SOFFICE_POOL_SIZE > 0,
+    else in a one-shot soffice process. Raises SofficeTimeout (pool) or
+    subprocess.TimeoutExpired (one-shot) past `timeout` (default SOFFICE_TIMEOUT).
+    """
+    if AppConfig.SOFFICE_POOL_SIZE > 0:
+        get_soffice_pool().convert(docx_path, pdf_path, timeout)
+    else:
+        _convert_once(docx_path, pdf_path, AppConfig.SOFFICE_TIMEOUT if timeout is None else timeout)
@@ -1,65 +1,66 @@
 # services/word_com_replace.py
 import os
-import pythoncom
-import win32com.client as win32
+from config import AppConfig
+from services import soffice_pool
+from services.docx_splice import splice_page
+from services.word_pool import run_in_word
 
 WD_GO_TO_PAGE = 1
 WD_GO_TO_ABSOLUTE = 1
 WD_FORMAT_DOCX = 16   # wdFormatXMLDocument
 WD_FORMAT_PDF  = 17   # wdFormatPDF
 
-def _start_word():
-    pythoncom.CoInitialize()
-    app = win32.gencache.EnsureDispatch("Word.Application")
-    app.Visible = False
-    app.DisplayAlerts = 0
-    return app
+def _page_range(doc, page: int):
+    # Document.GoTo: no selection, no window; past the last page it stays on the last page
+    start = doc.GoTo(What=WD_GO_TO_PAGE, Which=WD_GO_TO_ABSOLUTE, Count=page).Start
+    end = doc.GoTo(What=WD_GO_TO_PAGE, Which=WD_GO_TO_ABSOLUTE, Count=page + 1).Start
+    if end <= start:
+        end = doc.Content.End
+    return doc.Range(Start=start, End=end)
 
-def _stop_word(app):
+def _replace_docx_page3_in_word(app, target_docx: str, page3_docx: str, out_docx: str):
+    tgt = app.Documents.Open(os.path.abspath(target_docx))
     try:
-        app.Quit()
+        # Clear page 3 and insert the 1-page file in its place (no clipboard)
+        rng = _page_range(tgt, 3)
+        rng.Delete()
+        rng.InsertFile(os.path.abspath(page3_docx))
+
+        # Save as DOCX
+        tgt.SaveAs2(os.path.abspath(out_docx), FileFormat=WD_FORMAT_DOCX)
     finally:
-        pythoncom.CoUninitialize()
+        tgt.Close(False)
 
 def replace_docx_page3_with_file(target_docx: str, page3_docx: str, out_docx: str):
     """
-    Open target_docx, copy entire content of page3_docx (1 page),
-    select page 3 in target, paste, save to out_docx.
+    Replace page 3 of target_docx with the entire content of page3_docx (1 page), save to out_docx.
+    XML-level splice in memory (services.docx_splice) when target_docx has explicit page
+    breaks; otherwise its pages only exist in Word's layout, so Word does it
+    (Range.InsertFile on a pooled worker, services.word_pool).
     """
-    app = _start_word()
     try:
-        tgt = app.Documents.Open(os.path.abspath(target_docx))
-        src = app.Documents.Open(os.path.abspath(page3_docx))
-
-        # copy all content from the 1-page page
-        src.Content.WholeStory()
-        src.Content.Copy()
+        data = splice_page(target_docx, page3_docx, page=3, strict=True)
+    except ValueError:
+        run_in_word(_replace_docx_page3_in_word, target_docx, page3_docx, out_docx)
+        return
+    with open(out_docx, "wb") as fh:
+        fh.write(data)
 
-        sel = app.Selection
-        # Go to page 3
-        sel.GoTo(What=WD_GO_TO_PAGE, Which=WD_GO_TO_ABSOLUTE, Count=3)
-        # Select only that page's range
-        sel.Bookmarks("\\Page").Range.Select()
-        # Paste
-        sel.Range.Paste()
-
-        # Save as DOCX
-        tgt.SaveAs2(os.path.abspath(out_docx), FileFormat=WD_FORMAT_DOCX)
-
-        src.Close(False)
-        tgt.Close(False)
+def _docx_to_pdf_in_word(app, in_docx: str, out_pdf: str):
+    doc = app.Documents.Open(os.path.abspath(in_docx))
+    try:
+        # ExportAsFixedFormat(OutputFileName, ExportFormat=17 (wdExportFormatPDF))
+        doc.ExportAsFixedFormat(os.path.abspath(out_pdf), WD_FORMAT_PDF)
     finally:
-        _stop_word(app)
+        doc.Close(False)
 
 def docx_to_pdf(in_docx: str, out_pdf: str):
     """
-    Export a DOCX to PDF using Word's fixed-format export.
+    Export a DOCX to PDF: Word's fixed-format export on a pooled Word worker
+    (services.word_pool), or headless LibreOffice with AppConfig.PDF_CONVERTER = "soffice"
+    (services.soffice_pool).
     """
-    app = _start_word()
-    try:
-        doc = app.Documents.Open(os.path.abspath(in_docx))
-        # ExportAsFixedFormat(OutputFileName, ExportFormat=17 (wdExportFormatPDF))
-        doc.ExportAsFixedFormat(os.path.abspath(out_pdf), WD_FORMAT_PDF)
-        doc.Close(False)
-    finally:
-        _stop_word(app)
+    if AppConfig.PDF_CONVERTER == "soffice":
+        soffice_pool.docx_to_pdf(in_docx, out_pdf)
+    else:
+        run_in_word(_docx_to_pdf_in_word, in_docx, out_pdf)
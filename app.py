@@ -1,4 +1,7 @@
-from flask import Flask, render_template, send_from_directory, request, jsonify, send_file, abort
+from flask import (
+    Flask, render_template, send_from_directory, request, jsonify, send_file, abort,
+    Response, stream_with_context
+)
 import os
 import io
 import json
@@ -7,10 +10,14 @@ from datetime import datetime
 # NEW imports (add after existing imports at the top)
 from config import AppConfig
 from services.storage import (
-    ensure_dirs, make_batch_folder, relpath_from_output, zip_outputs, safe_filename
+    ensure_dirs, make_batch_folder, relpath_from_output, safe_filename
 )
-from services.csv_batch import process_csv as csv_process
-from services.word_fill import fill_and_export
+from services import batch_jobs
+from services.fill_backend import fill_and_export
+from services.fill_scheduler import get_scheduler
+from services.form_fields import FieldTagError, normalize_fields
+from services import llm_cache, output_cache
+from services import docx_splice
 from services.extract_input import extract_and_map
 
 
@@ -107,87 +114,14 @@ def create_app():
     # ---- DOCX page 3 replacement
     def replace_docx_page3(template_bytes: bytes, page3_lines: list[str]) -> bytes:
         """
-        Rebuild a DOCX that keeps pages 1,2 and 4..n from template,
-        but replaces the whole Page 3 with provided content.
-        Assumes explicit page breaks exist between pages (best-practice for templates).
-        Falls back gracefully if fewer than 2 breaks exist.
+        Keep pages 1, 2 and 4..n of the template as they are (styles, tables, content
+        controls, headers) and replace the body of Page 3 with the provided lines.
+        XML-level splice in memory (services.docx_splice); pages are delimited by the
+        template's explicit page/section breaks. Fewer than 3 pages: lines go at the end.
         """
-        if not DOCX_AVAILABLE:
-            raise RuntimeError("python-docx not installed. pip install python-docx")
-
-        src = Document(io.BytesIO(template_bytes))
-        # Find up to 3 page-break boundaries by scanning runs for page breaks
-        # We'll just count breaks as we write into a NEW document:
-        newd = Document()
-        NS = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
-
-        def para_has_page_break(para) -> bool:
-            for run in para.runs:
-                try:
-                    el = run._element
-                    brs = el.xpath('.//w:br[@w:type="page"]', namespaces=NS)
-                    if brs:
-                        return True
-                except Exception:
-                    pass
-            return False
-
-        # Copy original paras into a simple list for sequential access
-        paras = src.paragraphs[:]
-
-        # Helper to append a paragraph's text to new docx (simple text copy, formatting-light)
-        def append_paragraph_text(p):
-            # Preserve very simple structure: empty line vs non-empty
-            txt = p.text or ""
-            newd.add_paragraph(txt if txt.strip() else "")
-
-        # 1) Copy until the end of Page 2 (i.e., until we've seen 2 page breaks)
-        breaks_seen = 0
-        i = 0
-        while i < len(paras):
-            p = paras[i]
-            append_paragraph_text(p)
-            if para_has_page_break(p):
-                breaks_seen += 1
-                if breaks_seen == 2:
-                    # We've just finished Page 2
-                    break
-            i += 1
-
-        # 2) Insert our new Page 3
-        newd.add_paragraph("Page 3 — Generated by App")
-        if page3_lines:
-            for ln in page3_lines:
-                newd.add_paragraph(ln)
-        # Page break to move to Page 4
-        newd.paragraphs[-1].runs[-1].add_break(WD_BREAK.PAGE)
-
-        # 3) Skip original Page 3 in the template, then copy the remainder (Page 4..n)
-        # Move 'i' to first paragraph AFTER third page break (or end if not present)
-        if breaks_seen < 2:
-            # Template doesn't have 2 breaks; just append nothing (we already inserted page3)
-            pass
-        else:
-            # Advance i to after the second break paragraph
-            # (we're currently at that paragraph; move next)
-            i += 1
-            # Now skip until we hit the third break (end of Page 3)
-            third_break_hit = False
-            while i < len(paras):
-                if para_has_page_break(paras[i]):
-                    third_break_hit = True
-                    i += 1  # move to first paragraph of Page 4
-                    break
-                i += 1
-            # If no third break, i will be at len(paras) and nothing to copy
-            # Copy the rest (Page 4..n)
-            while i < len(paras):
-                append_paragraph_text(paras[i])
-                i += 1
-
-        out = io.BytesIO()
-        newd.save(out)
-        return out.getvalue()
+        return docx_splice.replace_page(
+            template_bytes, docx_splice.text_paragraphs(["Page 3 — Generated by App", *(page3_lines or [])])
+        )
 
     # ---- PDF page 3 replacement
     def render_pdf_page_from_lines(lines: list[str]) -> bytes:
@@ -371,6 +305,27 @@ def create_app():
         except Exception as e:
             return jsonify({"error": f"Failed to read overlay map: {e}"}), 500
 
+    # ---------------------------
+    # Output cache counters (hits = renders saved)
+    # ---------------------------
+    @app.route("/cache-stats")
+    def cache_stats():
+        return jsonify(output_cache.stats())
+
+    # ---------------------------
+    # /extract LLM answer cache counters (hits = OpenAI calls saved)
+    # ---------------------------
+    @app.route("/llm-cache-stats")
+    def llm_cache_stats():
+        return jsonify(llm_cache.stats())
+
+    # ---------------------------
+    # Fill scheduler: queue depths and wait times per lane
+    # ---------------------------
+    @app.route("/scheduler-stats")
+    def scheduler_stats():
+        return jsonify(get_scheduler().stats())
+
     # ---------------------------
     # Download output files
     # ---------------------------
@@ -400,6 +355,12 @@ def create_app():
             "projectLevel": data.get("projectLevel"),
             "ticks": data.get("ticks") or {},
         }
+        try:
+            fields = normalize_fields(data.get("fields"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if fields:
+            mapping["fields"] = fields
 
         batch_id = datetime.now().strftime("%Y%m%d_%H%M%S")
         out_dir = make_batch_folder(batch_id)
@@ -413,7 +374,10 @@ def create_app():
                 out_dir=out_dir,
                 out_basename=out_base,
                 export_docx=AppConfig.EXPORT_DOCX,
+                lane="interactive",
             )
+        except FieldTagError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": f"Export failed: {e}"}), 500
 
@@ -427,28 +391,68 @@ def create_app():
     # ---------------------------
     @app.route("/batch", methods=["POST"])
     def batch_csv():
+        """Queue the CSV and answer at once; follow progress on /jobs/<id> or /jobs/<id>/events."""
         f = request.files.get("file")
         if not f:
             return jsonify({"error": "Upload a CSV file as field 'file'"}), 400
 
-        batch_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-        out_dir = make_batch_folder(batch_id)
-
         try:
-            result = csv_process(
-                csv_file=f,
-                docx_template=AppConfig.DOCX_TEMPLATE_PATH,
-                full_docx_template=AppConfig.FULL_DOCX_TEMPLATE_PATH,
-                out_dir=out_dir,
-                export_docx=AppConfig.EXPORT_DOCX,
-            )
-            # ZIP all generated PDFs for convenience
-            zip_rel = zip_outputs(result.get("pdf_relpaths", []), out_dir, zip_name=f"{batch_id}.zip")
-            result["zip_url"] = f"/download/{zip_rel}"
-            return jsonify(result)
+            job = batch_jobs.submit(f)
         except Exception as e:
             return jsonify({"error": f"Batch failed: {e}"}), 500
 
+        job_id = job["job_id"]
+        return jsonify({
+            "job_id": job_id,
+            "status": job["status"],
+            "status_url": f"/jobs/{job_id}",
+            "events_url": f"/jobs/{job_id}/events",
+        }), 202
+
+    # ---------------------------
+    # Batch job status / live progress (SSE)
+    # ---------------------------
+    @app.route("/jobs/<job_id>")
+    def job_status(job_id):
+        job = batch_jobs.get(job_id)
+        if job is None:
+            return jsonify({"error": "Unknown job"}), 404
+        return jsonify(job)
+
+    @app.route("/jobs/<job_id>/resume", methods=["POST"])
+    def job_resume(job_id):
+        """Re-run a finished job; rows already rendered (see its journal) are reused."""
+        job = batch_jobs.resume(job_id)
+        if job is None:
+            return jsonify({"error": "Job is unknown, still running or has no saved CSV"}), 409
+        return jsonify({
+            "job_id": job_id,
+            "status": job["status"],
+            "status_url": f"/jobs/{job_id}",
+            "events_url": f"/jobs/{job_id}/events",
+        }), 202
+
+    @app.route("/jobs/<job_id>/events")
+    def job_events(job_id):
+        if batch_jobs.get(job_id) is None:
+            return jsonify({"error": "Unknown job"}), 404
+        return Response(
+            stream_with_context(batch_jobs.events(job_id)),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.route("/jobs/<job_id>/zip")
+    def job_zip(job_id):
+        """PDFs of the job as one ZIP, streamed as rows finish (no archive written)."""
+        if batch_jobs.get(job_id) is None:
+            return jsonify({"error": "Unknown job"}), 404
+        return Response(
+            stream_with_context(batch_jobs.zip_stream(job_id)),
+            mimetype="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="{job_id}.zip"'},
+        )
+
     # ---------------------------
     # Extract from standard 5-page DOCX (multipart/form-data)
     # ---------------------------
@@ -474,5 +478,6 @@ def create_app():
 if __name__ == "__main__":
     ensure_dirs()
     app = create_app()
+    batch_jobs.resume_jobs()
     app.run(host="0.0.0.0", port=5000, debug=False)
 
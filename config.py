@@ -33,3 +33,78 @@ class AppConfig:
 
     # Features
     EXPORT_DOCX = True
+
+    # Fill engine: "com" (Word automation, Windows), "ooxml" (in-process XML edit, any OS)
+    # "stamp" (draw overlay_map.json positions onto page 3 of the full template PDF; PDF only)
+    # or "form" (fill the AcroForm fields of FORM_PDF_PATH; PDF only)
+    FILL_BACKEND = os.environ.get("FILL_BACKEND", "com").strip().lower()
+    # AcroForm template for "form": fields glyph_r{16..20}_c{2..5} (checkboxes) and cc_2
+    # (combo box); empty = generated from the full template PDF + OVERLAY_MAP_PATH into PAGE_CACHE_DIR
+    FORM_PDF_PATH = os.environ.get("FORM_PDF_PATH", "")
+    # Draw the filled values into the page and drop the fields (plain, non-editable PDF)
+    FORM_FLATTEN = os.environ.get("FORM_FLATTEN", "0").strip().lower() in ("1", "true", "yes")
+
+    # Parallel /batch rendering (threads for "com", processes for native backends)
+    BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    # Render each distinct mapping of a batch once; other rows get hard links/copies
+    BATCH_DEDUP = os.environ.get("BATCH_DEDUP", "1").strip().lower() in ("1", "true", "yes")
+    # Concurrent fills shared by /export (served first) and batch rows (round-robin per batch);
+    # 0 = WORD_POOL_SIZE for "com", SOFFICE_POOL_SIZE for pooled "ooxml", else BATCH_WORKERS
+    FILL_SLOTS = int(os.environ.get("FILL_SLOTS", "0"))
+    # Background /batch jobs run at the same time (each still uses BATCH_WORKERS)
+    BATCH_JOB_RUNNERS = int(os.environ.get("BATCH_JOB_RUNNERS", "1"))
+    # Batch ZIP: "incremental" (<id>.zip grown as rows finish) or "stream" (built on the fly
+    # per download from /jobs/<id>/zip, no archive on disk)
+    BATCH_ZIP_MODE = os.environ.get("BATCH_ZIP_MODE", "incremental").strip().lower()
+    # Also write <id>_merged.pdf: every row's PDF in CSV order, one bookmark per company_id
+    BATCH_MERGED_PDF = os.environ.get("BATCH_MERGED_PDF", "0").strip().lower() in ("1", "true", "yes")
+
+    # Content-addressed output cache (same templates + backend + mapping -> reuse files)
+    OUTPUT_CACHE_ENABLED = os.environ.get("OUTPUT_CACHE_ENABLED", "1").strip().lower() in ("1", "true", "yes")
+    OUTPUT_CACHE_DIR = os.environ.get(
+        "OUTPUT_CACHE_DIR",
+        os.path.join(ROOT_DIR, "cache", "outputs")
+    )
+    OUTPUT_CACHE_MAX_BYTES = int(os.environ.get("OUTPUT_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+    # Page splice (com/ooxml): export only the filled page per row and put it in place of
+    # page 3 of a once-per-template PDF of the full template, kept in PAGE_CACHE_DIR
+    PAGE_SPLICE = os.environ.get("PAGE_SPLICE", "0").strip().lower() in ("1", "true", "yes")
+    PAGE_CACHE_DIR = os.environ.get(
+        "PAGE_CACHE_DIR",
+        os.path.join(ROOT_DIR, "cache", "pages")
+    )
+
+    # Pooled Word workers: "com" (real Word) or "fake" (in-process stand-in for Linux)
+    WORD_POOL_BACKEND = os.environ.get("WORD_POOL_BACKEND", "com").strip().lower()
+    WORD_POOL_SIZE = int(os.environ.get("WORD_POOL_SIZE", "1"))          # Word instances side by side (no clipboard use)
+    WORD_POOL_MAX_JOBS = int(os.environ.get("WORD_POOL_MAX_JOBS", "50"))  # recycle an instance after K jobs
+    WORD_CALL_TIMEOUT = float(os.environ.get("WORD_CALL_TIMEOUT", "180"))  # kill + respawn a hung instance (0 = off)
+    # Keep the fill templates open in every Word worker and revert them between jobs
+    WORD_PIN_TEMPLATES = os.environ.get("WORD_PIN_TEMPLATES", "1").strip().lower() in ("1", "true", "yes")
+
+    # Headless LibreOffice used for DOCX -> PDF when Word is not available
+    SOFFICE_PATH = os.environ.get("SOFFICE_PATH", "soffice")
+    SOFFICE_TIMEOUT = int(os.environ.get("SOFFICE_TIMEOUT", "120"))
+    # Persistent soffice listeners driven over UNO (services.soffice_pool); 0 = one process per call
+    SOFFICE_POOL_SIZE = int(os.environ.get("SOFFICE_POOL_SIZE", "0"))
+    SOFFICE_POOL_MAX_JOBS = int(os.environ.get("SOFFICE_POOL_MAX_JOBS", "200"))  # restart a listener after K conversions
+    SOFFICE_START_TIMEOUT = int(os.environ.get("SOFFICE_START_TIMEOUT", "60"))
+    SOFFICE_PROFILE_DIR = os.environ.get(                                   # per-listener profiles live here
+        "SOFFICE_PROFILE_DIR",
+        os.path.join(ROOT_DIR, "cache", "soffice")
+    )
+
+    # /extract: confidence (0..1) the DOCX rule reading (services.extract_rules) needs
+    # before the LLM call is skipped; above 1 = always ask the LLM
+    EXTRACT_MIN_CONFIDENCE = float(os.environ.get("EXTRACT_MIN_CONFIDENCE", "0.9"))
+
+    # /extract LLM answers kept on disk (services.llm_cache), keyed by cleaned page-1 text +
+    # OPENAI_MODEL + prompt version; TTL in seconds (0 = no expiry), LRU past the byte cap
+    LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "1").strip().lower() in ("1", "true", "yes")
+    LLM_CACHE_DIR = os.environ.get(
+        "LLM_CACHE_DIR",
+        os.path.join(ROOT_DIR, "cache", "llm")
+    )
+    LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", str(30 * 24 * 3600)))
+    LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(64 * 1024 ** 2)))
@@ -0,0 +1,332 @@
+"""
+services/batch_jobs.py
+----------------------
+Background /batch jobs with persisted state.
+
+A job is one uploaded CSV rendered by services.csv_batch.process_csv on a background
+runner. The job id doubles as the batch folder name under OUTPUT_DIR, and the folder holds:
+  input.csv   the uploaded CSV (so an interrupted job can be re-run)
+  job.json    job state, rewritten atomically as rows finish
+  <id>.zip    PDFs, appended as each row finishes (BATCH_ZIP_MODE="incremental"); with
+              "stream" no archive is kept and zip_url points at /jobs/<id>/zip instead
+  <id>_merged.pdf  all PDFs in one file, a bookmark per company (BATCH_MERGED_PDF)
+
+State: {"job_id", "status": queued|running|done|failed, "created", "started", "finished",
+        "total", "processed", "succeeded", "failed_count", "items", "failed", "zip_url",
+        "merged_pdf_url", "merged", "reused", "dedup", "error"}     (reused/dedup: see services.csv_batch)
+While running, "items"/"failed" grow in completion order; once done they are in CSV order.
+
+Functions:
+- submit(csv_file) -> job state (queued); the work continues in the background
+- get(job_id) -> job state | None (memory first, then job.json)
+- events(job_id) -> generator of Server-Sent Events text chunks
+- zip_stream(job_id) -> generator of ZIP bytes, following the job while it runs
+- resume(job_id) -> job state | None: re-run a finished job, rendering only rows missing
+  from its journal (services.batch_journal), e.g. after Word hung and the job failed
+- resume_jobs(): resume jobs that were queued/running when the app stopped
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from werkzeug.datastructures import FileStorage
+
+from config import AppConfig
+from services.csv_batch import process_csv
+from services.pdf_merge import merge_pdfs
+from services.storage import ZipBuilder, make_batch_folder, relpath_from_output, stream_zip
+
+JOB_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+STATE_FILE = "job.json"
+INPUT_FILE = "input.csv"
+FINISHED = ("done", "failed")
+
+_SAVE_INTERVAL = 1.0        # seconds between job.json rewrites while rows are finishing
+_HEARTBEAT = 15.0           # SSE keep-alive comment interval
+
+_JOBS: dict = {}            # job_id -> state (live jobs of this process)
+_SAVED_AT: dict = {}        # job_id -> perf_counter of the last job.json write
+_COND = threading.Condition()
+_RUNNER = None
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _job_dir(job_id: str) -> str:
+    return os.path.join(AppConfig.OUTPUT_DIR, job_id)
+
+
+def _runner() -> ThreadPoolExecutor:
+    global _RUNNER
+    with _COND:
+        if _RUNNER is None:
+            _RUNNER = ThreadPoolExecutor(max_workers=max(1, AppConfig.BATCH_JOB_RUNNERS),
+                                         thread_name_prefix="batch-job")
+    return _RUNNER
+
+
+def _save(state: dict, force: bool = False):
+    """Write job.json (tmp + replace, so a crash never leaves half a file). Caller holds _COND."""
+    now = time.perf_counter()
+    if not force and now - _SAVED_AT.get(state["job_id"], 0.0) < _SAVE_INTERVAL:
+        return
+    path = os.path.join(_job_dir(state["job_id"]), STATE_FILE)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(state, fh)
+    os.replace(tmp, path)
+    _SAVED_AT[state["job_id"]] = now
+
+
+def _load(job_id: str) -> dict | None:
+    try:
+        with open(os.path.join(_job_dir(job_id), STATE_FILE), "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _new_state(job_id: str) -> dict:
+    # streamed archives can be downloaded while the job runs
+    zip_url = f"/jobs/{job_id}/zip" if AppConfig.BATCH_ZIP_MODE == "stream" else None
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "created": _now(),
+        "started": None,
+        "finished": None,
+        "total": None,
+        "processed": 0,
+        "succeeded": 0,
+        "failed_count": 0,
+        "items": [],
+        "failed": [],
+        "zip_url": zip_url,
+        "merged_pdf_url": None,
+        "merged": None,
+        "reused": 0,
+        "dedup": None,
+        "error": None,
+    }
+
+
+def _update(state: dict, force_save: bool = False, **fields):
+    with _COND:
+        state.update(fields)
+        _save(state, force=force_save)
+        _COND.notify_all()
+
+
+def _run(job_id: str, resume: bool = False):
+    state = _JOBS[job_id]
+    out_dir = _job_dir(job_id)
+    _update(state, force_save=True, status="running", started=_now())
+    archive = ZipBuilder(out_dir, f"{job_id}.zip") if AppConfig.BATCH_ZIP_MODE == "incremental" else None
+
+    def on_start(total: int):
+        _update(state, force_save=True, total=total)
+
+    def on_result(entry: dict):
+        if archive is not None and "error" not in entry:
+            archive.add(os.path.join(AppConfig.OUTPUT_DIR, entry["rel_pdf_path"]))
+        with _COND:
+            if "error" in entry:
+                state["failed"].append(entry)
+                state["failed_count"] += 1
+            else:
+                state["items"].append({"row": entry["row"], **entry["item"]})
+                state["succeeded"] += 1
+            state["processed"] += 1
+            _save(state)
+            _COND.notify_all()
+
+    try:
+        with open(os.path.join(out_dir, INPUT_FILE), "rb") as fh:
+            result = process_csv(
+                csv_file=FileStorage(stream=fh, filename=INPUT_FILE),
+                docx_template=AppConfig.DOCX_TEMPLATE_PATH,
+                full_docx_template=AppConfig.FULL_DOCX_TEMPLATE_PATH,
+                out_dir=out_dir,
+                export_docx=AppConfig.EXPORT_DOCX,
+                on_start=on_start,
+                on_result=on_result,
+                resume=resume,
+            )
+        zip_url = f"/download/{archive.close()}" if archive is not None else state["zip_url"]
+        with _COND:
+            state["items"].sort(key=lambda it: it["row"])
+            state["failed"].sort(key=lambda it: it["row"])
+        merged = {}
+        if AppConfig.BATCH_MERGED_PDF and state["items"]:
+            merged_path = os.path.join(out_dir, f"{job_id}_merged.pdf")
+            stats = merge_pdfs([(it["company_id"], _pdf_path(it)) for it in state["items"]], merged_path)
+            merged = {"merged_pdf_url": f"/download/{relpath_from_output(merged_path)}", "merged": stats}
+        _update(state, force_save=True, status="done", finished=_now(), zip_url=zip_url,
+                reused=result.get("reused", 0), dedup=result.get("dedup"), **merged)
+    except Exception as e:
+        if archive is not None:
+            archive.abort()
+        _update(state, force_save=True, status="failed", finished=_now(), error=f"Batch failed: {e}")
+
+
+def _enqueue(state: dict, resume: bool = False):
+    with _COND:
+        _JOBS[state["job_id"]] = state
+        _save(state, force=True)
+    _runner().submit(_run, state["job_id"], resume)
+
+
+def submit(csv_file) -> dict:
+    """Save the upload into a fresh batch folder and queue it. Returns the initial state."""
+    job_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    out_dir = make_batch_folder(job_id)
+    csv_file.stream.seek(0)
+    csv_file.save(os.path.join(out_dir, INPUT_FILE))
+
+    state = _new_state(job_id)
+    _enqueue(state)
+    return get(job_id)
+
+
+def get(job_id: str) -> dict | None:
+    if not JOB_ID_RE.match(job_id or ""):
+        return None
+    with _COND:
+        state = _JOBS.get(job_id)
+        if state is not None:
+            return json.loads(json.dumps(state))     # snapshot; the runner keeps mutating
+    return _load(job_id)
+
+
+def _requeue(job_id: str, previous: dict):
+    fresh = _new_state(job_id)
+    fresh["created"] = previous.get("created") or fresh["created"]
+    _enqueue(fresh, resume=True)
+
+
+def resume(job_id: str) -> dict | None:
+    """Re-queue a finished job in resume mode; None if unknown, still active or its CSV is gone."""
+    with _COND:                     # re-entrant; one resume wins if two arrive together
+        state = get(job_id)
+        if state is None or state.get("status") not in FINISHED:
+            return None
+        if not os.path.exists(os.path.join(_job_dir(job_id), INPUT_FILE)):
+            return None
+        _requeue(job_id, state)
+    return get(job_id)
+
+
+def resume_jobs() -> list[str]:
+    """
+    Re-queue jobs left queued/running by a previous process (job.json + input.csv on disk).
+    Rows already in the job's journal are reused; only the rest is rendered.
+    """
+    resumed = []
+    root = AppConfig.OUTPUT_DIR
+    if not os.path.isdir(root):
+        return resumed
+    for name in sorted(os.listdir(root)):
+        if not JOB_ID_RE.match(name) or name in _JOBS:
+            continue
+        state = _load(name)
+        if not state or state.get("status") in FINISHED:
+            continue
+        if not os.path.exists(os.path.join(_job_dir(name), INPUT_FILE)):
+            continue
+        _requeue(name, state)
+        resumed.append(name)
+    return resumed
+
+
+def _summary(state: dict) -> dict:
+    return {k: v for k, v in state.items() if k not in ("items", "failed")}
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _follow(job_id: str):
+    """
+    Yield ("item"|"failed", row), ("progress", summary) after new rows, ("idle", None) on
+    heartbeat timeouts and finally ("done", state). Rows finished before the call come first.
+    """
+    state = get(job_id)
+    if state is None:
+        return
+    sent_items = sent_failed = 0
+    sent_rows = set()
+    while True:
+        with _COND:
+            live = _JOBS.get(job_id)
+            if live is not None:
+                idle = len(live["items"]) == sent_items and len(live["failed"]) == sent_failed
+                if live["status"] not in FINISHED and idle:
+                    _COND.wait(_HEARTBEAT)
+                state = json.loads(json.dumps(live))
+            else:
+                state = _load(job_id) or state
+        finished = live is None or state["status"] in FINISHED
+
+        if finished:
+            # lists are re-sorted into CSV order at the end, so pick the rest by row
+            new_items = [it for it in state["items"] if it["row"] not in sent_rows]
+            new_failed = [it for it in state["failed"] if it["row"] not in sent_rows]
+        else:
+            new_items = state["items"][sent_items:]
+            new_failed = state["failed"][sent_failed:]
+
+        if not new_items and not new_failed and not finished:
+            yield "idle", None
+            continue
+        for it in new_items:
+            yield "item", it
+        for it in new_failed:
+            yield "failed", it
+        sent_rows.update(it["row"] for it in new_items + new_failed)
+        sent_items += len(new_items)
+        sent_failed += len(new_failed)
+        if new_items or new_failed:
+            yield "progress", _summary(state)
+        if finished:
+            yield "done", state
+            return
+
+
+def events(job_id: str):
+    """
+    SSE stream for one job:
+      status    initial summary (counts, no items)
+      item      a rendered row {"row", "company_id", "pdf_url", "docx_url"?}
+      failed    a failed row {"row", "company_id", "error"}
+      progress  counts after each batch of new rows
+      done      final state (status done|failed, CSV-ordered items, zip_url); stream ends
+    Rows already finished when the client connects are replayed first.
+    """
+    state = get(job_id)
+    if state is None:
+        return
+    yield _sse("status", _summary(state))
+    for event, data in _follow(job_id):
+        yield ": keep-alive\n\n" if event == "idle" else _sse(event, data)
+
+
+def _pdf_path(item: dict) -> str:
+    return os.path.join(AppConfig.OUTPUT_DIR, item["pdf_url"][len("/download/"):])
+
+
+def zip_stream(job_id: str):
+    """
+    ZIP of the job's PDFs streamed to the client as rows finish (nothing written to disk).
+    Works while the job is still running; the archive ends when the job does.
+    """
+    paths = (_pdf_path(data) for event, data in _follow(job_id) if event == "item")
+    return stream_zip(paths)
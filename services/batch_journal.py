@@ -0,0 +1,109 @@
+"""
+services/batch_journal.py
+-------------------------
+Per-batch completion journal: one JSON line per rendered row, appended to
+<batch folder>/journal.jsonl as soon as the row's files are written.
+
+If the process dies mid-batch, the rows already in the journal are not lost: a resumed
+run (process_csv(..., resume=True)) reuses their outputs and renders only the rest.
+
+A record is reused only when it still describes the same work: same company id, output
+name, mapping fingerprint and backend, and its files are still on disk. Failed rows are
+never journaled, so a resume retries them.
+
+Line: {"row", "company_id", "out_basename", "fingerprint", "backend", "rel_pdf_path", "rel_docx_path"?}
+
+Functions:
+- fingerprint(mapping): short digest of the normalized mapping
+- BatchJournal(out_dir, reset=False): .completed() -> {row: record}, .reusable(...), .record(job, backend, result), .close()
+"""
+
+import hashlib
+import json
+import os
+
+from config import AppConfig
+from services.fill_backend import PDF_ONLY
+from services.output_cache import normalize_mapping
+
+JOURNAL_FILE = "journal.jsonl"
+
+
+def fingerprint(mapping: dict) -> str:
+    payload = json.dumps(normalize_mapping(mapping), sort_keys=True).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()[:16]
+
+
+class BatchJournal:
+    """
+    Append-only; each line is flushed right away (survives a crash of this process) and
+    fsync'ed on close. A torn last line from a crash mid-write is ignored on read.
+    """
+
+    def __init__(self, out_dir: str, reset: bool = False):
+        self.path = os.path.join(out_dir, JOURNAL_FILE)
+        self._fh = None
+        if reset and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def completed(self) -> dict:
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                records[rec["row"]] = rec
+        return records
+
+    def reusable(self, records: dict, job: dict, backend: str, export_docx: bool) -> dict | None:
+        """The journaled result for `job` if it can stand in for a fresh render, else None."""
+        rec = records.get(job["row"])
+        if (
+            rec is None
+            or rec.get("company_id") != job["company_id"]
+            or rec.get("out_basename") != job["out_basename"]
+            or rec.get("backend") != backend
+            or rec.get("fingerprint") != fingerprint(job["mapping"])
+        ):
+            return None
+        fields = ["rel_pdf_path"] + (["rel_docx_path"] if export_docx and backend not in PDF_ONLY else [])
+        if not all(rec.get(f) and os.path.exists(os.path.join(AppConfig.OUTPUT_DIR, rec[f])) for f in fields):
+            return None
+        return {f: rec[f] for f in ("rel_pdf_path", "rel_docx_path") if rec.get(f)}
+
+    def record(self, job: dict, backend: str, result: dict):
+        if self._fh is None:
+            self._fh = open(self.path, "a+b")
+            self._fh.seek(0, os.SEEK_END)
+            if self._fh.tell():
+                self._fh.seek(-1, os.SEEK_END)
+                if self._fh.read(1) != b"\n":
+                    self._fh.write(b"\n")          # close a line torn by a crash
+        rec = {
+            "row": job["row"],
+            "company_id": job["company_id"],
+            "out_basename": job["out_basename"],
+            "fingerprint": fingerprint(job["mapping"]),
+            "backend": backend,
+            "rel_pdf_path": result["rel_pdf_path"],
+        }
+        if result.get("rel_docx_path"):
+            rec["rel_docx_path"] = result["rel_docx_path"]
+        self._fh.write((json.dumps(rec) + "\n").encode("utf-8"))
+        self._fh.flush()
+
+    def close(self):
+        if self._fh is not None:
+            os.fsync(self._fh.fileno())
+            self._fh.close()
+            self._fh = None
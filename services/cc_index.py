@@ -0,0 +1,182 @@
+"""
+services/cc_index.py
+--------------------
+Content-control index: tag -> control and (table, row, col) -> control.
+
+Built once per template file (cached by path + mtime + size) and reused for every fill,
+so a lookup is one dict hit instead of a scan over all controls.
+
+Positions are 1-based ordinals in document order: the numbering of Word's
+doc.ContentControls.Item(i) and of the "index" field in controls_extracted_latest.json.
+Tables/rows/cells are 1-based like Word's Tables.Item(t).Rows.Item(r).Cells.Item(c)
+(top-level tables only; controls in nested tables map to the outer cell).
+
+Functions:
+- build_index_from_com(doc): one pass over doc.ContentControls (COM backend)
+- build_index_from_xml(root): one pass over w:sdt in word/document.xml (OOXML backend)
+- get_com_index(doc, path) / get_xml_index(path, root=None): cached builders
+- com_control(doc, index, tag=None, cell=None): resolve to a ContentControl (one COM call)
+- xml_controls(root) / xml_control(controls, index, tag=None, cell=None): resolve to a w:sdt
+"""
+
+import os
+import threading
+import zipfile
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+NS = {"w": W_NS}
+
+_wdWithInTable = 12         # Range.Information(wdWithInTable)
+
+
+class ContentControlIndex:
+    """
+    by_tag:  tag -> [positions]      (a tag may repeat; find() returns the first)
+    by_cell: (table, row, col) -> position of the first control fully inside that cell
+    """
+
+    def __init__(self, count: int, by_tag: dict, by_cell: dict):
+        self.count = count
+        self.by_tag = by_tag
+        self.by_cell = by_cell
+
+    def find(self, tag: str | None = None, cell: tuple[int, int, int] | None = None) -> int | None:
+        if tag is not None:
+            positions = self.by_tag.get(tag)
+            return positions[0] if positions else None
+        if cell is not None:
+            return self.by_cell.get(tuple(cell))
+        return None
+
+    def _add(self, pos: int, tag: str | None, cell: tuple | None):
+        if tag:
+            self.by_tag.setdefault(tag, []).append(pos)
+        if cell is not None:
+            self.by_cell.setdefault(cell, pos)
+
+
+# ---------------------------
+# COM (Word) index
+# ---------------------------
+def build_index_from_com(doc) -> ContentControlIndex:
+    """
+    Read every control's Tag/Range once and locate its cell. Cost is paid per template
+    file, not per lookup.
+    """
+    tables = []
+    for t in range(1, doc.Tables.Count + 1):
+        rng = doc.Tables.Item(t).Range
+        tables.append((rng.Start, rng.End))
+
+    count = doc.ContentControls.Count
+    index = ContentControlIndex(count, {}, {})
+    for i in range(1, count + 1):
+        cc = doc.ContentControls.Item(i)
+        cell_key = None
+        try:
+            rng = cc.Range
+            start, end = rng.Start, rng.End
+            if tables and rng.Information(_wdWithInTable):
+                table_index = next(
+                    (n for n, (ts, te) in enumerate(tables, 1) if ts <= start and end <= te), None
+                )
+                cell = rng.Cells.Item(1)
+                crng = cell.Range
+                if table_index and crng.Start <= start and end <= crng.End:
+                    cell_key = (table_index, cell.RowIndex, cell.ColumnIndex)
+        except Exception:
+            pass
+        try:
+            tag = cc.Tag
+        except Exception:
+            tag = None
+        index._add(i, tag, cell_key)
+    return index
+
+
+def com_control(doc, index: ContentControlIndex, tag: str | None = None, cell: tuple | None = None):
+    pos = index.find(tag=tag, cell=cell)
+    return doc.ContentControls.Item(pos) if pos else None
+
+
+# ---------------------------
+# OOXML index
+# ---------------------------
+def _w(tag: str) -> str:
+    return f"{{{W_NS}}}{tag}"
+
+
+def xml_controls(root) -> list:
+    """All w:sdt of the main story in document order (position i is list[i - 1])."""
+    return root.xpath("//w:body//w:sdt", namespaces=NS)
+
+
+def build_index_from_xml(root) -> ContentControlIndex:
+    tables = {tbl: n for n, tbl in enumerate(root.xpath("//w:body//w:tbl[not(ancestor::w:tbl)]", namespaces=NS), 1)}
+    rows_of = {}
+
+    controls = xml_controls(root)
+    index = ContentControlIndex(len(controls), {}, {})
+    for pos, sdt in enumerate(controls, 1):
+        tag_el = sdt.find("w:sdtPr/w:tag", NS)
+        tag = tag_el.get(_w("val")) if tag_el is not None else None
+
+        cell_key = None
+        outer = sdt.xpath("ancestor::w:tc[not(ancestor::w:tbl/ancestor::w:tbl)]", namespaces=NS)
+        if outer:
+            tc = outer[0]
+            tr = tc.getparent()
+            tbl = tr.getparent() if tr is not None else None
+            if tbl in tables and tr.tag == _w("tr"):
+                if tbl not in rows_of:
+                    rows_of[tbl] = tbl.findall("w:tr", NS)
+                row = rows_of[tbl].index(tr) + 1
+                col = tr.findall("w:tc", NS).index(tc) + 1
+                cell_key = (tables[tbl], row, col)
+        index._add(pos, tag, cell_key)
+    return index
+
+
+def xml_control(controls: list, index: ContentControlIndex, tag: str | None = None, cell: tuple | None = None):
+    pos = index.find(tag=tag, cell=cell)
+    return controls[pos - 1] if pos else None
+
+
+# ---------------------------
+# Per-template cache
+# ---------------------------
+_CACHE: dict = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def _file_key(kind: str, path: str) -> tuple:
+    return (kind, os.path.abspath(path), os.path.getmtime(path), os.path.getsize(path))
+
+
+def _cached(key: tuple, build):
+    with _CACHE_LOCK:
+        index = _CACHE.get(key)
+    if index is None:
+        index = build()
+        with _CACHE_LOCK:
+            for stale in [k for k in _CACHE if k[:2] == key[:2]]:
+                del _CACHE[stale]
+            _CACHE[key] = index
+    return index
+
+
+def get_com_index(doc, path: str) -> ContentControlIndex:
+    """Index for the template at `path`, built from the opened `doc` on first use."""
+    return _cached(_file_key("com", path), lambda: build_index_from_com(doc))
+
+
+def get_xml_index(path: str, root=None) -> ContentControlIndex:
+    """Index for the DOCX at `path`; pass an already parsed document.xml `root` to skip parsing."""
+    def build():
+        r = root
+        if r is None:
+            from lxml import etree
+            with zipfile.ZipFile(path) as z:
+                r = etree.fromstring(z.read("word/document.xml"))
+        return build_index_from_xml(r)
+    return _cached(_file_key("xml", path), build)
@@ -1,53 +1,298 @@
 """
 services/csv_batch.py
 ---------------------
+Batch CSV -> one filled document per row.
+
+- process_csv(csv_file, docx_template, full_docx_template, out_dir, export_docx=True, workers=None,
+              on_start=None, on_result=None, resume=False)
+    Loads and validates the whole CSV first (services.csv_ingest): invalid rows are
+    reported under "failed" and skipped before any work.
+    Valid rows are rendered on AppConfig.BATCH_WORKERS workers:
+      "com" backend       -> threads feeding the Word pool (services.word_pool)
+      "ooxml" + SOFFICE_POOL_SIZE > 0 -> threads feeding the soffice pool (services.soffice_pool)
+      native backends     -> a process pool (ooxml / stamp / form are CPU/subprocess bound)
+    Items are returned in CSV order; a failing row is reported under "failed" and
+    does not abort the batch. Optional progress hooks (used by services.batch_jobs):
+      on_start(total)    once the CSV has been read
+      on_result(entry)   as each row finishes, in completion order
+    Every rendered row is journaled in out_dir (services.batch_journal); with resume=True
+    rows already in the journal reuse their files and only the rest is rendered.
+    Each render first takes a "bulk" slot of services.fill_scheduler (keyed by out_dir),
+    so at most the granted number of rows are in flight and single exports go first.
+    With AppConfig.BATCH_DEDUP, rows with identical mappings (differing only in company_id)
+    are rendered once and the other rows get hard links/copies of that output; the result's
+    "dedup" block reports rows, renders and the ratio of renders saved.
+    The output cache (services.output_cache) is consulted and filled here, in the parent,
+    before a row is submitted and after it comes back: with a process pool a worker's
+    cache counters and LRU index would otherwise live and die in the child.
 """
 import os
-import csv
-from services.storage import relpath_from_output, safe_filename
-from services.validation import normalize_project_level, parse_bool
-from services.word_fill import fill_and_export
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 
-def process_csv(csv_file, docx_template: str, full_docx_template: str, out_dir: str, export_docx: bool = True):
-    csv_file.stream.seek(0)
-    reader = csv.DictReader(line.decode("utf-8") if isinstance(line, bytes) else line for line in csv_file.stream)
+from config import AppConfig
+from services.storage import link_or_copy, relpath_from_output, safe_filename
+from services.batch_journal import BatchJournal, fingerprint
+from services.csv_ingest import load_table
+from services import output_cache
+from services.fill_backend import cache_lookup, fill_and_export
+from services.fill_scheduler import get_scheduler
 
-    items = []
-    pdf_relpaths = []
-    count = 0
 
-    for row in reader:
-        count += 1
-        company = (row.get("company_id") or f"row_{count}").strip()
-        project_level = normalize_project_level(row.get("project_level_dropdown"))
+def _row_mapping(table, n: int) -> dict:
+    mapping = {"projectLevel": table.levels[n - 1], "ticks": table.ticks[n - 1]}
+    if table.fields[n - 1]:
+        mapping["fields"] = table.fields[n - 1]
+    return mapping
+
 
-        ticks = {}
-        for r in range(16, 21):
-            for c in range(2, 6):
-                colname = f"device_r{r}_c{c}"
-                ticks[f"glyph_r{r}_c{c}"] = parse_bool(row.get(colname))
+def _read_jobs(csv_file) -> tuple[list[dict], list[dict]]:
+    """
+    Load + validate the whole CSV up front (services.csv_ingest).
+    Returns (jobs to render, rejected rows as failure entries).
+    """
+    csv_file.stream.seek(0)
+    table = load_table(csv_file.stream)
+
+    jobs = []
+    rejected = []
+    used = set()
+    for n in range(1, table.rows + 1):
+        company = table.company_ids[n - 1]
+        if n in table.errors:
+            rejected.append({"row": n, "company_id": company,
+                             "error": "Invalid row: " + "; ".join(table.errors[n])})
+            continue
 
+        # unique per batch, so parallel rows never write the same file
         out_base = safe_filename(f"{company}")
+        base, k = out_base, 1
+        while out_base.lower() in used:
+            k += 1
+            out_base = f"{base}_{k}"
+        used.add(out_base.lower())
+
+        jobs.append({
+            "row": n,
+            "company_id": company,
+            "out_basename": out_base,
+            "mapping": _row_mapping(table, n),
+        })
+    return jobs, rejected
+
+
+def _lookup_row(job: dict, docx_template: str, full_docx_template: str, out_dir: str,
+                export_docx: bool, backend: str) -> tuple[str | None, dict | None]:
+    """
+    Output-cache step of a row, in the parent: (key, cached result | None). Never raises;
+    a failing lookup comes back as an {"error": ...} result like a failing render.
+    """
+    try:
+        return cache_lookup(docx_template, full_docx_template, job["mapping"], out_dir,
+                            job["out_basename"], export_docx, backend)
+    except Exception as e:
+        return None, {"error": f"{type(e).__name__}: {e}"}
+
+
+def _render_row(job: dict, docx_template: str, full_docx_template: str, out_dir: str,
+                export_docx: bool, backend: str) -> dict:
+    """
+    Runs in a worker (thread or process). Never raises: errors come back as {"error": ...}
+    so one bad row cannot abort the batch (and nothing unpicklable crosses processes).
+    The cache step is the parent's (_lookup_row / _store_row); "seconds" reports the render time.
+    """
+    started = time.perf_counter()
+    try:
         result = fill_and_export(
             docx_template=docx_template,
             full_docx_template=full_docx_template,
-            mapping={"projectLevel": project_level, "ticks": ticks},
+            mapping=job["mapping"],
             out_dir=out_dir,
-            out_basename=out_base,
-            export_docx=export_docx
+            out_basename=job["out_basename"],
+            export_docx=export_docx,
+            backend=backend,
+            use_cache=False,
         )
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+    result["seconds"] = time.perf_counter() - started
+    return result
 
-        item = {
-            "company_id": company,
-            "pdf_url": f"/download/{result['rel_pdf_path']}"
-        }
-        pdf_relpaths.append(result["rel_pdf_path"])
-        if export_docx and result.get("rel_docx_path"):
-            item["docx_url"] = f"/download/{result['rel_docx_path']}"
-        items.append(item)
+
+def _store_row(key: str | None, result: dict) -> dict:
+    """Add a rendered row to the output cache (in the parent); returns `result` without "seconds"."""
+    seconds = result.pop("seconds", 0.0)
+    if key is not None and not result.get("error"):
+        try:
+            output_cache.store(key, result, seconds)
+        except OSError:
+            pass        # the row is rendered; a lost cache entry only costs a later re-render
+    return result
+
+
+def _executor(backend: str, workers: int):
+    if backend == "com" or (backend == "ooxml" and AppConfig.SOFFICE_POOL_SIZE > 0):
+        # the Word / soffice pool bounds real concurrency; threads just keep it fed
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def _plan_groups(jobs: list[dict], pending: list[int], dedup: bool) -> dict:
+    """leader index -> [follower indices]: one render per distinct mapping."""
+    if not dedup:
+        return {i: [] for i in pending}
+    groups = {}
+    leaders = {}
+    for i in pending:
+        fp = fingerprint(jobs[i]["mapping"])
+        if fp in leaders:
+            groups[leaders[fp]].append(i)
+        else:
+            leaders[fp] = i
+            groups[i] = []
+    return groups
+
+
+def _copy_result(result: dict, job: dict, out_dir: str) -> dict:
+    """Give `job` its own files by linking the leader's outputs under job["out_basename"]."""
+    if result.get("error"):
+        return result
+    copied = {}
+    for field in ("rel_pdf_path", "rel_docx_path"):
+        rel = result.get(field)
+        if not rel:
+            continue
+        src = os.path.join(AppConfig.OUTPUT_DIR, rel)
+        dst = os.path.join(out_dir, job["out_basename"] + os.path.splitext(src)[1])
+        link_or_copy(src, dst)
+        copied[field] = relpath_from_output(dst)
+    return copied
+
+
+def _to_entry(job: dict, result: dict, export_docx: bool) -> dict:
+    """
+    {"row", "company_id", "item": {...}, "rel_pdf_path"} for a rendered row,
+    {"row", "company_id", "error"} for a failed one.
+    """
+    if result.get("error"):
+        return {"row": job["row"], "company_id": job["company_id"], "error": result["error"]}
+
+    item = {
+        "company_id": job["company_id"],
+        "pdf_url": f"/download/{result['rel_pdf_path']}"
+    }
+    if export_docx and result.get("rel_docx_path"):
+        item["docx_url"] = f"/download/{result['rel_docx_path']}"
+    return {"row": job["row"], "company_id": job["company_id"], "item": item,
+            "rel_pdf_path": result["rel_pdf_path"]}
+
+
+def process_csv(csv_file, docx_template: str, full_docx_template: str, out_dir: str,
+                export_docx: bool = True, workers: int | None = None, on_start=None, on_result=None,
+                resume: bool = False):
+    jobs, rejected = _read_jobs(csv_file)
+    if on_start:
+        on_start(len(jobs) + len(rejected))
+    backend = AppConfig.FILL_BACKEND
+    workers = max(1, int(workers or AppConfig.BATCH_WORKERS))
+    args = (docx_template, full_docx_template, out_dir, export_docx, backend)
+
+    # invalid rows are known before anything renders
+    if on_result:
+        for entry in rejected:
+            on_result(entry)
+
+    with BatchJournal(out_dir, reset=not resume) as journal:
+        done_before = journal.completed() if resume else {}
+        entries = [None] * len(jobs)
+
+        def _done(i: int, result: dict, reused: bool = False):
+            if not reused and not result.get("error"):
+                journal.record(jobs[i], backend, result)
+            entries[i] = _to_entry(jobs[i], result, export_docx)
+            if on_result:
+                on_result(entries[i])
+
+        pending = []
+        for i, job in enumerate(jobs):
+            result = journal.reusable(done_before, job, backend, export_docx) if done_before else None
+            if result is not None:
+                _done(i, result, reused=True)
+            else:
+                pending.append(i)
+
+        groups = _plan_groups(jobs, pending, AppConfig.BATCH_DEDUP)
+
+        def _group_done(leader: int, result: dict):
+            _done(leader, result)
+            for i in groups[leader]:
+                try:
+                    _done(i, _copy_result(result, jobs[i], out_dir))
+                except OSError as e:
+                    _done(i, {"error": f"{type(e).__name__}: {e}"})
+
+        # every render holds a bulk slot of the fill scheduler, so single exports and
+        # other batches get their turn between this batch's rows; output-cache hits are
+        # served here in the parent and take neither a slot nor a worker
+        scheduler = get_scheduler()
+        if workers == 1 or len(groups) <= 1:
+            for leader in groups:
+                key, result = _lookup_row(jobs[leader], *args)
+                if result is None:
+                    with scheduler.slot("bulk", out_dir):
+                        result = _store_row(key, _render_row(jobs[leader], *args))
+                _group_done(leader, result)
+        else:
+            size = min(workers, len(groups))
+            with _executor(backend, size) as ex:
+                running = {}
+
+                def _finish(f):
+                    leader, key = running.pop(f)
+                    _group_done(leader, _store_row(key, f.result()))
+
+                for leader in groups:
+                    key, hit = _lookup_row(jobs[leader], *args)
+                    if hit is not None:
+                        _group_done(leader, hit)
+                        continue
+                    if len(running) >= size:
+                        finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                        for f in finished:
+                            _finish(f)
+                    ticket = scheduler.acquire("bulk", out_dir)
+                    try:
+                        f = ex.submit(_render_row, jobs[leader], *args)
+                    except BaseException:
+                        scheduler.release(ticket)
+                        raise
+                    f.add_done_callback(lambda _f, t=ticket: scheduler.release(t))
+                    running[f] = (leader, key)
+                    for f in [f for f in running if f.done()]:
+                        _finish(f)
+                for f in as_completed(list(running)):
+                    _finish(f)
+
+    items = []
+    pdf_relpaths = []
+    failed = []
+
+    for entry in sorted(entries + rejected, key=lambda e: e["row"]):
+        if "error" in entry:
+            failed.append(entry)
+            continue
+        items.append(entry["item"])
+        pdf_relpaths.append(entry["rel_pdf_path"])
 
     return {
-        "processed": count,
+        "processed": len(jobs) + len(rejected),
         "items": items,
-        "pdf_relpaths": pdf_relpaths
+        "pdf_relpaths": pdf_relpaths,
+        "failed": failed,
+        "reused": len(jobs) - len(pending),
+        "dedup": {
+            "rows": len(pending),
+            "renders": len(groups),
+            "ratio": round(1 - len(groups) / len(pending), 4) if pending else 0.0,
+        },
     }
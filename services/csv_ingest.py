@@ -0,0 +1,123 @@
+"""
+services/csv_ingest.py
+----------------------
+Batch CSV ingestion: the whole file is read once into columns and validated before any
+row is rendered, so a bad cell is reported in milliseconds instead of after the Word run.
+
+Schema (header names, any order, extra columns ignored; a missing column reads as empty
+cells, like the row-by-row reader before it; so do the missing trailing cells of a short
+row, while a row longer than the header is rejected):
+  company_id               free text (empty -> "row_<n>")
+  project_level_dropdown   one of validation.PROJECT_LEVELS; anything else (empty, the
+                           template's "Choose an item." placeholder, ...) -> placeholder
+  device_r{16..20}_c{2..5} empty or a boolean (validation.TRUE_VALUES / FALSE_VALUES);
+                           a missing column is unticked
+Optional (docs/now2.csv): the tag-field columns of services.form_fields.FIELD_COLUMNS;
+  checkbox columns take a boolean or the box's label, value columns free text.
+
+The 20 tick columns become one services.tick_grid.TickGrid per row, the field columns
+one {tag: value} dict per row (empty cells left out).
+
+Functions:
+- load_table(stream) -> BatchTable
+- BatchTable.errors: {row: [messages]} for rows that must not be rendered
+"""
+
+import csv
+import io
+
+from services.form_fields import FIELD_COLUMNS
+from services.tick_grid import CSV_COLUMNS, TickGrid
+from services.validation import FALSE_VALUES, TRUE_VALUES, normalize_project_level
+
+COMPANY_COLUMN = "company_id"
+LEVEL_COLUMN = "project_level_dropdown"
+SCHEMA_COLUMNS = (COMPANY_COLUMN, LEVEL_COLUMN) + CSV_COLUMNS
+
+_BOOL = {**{v: 0 for v in FALSE_VALUES}, **{v: 1 for v in TRUE_VALUES}}
+
+
+class BatchTable:
+    """
+    Column-oriented view of a batch CSV (row n is index n - 1 in every list).
+      company_ids: [str]          levels: [str | None]
+      ticks:       [TickGrid]     fields: [{tag: value}]
+      errors:      {row: [str]}
+    """
+
+    __slots__ = ("rows", "company_ids", "levels", "ticks", "fields", "errors")
+
+    def __init__(self, rows: int):
+        self.rows = rows
+        self.company_ids = []
+        self.levels = []
+        self.ticks = []
+        self.fields = []
+        self.errors = {}
+
+    def _error(self, row: int, message: str):
+        self.errors.setdefault(row, []).append(message)
+
+    def valid_rows(self) -> list[int]:
+        return [n for n in range(1, self.rows + 1) if n not in self.errors]
+
+
+def _decode(stream) -> str:
+    data = stream.read()
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig")
+    return data.lstrip("\ufeff")
+
+
+def load_table(stream) -> BatchTable:
+    reader = csv.reader(io.StringIO(_decode(stream), newline=""))
+    header = [h.strip() for h in next(reader, [])]
+
+    records = [r for r in reader if any(cell.strip() for cell in r)]     # skip blank lines
+    table = BatchTable(len(records))
+    width = len(header)
+    for n, rec in enumerate(records, 1):
+        if len(rec) > width:
+            table._error(n, f"expected {width} fields, got {len(rec)}")
+            del rec[width:]
+        else:
+            rec.extend([""] * (width - len(rec)))    # missing trailing cells are empty (csv.DictReader restval)
+
+    # transpose once; every check below is one pass over one column
+    columns = dict(zip(header, zip(*records))) if records else {c: () for c in header}
+    for col in SCHEMA_COLUMNS:
+        columns.setdefault(col, ("",) * table.rows)
+
+    table.company_ids = [
+        (v.strip() or f"row_{n}") for n, v in enumerate(columns[COMPANY_COLUMN], 1)
+    ]
+
+    table.levels = [normalize_project_level(v) for v in columns[LEVEL_COLUMN]]
+
+    bits = [0] * table.rows
+    for i, col in enumerate(CSV_COLUMNS):
+        flag = 1 << i
+        for n, v in enumerate(columns[col], 1):
+            b = _BOOL.get(v.strip().lower())
+            if b is None:
+                table._error(n, f"{col}: {v!r} is not a boolean")
+            elif b:
+                bits[n - 1] |= flag
+    table.ticks = [TickGrid(b) for b in bits]
+
+    table.fields = [{} for _ in range(table.rows)]
+    for col, (tag, label) in FIELD_COLUMNS.items():
+        if col not in columns:
+            continue
+        for n, v in enumerate(columns[col], 1):
+            v = v.strip()
+            if label is None:
+                if v:
+                    table.fields[n - 1][tag] = v
+                continue
+            b = 1 if v.lower() == label.lower() else _BOOL.get(v.lower())
+            if b is None:
+                table._error(n, f"{col}: {v!r} is not a boolean or {label!r}")
+            elif b:
+                table.fields[n - 1][tag] = True
+    return table
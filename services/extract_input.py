@@ -2,80 +2,68 @@
 """
 Extract Data From Input
 -----------------------
-- keep_first_page_and_text(): copy page 1 to a new doc, return (saved_path, text)
+- keep_first_page_and_text(): copy page 1 to a new doc (range transfer, no clipboard), return (saved_path, text)
 - call_llm(): ask OpenAI to extract regions-in-scope + Medical Yes/No (strict JSON)
 - extract_and_map(): orchestration for the /extract route
 
+Regions + Medical are read from the DOCX structure first (services.extract_rules); the LLM
+is only called when that reading's confidence is below AppConfig.EXTRACT_MIN_CONFIDENCE,
+and its answers are cached on disk per page text + model + PROMPT_VERSION (services.llm_cache).
+
 Assumptions:
 - Input is a .docx with exactly 5 pages (we program defensively and just copy page 1).
-- We only send page-1 text to the LLM (privacy + determinism).
+- We only send page-1 text to the LLM (privacy + determinism), and only as a fallback.
 - We prefill the GP row (r=16) and MIRROR the same values to the MD row (r=17).
 """
 
 from __future__ import annotations
-import os, json, threading, tempfile, re
-import pythoncom
-import win32com.client as com
+import os, json, tempfile, re, time
 import requests
+from config import AppConfig
+from services import extract_rules, llm_cache
 from services.storage import relpath_from_output
+from services.tick_grid import TickGrid
+from services.word_pool import run_in_word
+
+# Bump when the prompt or the parsing of its answer changes (part of the LLM cache key)
+PROMPT_VERSION = "1"
 
 # COM constants
 _wdGoToPage = 1          # wdGoToPage
 _wdGoToAbsolute = 1      # wdGoToAbsolute
 
-# serialize Word access (shared with other COM code)
-_WORD_LOCK = threading.Lock()
-
-
-def _open_word():
-    pythoncom.CoInitialize()
-    app = com.DispatchEx("Word.Application")
-    app.Visible = False
-    app.DisplayAlerts = 0
-    return app
-
-def _quit_word(app):
+def _keep_first_page_in_word(app, src_docx_path: str, page1_path: str) -> str:
+    doc = app.Documents.Open(os.path.abspath(src_docx_path))
+    newdoc = None
     try:
-        app.Quit()
+        # Page 1 = start of page 1 up to the start of page 2 (Document.GoTo: no selection)
+        start = doc.GoTo(What=_wdGoToPage, Which=_wdGoToAbsolute, Count=1).Start
+        end = doc.GoTo(What=_wdGoToPage, Which=_wdGoToAbsolute, Count=2).Start
+        if end <= start:        # single-page input
+            end = doc.Content.End
+
+        # Range-to-range transfer (no clipboard, safe with several pooled instances)
+        newdoc = app.Documents.Add()
+        newdoc.Content.FormattedText = doc.Range(Start=start, End=end).FormattedText
+
+        # Save the 1-page docx
+        newdoc.SaveAs2(page1_path)
+        return newdoc.Content.Text or ""
     finally:
-        pythoncom.CoUninitialize()
+        if newdoc is not None:
+            newdoc.Close(SaveChanges=False)
+        doc.Close(SaveChanges=False)
 
 def keep_first_page_and_text(src_docx_path: str, out_dir: str) -> tuple[str, str]:
     """
     Copy Page 1 from src_docx_path into a new document and return:
     (saved_page1_docx_path, page1_text)
+    Runs on a pooled Word worker (services.word_pool).
     """
     os.makedirs(out_dir, exist_ok=True)
     page1_path = os.path.join(out_dir, "input_first_page.docx")
 
-    with _WORD_LOCK:
-        app = _open_word()
-        try:
-            doc = app.Documents.Open(os.path.abspath(src_docx_path))
-            doc.Activate()
-            sel = app.Selection
-
-            # Go to Page 1 start
-            sel.GoTo(What=_wdGoToPage, Which=_wdGoToAbsolute, Count=1)
-            start = sel.Start
-            # Go to Page 2 start (end of our range)
-            sel.GoTo(What=_wdGoToPage, Which=_wdGoToAbsolute, Count=2)
-            end = sel.Start
-
-            rng = doc.Range(Start=start, End=end)
-            rng.Copy()
-
-            newdoc = app.Documents.Add()
-            newdoc.Range(0, 0).Paste()
-
-            # Save the 1-page docx
-            newdoc.SaveAs2(page1_path)
-            page1_text = newdoc.Content.Text or ""
-
-            newdoc.Close(SaveChanges=False)
-            doc.Close(SaveChanges=False)
-        finally:
-            _quit_word(app)
+    page1_text = run_in_word(_keep_first_page_in_word, src_docx_path, page1_path)
 
     return page1_path, page1_text
 
@@ -98,11 +86,21 @@ def call_llm(page1_text: str) -> dict:
       "medical": true/false
     }
     """
+    model = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
+    text = _clean_text(page1_text)
+
+    # Same page text + model + prompt -> same answer (services.llm_cache)
+    key = None
+    if AppConfig.LLM_CACHE_ENABLED:
+        key = llm_cache.cache_key(text, model, PROMPT_VERSION)
+        hit = llm_cache.lookup(key)
+        if hit is not None:
+            return {**hit, "cached": True}
+
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY not set in environment.")
-
-    model = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
+    started = time.perf_counter()
 
     system = (
         "You are a precise information extraction engine. "
@@ -130,7 +128,7 @@ Return STRICT JSON with keys exactly:
 }}
 
 PAGE_TEXT:
-\"\"\"{_clean_text(page1_text)[:50000]}\"\"\""""
+\"\"\"{text[:50000]}\"\"\""""
     payload = {
         "model": model,
         "temperature": 0,
@@ -166,7 +164,10 @@ PAGE_TEXT:
         regions[k] = bool(regions.get(k, False))
     medical = bool(data.get("medical", False))
 
-    return {"regions": regions, "medical": medical}
+    result = {"regions": regions, "medical": medical}
+    if key is not None:
+        llm_cache.store(key, result, time.perf_counter() - started, model, PROMPT_VERSION)
+    return {**result, "cached": False}
 
 
 def build_gp_ticks(regions: dict[str, bool], medical_yes: bool) -> dict[str, bool]:
@@ -189,18 +190,13 @@ def _mirror_row_ticks(src_ticks: dict[str, bool], src_row: int = 16, dst_row: in
     Copy ticks from src_row to dst_row (keeps column numbers).
     Example: glyph_r16_c2 -> glyph_r17_c2
     """
-    out = {}
-    for k, v in src_ticks.items():
-        m = re.match(rf"^glyph_r{src_row}_c(\d+)$", k)
-        if m:
-            out[f"glyph_r{dst_row}_c{m.group(1)}"] = bool(v)
-    return out
+    return TickGrid.from_ticks(src_ticks).mirror_row(src_row, dst_row).row_ticks(dst_row)
 
 
 def extract_and_map(file_storage, out_dir: str) -> dict:
     """
     Orchestration for /extract:
-    - Save upload -> keep first page -> call LLM -> compute GP ticks -> MIRROR to MD -> build lines
+    - Save upload -> keep first page -> rules (LLM if unsure) -> compute GP ticks -> MIRROR to MD -> build lines
     """
     os.makedirs(out_dir, exist_ok=True)
     # Save upload
@@ -210,8 +206,13 @@ def extract_and_map(file_storage, out_dir: str) -> dict:
     # Keep page 1 & read its text
     page1_path, page1_text = keep_first_page_and_text(src_path, out_dir)
 
-    # LLM extraction
-    info = call_llm(page1_text)
+    # Rule-based extraction from the DOCX; LLM only when the rules are not sure
+    info = extract_rules.extract(src_path)
+    confidence = info["confidence"]
+    source = "rules"
+    if confidence < AppConfig.EXTRACT_MIN_CONFIDENCE:
+        info = call_llm(page1_text)
+        source = "llm_cache" if info.get("cached") else "llm"
     regions = info["regions"]
     medical = info["medical"]
 
@@ -239,4 +240,6 @@ def extract_and_map(file_storage, out_dir: str) -> dict:
         "ticks": ticks,  # now includes r16 AND r17
         "lines": lines,
         "first_page_docx_rel": relpath_from_output(page1_path),
+        "source": source,                   # "rules", "llm" or "llm_cache" (cached LLM answer)
+        "rules_confidence": confidence,
     }
@@ -0,0 +1,140 @@
+"""
+services/fill_backend.py
+------------------------
+Selects the fill engine configured by AppConfig.FILL_BACKEND.
+
+- fill_and_export(...): same arguments and result keys as services.word_fill.fill_and_export
+    "com"   -> services.word_fill  (Word automation, Windows + installed Word)
+    "ooxml" -> services.ooxml_fill (in-process word/document.xml edit, any OS)
+    "stamp" -> services.pdf_stamp  (overlay_map.json drawn onto the full template PDF; PDF only)
+    "form"  -> services.pdf_form   (AcroForm fields of the form template filled; PDF only)
+
+Engines are imported lazily so the OOXML engine works on hosts without pywin32.
+With AppConfig.OUTPUT_CACHE_ENABLED, results are served from services.output_cache
+when the same (templates, backend, mapping) was rendered before.
+- cache_lookup(...) -> (key, hit): the cache step alone, for callers rendering elsewhere
+    (services.csv_batch renders rows in child processes and keeps the cache, its stats and
+    its byte cap in the parent; the worker then calls fill_and_export(use_cache=False))
+With a `lane`, a cache miss renders only once services.fill_scheduler grants a slot
+(batch rows are admitted by services.csv_batch before they reach a worker).
+"""
+
+import os
+import time
+
+from config import AppConfig
+from services import output_cache
+from services.fill_scheduler import get_scheduler
+from services.storage import discard
+
+BACKENDS = ("com", "ooxml", "stamp", "form")
+PDF_ONLY = ("stamp", "form")         # backends that never produce a DOCX
+
+
+def _backend_name(name: str | None = None) -> str:
+    return (name or AppConfig.FILL_BACKEND or "com").strip().lower()
+
+
+def _backend_module(name: str | None = None):
+    name = _backend_name(name)
+    if name == "com":
+        from services import word_fill as mod
+    elif name == "ooxml":
+        from services import ooxml_fill as mod
+    elif name == "stamp":
+        from services import pdf_stamp as mod
+    elif name == "form":
+        from services import pdf_form as mod
+    else:
+        raise ValueError(f"Unknown fill backend {name!r}; expected one of {BACKENDS}")
+    return mod
+
+
+def template_paths(backend: str, docx_template: str, full_docx_template: str) -> tuple:
+    """Files whose content determines the output of `backend` (part of the cache key)."""
+    if backend == "stamp":
+        return (full_docx_template, AppConfig.OVERLAY_MAP_PATH)
+    if backend == "form":
+        if AppConfig.FORM_PDF_PATH:
+            return (AppConfig.FORM_PDF_PATH,)
+        return (full_docx_template, AppConfig.OVERLAY_MAP_PATH)
+    return (docx_template, full_docx_template)
+
+
+def cache_lookup(
+    docx_template: str,
+    full_docx_template: str,
+    mapping: dict,
+    out_dir: str,
+    out_basename: str,
+    export_docx: bool = True,
+    backend: str | None = None,
+) -> tuple[str | None, dict | None]:
+    """
+    (output-cache key, cached result linked into out_dir or None); (None, None) with the
+    cache disabled. Pass the key to services.output_cache.store() after a miss.
+    """
+    if not AppConfig.OUTPUT_CACHE_ENABLED:
+        return None, None
+    name = _backend_name(backend)
+    # the PDF-only backends never produce a DOCX, so don't require one from the cache
+    want_docx = export_docx and name not in PDF_ONLY
+    splice = AppConfig.PAGE_SPLICE and name not in PDF_ONLY and not mapping.get("fields")
+    variant = f"{name}+splice" if splice else name
+    if name == "form" and AppConfig.FORM_FLATTEN:
+        variant = "form+flat"
+    key = output_cache.cache_key(variant, template_paths(name, docx_template, full_docx_template), mapping)
+    return key, output_cache.lookup(key, out_dir, out_basename, want_docx)
+
+
+def fill_and_export(
+    docx_template: str,
+    full_docx_template: str,
+    mapping: dict,
+    out_dir: str,
+    out_basename: str,
+    export_docx: bool = True,
+    backend: str | None = None,
+    lane: str | None = None,
+    use_cache: bool = True,
+) -> dict:
+    """
+    Fill + export one document with the configured (or explicitly given) backend.
+    Returns {"rel_pdf_path": ..., "rel_docx_path": ...} like every backend.
+    lane: "interactive" / "bulk" to wait for a scheduler slot before rendering.
+    use_cache: False when the caller does the output-cache step itself (cache_lookup).
+    """
+    name = _backend_name(backend)
+    mod = _backend_module(name)
+
+    key = None
+    if use_cache:
+        key, hit = cache_lookup(docx_template, full_docx_template, mapping, out_dir, out_basename,
+                                export_docx, name)
+        if hit is not None:
+            return hit
+
+    def render():
+        # an earlier result at these paths may be hard-linked into the output cache (or
+        # shared by deduplicated batch rows); the engines write in place, so unlink it first
+        for ext in (".pdf", ".docx"):
+            discard(os.path.join(out_dir, f"{out_basename}{ext}"))
+        return mod.fill_and_export(
+            docx_template=docx_template,
+            full_docx_template=full_docx_template,
+            mapping=mapping,
+            out_dir=out_dir,
+            out_basename=out_basename,
+            export_docx=export_docx,
+        )
+
+    if lane is not None:
+        with get_scheduler().slot(lane):
+            started = time.perf_counter()
+            result = render()
+    else:
+        started = time.perf_counter()
+        result = render()
+    if key is not None:
+        output_cache.store(key, result, time.perf_counter() - started)
+    return result
@@ -0,0 +1,173 @@
+"""
+services/fill_scheduler.py
+--------------------------
+Admission control between the routes and the fill backend.
+
+A fixed number of fill slots (AppConfig.FILL_SLOTS; by default the Word pool size for
+"com", the soffice pool size for pooled "ooxml", else BATCH_WORKERS) is shared by two lanes:
+  interactive   single exports (/export): always granted the next free slot
+  bulk          batch rows: one queue per batch, free slots go round-robin over the
+                batches that are waiting, so a second batch is not stuck behind the first
+
+A batch therefore never has more rows in flight than it holds slots, and an interactive
+export waits for at most one running fill instead of a whole CSV.
+
+Pipelines/Functions:
+- get_scheduler(): process-wide scheduler built from AppConfig
+- FillScheduler(slots): .acquire(lane, key) -> ticket, .release(ticket), .slot(lane, key) (context manager)
+- FillScheduler.stats(): slots, busy, queue depths and wait times per lane
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from config import AppConfig
+
+LANES = ("interactive", "bulk")
+_WAIT_WINDOW = 500                  # recent waits kept per lane for percentiles
+
+
+def _percentile_ms(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    return round(values[min(len(values) - 1, int(p * len(values)))] * 1000, 1)
+
+
+class _Ticket:
+    __slots__ = ("lane", "key", "queued", "granted")
+
+    def __init__(self, lane: str, key):
+        self.lane = lane
+        self.key = key
+        self.queued = time.monotonic()
+        self.granted = None
+
+
+class FillScheduler:
+    """
+    Counting semaphore with two prioritized lanes; bulk waiters are queued per key
+    (batch) and served round-robin. All state is guarded by one condition variable.
+    """
+
+    def __init__(self, slots: int = 1):
+        self.slots = max(1, int(slots))
+        self._cond = threading.Condition()
+        self._busy = 0
+        self._interactive = deque()
+        self._bulk = {}                 # key -> deque of tickets (insertion order = turn order)
+        self._anon = itertools.count()
+        self._stats = {
+            lane: {"granted": 0, "wait_total": 0.0, "wait_max": 0.0, "max_depth": 0,
+                   "recent": deque(maxlen=_WAIT_WINDOW)}
+            for lane in LANES
+        }
+
+    def _depth(self, lane: str) -> int:
+        if lane == "interactive":
+            return len(self._interactive)
+        return sum(len(q) for q in self._bulk.values())
+
+    def _next(self) -> _Ticket | None:
+        if self._interactive:
+            return self._interactive.popleft()
+        if not self._bulk:
+            return None
+        key = next(iter(self._bulk))
+        q = self._bulk.pop(key)
+        ticket = q.popleft()
+        if q:
+            self._bulk[key] = q         # back of the line
+        return ticket
+
+    def _dispatch(self):
+        granted = False
+        while self._busy < self.slots:
+            ticket = self._next()
+            if ticket is None:
+                break
+            ticket.granted = time.monotonic()
+            self._busy += 1
+            wait = ticket.granted - ticket.queued
+            s = self._stats[ticket.lane]
+            s["granted"] += 1
+            s["wait_total"] += wait
+            s["wait_max"] = max(s["wait_max"], wait)
+            s["recent"].append(wait)
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def acquire(self, lane: str = "bulk", key=None) -> _Ticket:
+        """
+        Block until a slot is granted. `key` groups bulk requests (one batch); requests
+        without a key are their own group.
+        """
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane {lane!r}; expected one of {LANES}")
+        ticket = _Ticket(lane, key if key is not None else next(self._anon))
+        with self._cond:
+            if lane == "interactive":
+                self._interactive.append(ticket)
+            else:
+                self._bulk.setdefault(ticket.key, deque()).append(ticket)
+            s = self._stats[lane]
+            s["max_depth"] = max(s["max_depth"], self._depth(lane))
+            self._dispatch()
+            while ticket.granted is None:
+                self._cond.wait()
+        return ticket
+
+    def release(self, ticket: _Ticket):
+        with self._cond:
+            self._busy -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, lane: str = "bulk", key=None):
+        ticket = self.acquire(lane, key)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> dict:
+        with self._cond:
+            out = {"slots": self.slots, "busy": self._busy, "batches_waiting": len(self._bulk), "lanes": {}}
+            for lane in LANES:
+                s = self._stats[lane]
+                recent = sorted(s["recent"])
+                out["lanes"][lane] = {
+                    "queued": self._depth(lane),
+                    "max_queued": s["max_depth"],
+                    "granted": s["granted"],
+                    "wait_avg_ms": round(s["wait_total"] / s["granted"] * 1000, 1) if s["granted"] else 0.0,
+                    "wait_p50_ms": _percentile_ms(recent, 0.5),
+                    "wait_p95_ms": _percentile_ms(recent, 0.95),
+                    "wait_max_ms": round(s["wait_max"] * 1000, 1),
+                }
+            return out
+
+
+_SCHEDULER = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def default_slots() -> int:
+    if AppConfig.FILL_SLOTS > 0:
+        return AppConfig.FILL_SLOTS
+    if AppConfig.FILL_BACKEND == "com":
+        return AppConfig.WORD_POOL_SIZE
+    if AppConfig.FILL_BACKEND == "ooxml" and AppConfig.SOFFICE_POOL_SIZE > 0:
+        return AppConfig.SOFFICE_POOL_SIZE
+    return AppConfig.BATCH_WORKERS
+
+
+def get_scheduler() -> FillScheduler:
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            _SCHEDULER = FillScheduler(default_slots())
+        return _SCHEDULER
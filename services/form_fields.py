@@ -0,0 +1,108 @@
+"""
+services/form_fields.py
+-----------------------
+Tag-addressed form fields: mapping["fields"] = {content-control tag: value}, next to the
+dedicated "projectLevel" (cc_2) and "ticks" (services.tick_grid.TickGrid) entries.
+
+Tags are the w:tag values of the tagged template (Downloaded_Documents/edited_02,
+controls_extracted_latest.json: 330 controls). The fill engines resolve them through the
+per-template tag index (services.cc_index), so a fill costs one lookup per field set.
+Tags the templates do not have are rejected (check_tags). So are tags that only exist on
+page 3 of the full template: that page is replaced by the single-page template, so its
+controls must come from there. A single page cut out of the tagged template
+(services.docx_splice.extract_page) keeps them.
+
+Values by control type:
+  checkbox            bool, or a CSV boolean string (validation.TRUE_VALUES -> ticked)
+  dropdown            display text or value of a list entry (anything else is ignored)
+  combobox            a list entry, or free text
+  date / text         text (a date given as YYYY-MM-DD also sets the stored date)
+Empty values leave the control as in the template.
+
+Batch CSV columns (docs/now2.csv) -> tags: FIELD_COLUMNS. A checkbox column takes a
+boolean or the box's own label (e.g. top_epd_other = "Other"). now2.csv columns without
+a control in the template (company_name, output_filename, design_owner_combo_2,
+manufacturing_Other_text) are not mapped.
+
+Functions:
+- normalize_fields(fields) -> {tag: bool | str}, empty values dropped (canonical form)
+- is_checked(value) -> bool
+- check_tags(fields, known, replaced=()): FieldTagError (a ValueError) for tags the fill cannot reach
+"""
+
+from services.validation import TRUE_VALUES
+
+# CSV column -> (tag, checkbox label | None for a value column)
+FIELD_COLUMNS = {
+    "capa_associated_combo": ("capa_associated_select_one_combo", None),
+    "design_owner_combo_1": ("design_owner_choose_an_item_other_combo", None),
+    "top_epd_epd": ("epd_ecr_gepc_chk", "EPD"),
+    "top_epd_ecr": ("epd_ecr_gepc_chk_2", "ECR"),
+    "top_epd_gepc": ("epd_ecr_gepc_chk_3", "GEPC"),
+    "top_epd_other": ("insert_other_chk", "Other"),
+    "manufacturing_AVL": ("manufacturing_site_avl_mar_lsb_oha_chk", "AVL"),
+    "manufacturing_MAR": ("manufacturing_site_avl_mar_lsb_oha_chk_2", "MAR"),
+    "manufacturing_LSB": ("manufacturing_site_avl_mar_lsb_oha_chk_3", "LSB"),
+    "manufacturing_OHA": ("manufacturing_site_avl_mar_lsb_oha_chk_4", "OHA"),
+    "manufacturing_SNG": ("manufacturing_site_avl_mar_lsb_oha_chk_5", "SNG"),
+    "manufacturing_Other": ("manufacturing_site_avl_mar_lsb_oha_chk_6", "Other"),
+    "manufacturing_OEM": ("manufacturing_site_avl_mar_lsb_oha_chk_7", "OEM"),
+    "manufacturing_CM": ("manufacturing_site_avl_mar_lsb_oha_chk_8", "CM"),
+}
+
+
+def is_checked(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def normalize_fields(fields) -> dict:
+    """
+    {tag: value} with tags/strings stripped and empty values dropped; bools stay bools.
+    Raises ValueError when `fields` is not a mapping of tag -> scalar.
+    """
+    if not fields:
+        return {}
+    if not isinstance(fields, dict):
+        raise ValueError("fields must be an object of {tag: value}")
+    out = {}
+    for tag, value in fields.items():
+        tag = str(tag).strip()
+        if not tag or value is None:
+            continue
+        if isinstance(value, bool):
+            out[tag] = value
+        elif isinstance(value, (str, int, float)):
+            text = str(value).strip()
+            if text:
+                out[tag] = text
+        else:
+            raise ValueError(f"fields[{tag!r}]: expected a string or boolean")
+    return out
+
+
+class FieldTagError(ValueError):
+    """mapping["fields"] names tags the filled document does not have."""
+
+
+def check_tags(fields: dict, known, replaced=()):
+    """
+    Raise FieldTagError naming every tag of `fields` (normalized) the fill cannot reach:
+    not in `known` (tags of the filled document), with the ones in `replaced` (tags of the
+    full template's page 3, which the single page overwrites) reported separately.
+    """
+    missing = sorted(tag for tag in fields if tag not in known)
+    if not missing:
+        return
+    lost = [tag for tag in missing if tag in replaced]
+    unknown = [tag for tag in missing if tag not in replaced]
+    parts = []
+    if unknown:
+        parts.append(f"unknown field tag(s): {', '.join(unknown)}")
+    if lost:
+        parts.append(
+            f"field tag(s) on page 3 of the full template, which the single-page template "
+            f"replaces and does not carry: {', '.join(lost)}"
+        )
+    raise FieldTagError("; ".join(parts))
@@ -0,0 +1,186 @@
+"""
+services/llm_cache.py
+---------------------
+Disk cache of /extract LLM answers, so re-uploads of the same document (re-runs,
+corrections, retries) skip the OpenAI round trip.
+
+Key = sha256(cleaned page-1 text, model, prompt version): the answer only depends on
+those, and bumping the prompt version (services.extract_input.PROMPT_VERSION) or changing
+OPENAI_MODEL starts a fresh set of entries.
+
+Layout: LLM_CACHE_DIR/<key[:2]>/<key>.json = {"result", "created", "model", "prompt", "seconds"}
+Expiry: entries older than LLM_CACHE_TTL seconds are misses (and removed); 0 = no expiry.
+Eviction: least-recently-used (in-process order; file mtime, touched on disk hits, across
+restarts) once the total size exceeds LLM_CACHE_MAX_BYTES.
+The last _MEMO_ENTRIES answers used are also kept in memory, so a repeated hit costs a
+dict lookup instead of a file read.
+
+Functions:
+- cache_key(text, model, prompt_version)
+- lookup(key) -> result dict | None
+- store(key, result, seconds, model="", prompt_version="")
+- stats(): hits (memory / disk) / misses / expired / stores / evictions / saved_seconds / bytes
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from config import AppConfig
+
+_MEMO_ENTRIES = 1024
+
+_LOCK = threading.Lock()
+_MEMO = OrderedDict()        # key -> (created, result, seconds), most recent last
+_INDEX = None                # OrderedDict key -> bytes, oldest first
+_TOTAL = 0
+_STATS = {"hits": 0, "memory_hits": 0, "misses": 0, "expired": 0, "stores": 0, "evictions": 0,
+          "saved_seconds": 0.0}
+
+
+def cache_key(text: str, model: str, prompt_version: str) -> str:
+    payload = {"text": text, "model": model, "prompt": prompt_version}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(AppConfig.LLM_CACHE_DIR, key[:2], f"{key}.json")
+
+
+def _expired(created: float) -> bool:
+    return AppConfig.LLM_CACHE_TTL > 0 and time.time() - created > AppConfig.LLM_CACHE_TTL
+
+
+def _load_index():
+    """Scan the cache dir once per process (oldest mtime first)."""
+    global _INDEX, _TOTAL
+    if _INDEX is not None:
+        return
+    entries = []
+    root = AppConfig.LLM_CACHE_DIR
+    if os.path.isdir(root):
+        for sub in os.listdir(root):
+            d = os.path.join(root, sub)
+            if not os.path.isdir(d):
+                continue
+            for name in os.listdir(d):
+                if name.endswith(".json"):
+                    st = os.stat(os.path.join(d, name))
+                    entries.append((st.st_mtime, name[:-5], st.st_size))
+    entries.sort()
+    _INDEX = OrderedDict((key, size) for _mt, key, size in entries)
+    _TOTAL = sum(_INDEX.values())
+
+
+def _drop(key: str):
+    """Forget an entry (caller holds _LOCK)."""
+    global _TOTAL
+    _MEMO.pop(key, None)
+    if _INDEX is not None:
+        _TOTAL -= _INDEX.pop(key, 0)
+    try:
+        os.remove(_entry_path(key))
+    except OSError:
+        pass
+
+
+def _remember(key: str, created: float, result: dict, seconds: float):
+    _MEMO[key] = (created, result, seconds)
+    _MEMO.move_to_end(key)
+    while len(_MEMO) > _MEMO_ENTRIES:
+        _MEMO.popitem(last=False)
+
+
+def _hit(key: str, seconds: float, memory: bool):
+    """Count a hit and mark the entry recently used (caller holds _LOCK)."""
+    _STATS["hits"] += 1
+    _STATS["memory_hits"] += memory
+    _STATS["saved_seconds"] += seconds
+    _load_index()
+    if key in _INDEX:
+        _INDEX.move_to_end(key)
+
+
+def lookup(key: str) -> dict | None:
+    """The cached answer (a copy) for `key`, or None when missing or expired."""
+    with _LOCK:
+        memo = _MEMO.get(key)
+        if memo is not None:
+            created, result, seconds = memo
+            if not _expired(created):
+                _MEMO.move_to_end(key)
+                _hit(key, seconds, True)
+                return copy.deepcopy(result)
+            _STATS["expired"] += 1
+            _STATS["misses"] += 1
+            _drop(key)
+            return None
+
+    path = _entry_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            entry = json.load(fh)
+        created, result = float(entry["created"]), entry["result"]
+        seconds = float(entry.get("seconds", 0.0))
+    except (OSError, ValueError, KeyError, TypeError):
+        with _LOCK:
+            _STATS["misses"] += 1
+        return None
+
+    with _LOCK:
+        if _expired(created):
+            _STATS["expired"] += 1
+            _STATS["misses"] += 1
+            _drop(key)
+            return None
+        try:
+            os.utime(path)                   # LRU touch
+        except OSError:
+            pass
+        _remember(key, created, copy.deepcopy(result), seconds)
+        _hit(key, seconds, False)
+    return result
+
+
+def store(key: str, result: dict, seconds: float, model: str = "", prompt_version: str = ""):
+    """Add a fresh answer to the cache, then evict to the cap."""
+    global _TOTAL
+    created = time.time()
+    path = _entry_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump({"result": result, "created": created, "model": model, "prompt": prompt_version,
+                   "seconds": round(seconds, 4)}, fh)
+    os.replace(tmp, path)
+
+    with _LOCK:
+        _STATS["stores"] += 1
+        _remember(key, created, copy.deepcopy(result), seconds)
+        _load_index()
+        _TOTAL -= _INDEX.pop(key, 0)
+        _INDEX[key] = os.path.getsize(path)
+        _TOTAL += _INDEX[key]
+        while _TOTAL > AppConfig.LLM_CACHE_MAX_BYTES and len(_INDEX) > 1:
+            old = next(iter(_INDEX))
+            _STATS["evictions"] += 1
+            _drop(old)
+
+
+def stats() -> dict:
+    with _LOCK:
+        _load_index()
+        out = dict(_STATS)
+        out["entries"] = len(_INDEX)
+        out["memory_entries"] = len(_MEMO)
+        out["bytes"] = _TOTAL
+        out["max_bytes"] = AppConfig.LLM_CACHE_MAX_BYTES
+        out["ttl_seconds"] = AppConfig.LLM_CACHE_TTL
+    lookups = out["hits"] + out["misses"]
+    out["hit_ratio"] = round(out["hits"] / lookups, 4) if lookups else 0.0
+    out["saved_seconds"] = round(out["saved_seconds"], 3)
+    return out
@@ -0,0 +1,735 @@
+"""
+services/ooxml_fill.py
+----------------------
+Native OOXML fill engine (no Word; runs in-process on any OS).
+
+Pipelines/Functions:
+- fill_and_export(docx_template, full_docx_template, mapping, out_dir, out_basename, export_docx=True)
+    Same contract as services.word_fill.fill_and_export: splice the mapping into the
+    compiled FillPlan -> write DOCX -> convert to PDF -> return paths.
+
+- compile_fill_plan(docx_template, full_docx_template) / get_fill_plan(...)
+    Parse both templates once, put the single page over page 3 of the full template
+    (services.docx_splice: styles/numbering/rels it needs are merged), and record the byte offsets of cc_2, every glyph_r*_c* box and every tagged content
+    control in the serialized XML.
+- FillPlan.render(mapping): DOCX bytes from pre-deflated segments (no XML parsing per fill);
+    mapping["fields"] {tag: value} (services.form_fields) goes through the plan's tag index,
+    built after the splice (page 3 tags come from the single page); tags it lacks raise FieldTagError
+- _export_spliced(...): AppConfig.PAGE_SPLICE path (one page converted per row, services.pdf_splice)
+
+- _read_xml(docx_path, part): parse one zip part
+- _cell(tbl, row, col): locate a w:tc by 1-based row/col (same numbering as Word's Table.Cell)
+- _set_dropdown_value(sdt, value): choose a list entry by display text / value
+- _set_control_text / _set_checkbox / _set_date: the other content-control types
+- _set_device_cell_tick(tc, checked): write ☐/☒ (U+2610/U+2612)
+- _docx_to_pdf(docx_path, pdf_path): headless LibreOffice conversion (Word is not available;
+    services.soffice_pool)
+"""
+
+import calendar
+import io
+import os
+import re
+import struct
+import threading
+import zipfile
+import zlib
+from copy import deepcopy
+
+from config import AppConfig
+from services.cc_index import get_xml_index, xml_control, xml_controls
+from services.docx_splice import DocxParts, import_blocks, page_spans, replace_page_blocks
+from services.form_fields import check_tags, is_checked, normalize_fields
+from services.pdf_splice import splice_page, template_pdf
+from services.soffice_pool import docx_to_pdf
+from services.tick_grid import GLYPH_BITS, TickGrid
+from services.storage import relpath_from_output
+
+try:
+    from lxml import etree
+except Exception:
+    etree = None
+
+DOCUMENT_PART = "word/document.xml"
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W14_NS = "http://schemas.microsoft.com/office/word/2010/wordml"
+W15_NS = "http://schemas.microsoft.com/office/word/2012/wordml"
+NS = {"w": W_NS, "w14": W14_NS, "w15": W15_NS}
+
+CHECKED_CHAR = "☒"          # U+2612: box with X  (required)
+UNCHECKED_CHAR = "☐"        # U+2610: empty box
+
+
+def _w(tag: str) -> str:
+    return f"{{{W_NS}}}{tag}"
+
+
+def _w14(tag: str) -> str:
+    return f"{{{W14_NS}}}{tag}"
+
+
+def _require_lxml():
+    if etree is None:
+        raise RuntimeError("lxml not installed. pip install lxml")
+
+
+def _read_xml(docx_path: str, part: str = DOCUMENT_PART):
+    _require_lxml()
+    with zipfile.ZipFile(docx_path) as z:
+        return etree.fromstring(z.read(part))
+
+
+def _serialize(root) -> bytes:
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+def _cell(tbl, row: int, col: int):
+    rows = tbl.findall("w:tr", NS)
+    if row < 1 or row > len(rows):
+        return None
+    cells = rows[row - 1].findall("w:tc", NS)
+    if col < 1 or col > len(cells):
+        return None
+    return cells[col - 1]
+
+
+def _set_control_text(sdt, text: str):
+    """
+    Replace a content control's shown text (placeholder or not) with `text`: inline controls
+    get a single run carrying the control's own rPr; block/cell controls keep their first
+    paragraph (and its pPr) and get that run in place of its runs.
+    """
+    pr = sdt.find("w:sdtPr", NS)
+    content = sdt.find("w:sdtContent", NS)
+    if pr is None or content is None:
+        return
+    placeholder = pr.find("w:showingPlcHdr", NS)
+    if placeholder is not None:
+        pr.remove(placeholder)
+
+    para = content.find(".//w:p", NS)
+    host = content if para is None else para
+    for child in list(host):
+        if child.tag != _w("pPr"):
+            host.remove(child)
+    run = etree.SubElement(host, _w("r"))
+    rpr = pr.find("w:rPr", NS)
+    if rpr is not None:
+        run.append(deepcopy(rpr))
+    t = etree.SubElement(run, _w("t"))
+    t.text = text
+    if text != text.strip():
+        t.set("{http://www.w3.org/XML/1998/namespace}space", "preserve")
+
+
+def _set_dropdown_value(sdt, value: str | None):
+    """
+    Select an entry in a dropDownList/comboBox content control by its display text or value.
+    The placeholder runs are replaced by a single run carrying the control's own rPr.
+    If value is None (placeholder) or not a list entry, we leave it untouched.
+    """
+    if sdt is None or not value:
+        return
+    pr = sdt.find("w:sdtPr", NS)
+    if pr is None or sdt.find("w:sdtContent", NS) is None:
+        return
+
+    display = None
+    for item in pr.xpath("w:dropDownList/w:listItem | w:comboBox/w:listItem", namespaces=NS):
+        if value in (item.get(_w("displayText")), item.get(_w("value"))):
+            display = item.get(_w("displayText")) or item.get(_w("value"))
+            break
+    if display is None:
+        return
+    _set_control_text(sdt, display)
+
+
+def _set_checkbox(sdt, checked: bool):
+    """w14 checkbox control: set w14:checked and swap the shown box for the state's glyph."""
+    box = sdt.find("w:sdtPr/w14:checkbox", NS)
+    if box is None:
+        return
+    state = box.find("w14:checked", NS)
+    if state is None:
+        state = etree.SubElement(box, _w14("checked"))
+    state.set(_w14("val"), "1" if checked else "0")
+
+    glyphs = {}
+    for name, default in (("checkedState", CHECKED_CHAR), ("uncheckedState", UNCHECKED_CHAR)):
+        el = box.find(f"w14:{name}", NS)
+        glyphs[name] = chr(int(el.get(_w14("val")), 16)) if el is not None and el.get(_w14("val")) else default
+    new = glyphs["checkedState" if checked else "uncheckedState"]
+    boxes = set(_BOX_CHARS) | set(glyphs.values())
+    for t in sdt.findall("w:sdtContent//w:t", NS):
+        text = t.text or ""
+        i = next((i for i, ch in enumerate(text) if ch in boxes), None)
+        if i is not None:
+            t.text = text[:i] + new + text[i + 1:]
+            return
+
+
+def _set_date(sdt, iso: str, display: str):
+    _set_control_text(sdt, display)
+    date = sdt.find("w:sdtPr/w:date", NS)
+    if date is not None:
+        date.set(_w("fullDate"), f"{iso}T00:00:00Z")
+
+
+def _control_kind(sdt) -> str | None:
+    """checkbox | dropdown | combobox | date | text (plain or rich text); None for other types."""
+    pr = sdt.find("w:sdtPr", NS)
+    if pr is None:
+        return None
+    for path, kind in (("w14:checkbox", "checkbox"), ("w:dropDownList", "dropdown"),
+                       ("w:comboBox", "combobox"), ("w:date", "date")):
+        if pr.find(path, NS) is not None:
+            return kind
+    if pr.xpath("w:picture | w:docPartObj | w:docPartList | w:group | w:citation | w:bibliography"
+                " | w:equation | w15:repeatingSection | w15:repeatingSectionItem", namespaces=NS):
+        return None
+    return "text"
+
+
+def _format_date(iso: str, fmt: str | None) -> str:
+    """YYYY-MM-DD shown with the control's w:dateFormat (numeric/month-name tokens only)."""
+    y, m, d = (int(x) for x in iso.split("-"))
+    if not fmt:
+        return iso
+    tokens = {
+        "yyyy": f"{y:04d}", "yy": f"{y % 100:02d}",
+        "MMMM": calendar.month_name[m], "MMM": calendar.month_abbr[m], "MM": f"{m:02d}", "M": str(m),
+        "dd": f"{d:02d}", "d": str(d),
+    }
+    return re.sub(r"yyyy|yy|MMMM|MMM|MM|M|dd|d", lambda mt: tokens[mt.group(0)], fmt)
+
+
+def _set_device_cell_tick(tc, checked: bool):
+    """
+    Replace the first ballot box with ☒ when checked, else ensure ☐.
+    Mirrors services.word_fill._set_device_cell_tick, but on the cell's w:t nodes.
+    """
+    if tc is None:
+        return
+    texts = tc.findall(".//w:t", NS)
+    if not texts:
+        return
+
+    if checked:
+        for t in texts:
+            if t.text and CHECKED_CHAR in t.text:
+                return
+        for old in ("☑", UNCHECKED_CHAR):
+            for t in texts:
+                if t.text and old in t.text:
+                    t.text = t.text.replace(old, CHECKED_CHAR, 1)
+                    return
+        texts[0].text = CHECKED_CHAR + (texts[0].text or "")
+    else:
+        for t in texts:
+            if t.text:
+                t.text = t.text.replace(CHECKED_CHAR, UNCHECKED_CHAR).replace("☑", UNCHECKED_CHAR)
+
+
+def _docx_to_pdf(docx_path: str, pdf_path: str):
+    """
+    Convert DOCX -> PDF with headless LibreOffice (services.soffice_pool: pooled listeners
+    with SOFFICE_POOL_SIZE > 0, else one soffice process per call).
+    """
+    docx_to_pdf(docx_path, pdf_path)
+
+
+# ---------------------------
+# Compiled fill plan
+# ---------------------------
+DROPDOWN_CELL = (2, 2)                                           # cc_2 at Table(1), Row(2), Col(2)
+GLYPH_CELLS = [(r, c) for r in range(16, 21) for c in range(2, 6)]  # glyph_r16_c2 .. glyph_r20_c5
+
+_BOX_CHARS = (UNCHECKED_CHAR, CHECKED_CHAR, "☑")
+_SLOT_MARK = "fill-slot:{}"
+_DEFLATE_LEVEL = 6
+
+# free-text / date variants are serialized once with these sentinels and filled per render
+_FILL_TEXT = "\ue000fill-text\ue000".encode("utf-8")
+_FILL_DATE = b"0000-00-00"
+_TEXT_KEY, _DATE_KEY = "text", "date"
+_ISO_DATE = re.compile(r"\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])")
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+_PLANS: dict = {}
+_PLANS_LOCK = threading.Lock()
+
+
+def _deflate_chunk(data: bytes) -> bytes:
+    """
+    Raw-deflate `data` and end on a byte boundary (Z_SYNC_FLUSH) without the final-block bit,
+    so independently compressed chunks can be concatenated into one valid deflate stream.
+    """
+    c = zlib.compressobj(_DEFLATE_LEVEL, zlib.DEFLATED, -15)
+    return c.compress(data) + c.flush(zlib.Z_SYNC_FLUSH)
+
+
+def _dos_datetime(date_time) -> tuple[int, int]:
+    y, mo, d, h, mi, s = date_time
+    return (h << 11) | (mi << 5) | (s // 2), ((y - 1980) << 9) | (mo << 5) | d
+
+
+class FillPlan:
+    """
+    Pre-serialized word/document.xml of the full template with page 3 already replaced,
+    plus the byte offsets of every spot a fill changes: cc_2, the glyph_r*_c* boxes and
+    every tagged content control (services.form_fields).
+
+    Every static segment and every slot variant is pre-deflated, and all other DOCX parts
+    are pre-zipped, so render() only joins bytes and writes one ZIP entry header. Slots
+    left at their template state are part of one precomputed chain, so a render does work
+    for the slots the mapping sets, not for every control in the document.
+    """
+
+    def __init__(self, source_xml: bytes, offsets: list[tuple[int, str]], variants: dict, zip_parts: dict,
+                 kinds: dict | None = None, tags: dict | None = None, replaced=()):
+        self.offsets = offsets          # [(byte offset in source_xml, slot id)], ascending
+        self.variants = variants        # slot id -> {None (template) | value | template key: serialized bytes}
+        self.kinds = kinds or {}        # slot id -> list | glyph | checkbox | dropdown | combobox | date | text
+        self.tags = tags or {}          # w:tag -> [slot ids]
+        self.replaced = frozenset(replaced)  # tags of the full template's page 3 not in the plan
+        self._index = {slot: i for i, (_off, slot) in enumerate(offsets)}
+        # glyph boxes the template itself has ticked: cleared unless the mapping ticks them
+        self._preticked = [slot for slot, kind in self.kinds.items()
+                           if kind == "glyph" and variants[slot][None] != variants[slot][False]]
+        self._deflated = {
+            slot: {key: (raw, _deflate_chunk(raw)) for key, raw in opts.items() if not isinstance(key, tuple)}
+            for slot, opts in variants.items()
+        }
+        # seg 0, template slot 0, seg 1, template slot 1, ..., seg n
+        self._chain = []
+        prev = 0
+        for off, slot in offsets:
+            seg = source_xml[prev:off]
+            self._chain.append((seg, _deflate_chunk(seg)))
+            self._chain.append(self._deflated[slot][None])
+            prev = off
+        tail = source_xml[prev:]
+        self._chain.append((tail, _deflate_chunk(tail)))
+        self._zip = zip_parts
+
+    def _variant(self, slot: str, value):
+        """(raw, deflated) for `slot` set to `value`, or None to keep the template state."""
+        kind = self.kinds.get(slot, "list")
+        if kind in ("glyph", "checkbox"):
+            return self._deflated[slot].get(is_checked(value))
+        value = str(value)
+        piece = self._deflated[slot].get(value)
+        if piece is not None or kind in ("list", "dropdown"):
+            return piece
+
+        opts = self.variants[slot]
+        raw = None
+        if kind == "date" and _ISO_DATE.fullmatch(value) and (_DATE_KEY,) in opts:
+            fmt = opts[(_DATE_KEY,)]
+            raw = opts[(_DATE_KEY, "xml")].replace(_FILL_DATE, value.encode("ascii")).replace(
+                _FILL_TEXT, _xml_text(_format_date(value, fmt)))
+        elif (_TEXT_KEY,) in opts:
+            raw = opts[(_TEXT_KEY,)].replace(_FILL_TEXT, _xml_text(value))
+        return (raw, _deflate_chunk(raw)) if raw is not None else None
+
+    def _pieces(self, mapping: dict):
+        chosen = {}       # slot position -> (raw, deflated)
+
+        def choose(slot, value):
+            i = self._index.get(slot)
+            if i is not None:
+                piece = self._variant(slot, value)
+                if piece is not None:
+                    chosen[i] = piece
+
+        level = mapping.get("projectLevel")
+        if level:
+            choose("cc_2", level)
+        # an unticked empty box keeps the template bytes (identical to the False variant)
+        ticked = TickGrid.coerce(mapping.get("ticks")).glyph_ids()
+        for glyph_id in ticked:
+            choose(glyph_id, True)
+        for slot in self._preticked:
+            if slot not in ticked:
+                choose(slot, False)
+        fields = normalize_fields(mapping.get("fields"))
+        check_tags(fields, self.tags, self.replaced)
+        for tag, value in fields.items():
+            for slot in self.tags[tag]:
+                choose(slot, value)
+
+        pieces, prev = [], 0
+        for i in sorted(chosen):
+            pieces.extend(self._chain[prev:2 * i + 1])
+            pieces.append(chosen[i])
+            prev = 2 * i + 2
+        pieces.extend(self._chain[prev:])
+        return pieces
+
+    def render_xml(self, mapping: dict) -> bytes:
+        """Filled word/document.xml for `mapping` (same mapping shape as fill_and_export)."""
+        return b"".join(raw for raw, _ in self._pieces(mapping))
+
+    def render(self, mapping: dict) -> bytes:
+        """Complete DOCX bytes for `mapping`."""
+        crc, usize, chunks = 0, 0, []
+        for raw, comp in self._pieces(mapping):
+            crc = zlib.crc32(raw, crc)
+            usize += len(raw)
+            chunks.append(comp)
+        chunks.append(b"\x03\x00")      # empty final deflate block
+        data = b"".join(chunks)
+
+        z = self._zip
+        name = DOCUMENT_PART.encode("ascii")
+        dos_time, dos_date = z["dos_datetime"]
+        local = struct.pack(
+            zipfile.structFileHeader, zipfile.stringFileHeader, 20, 0, 0, zipfile.ZIP_DEFLATED,
+            dos_time, dos_date, crc, len(data), usize, len(name), 0,
+        ) + name
+        central = struct.pack(
+            zipfile.structCentralDir, zipfile.stringCentralDir, 20, 0, 20, 0, 0, zipfile.ZIP_DEFLATED,
+            dos_time, dos_date, crc, len(data), usize, len(name), 0, 0, 0, 0, 0, len(z["locals"]),
+        ) + name
+        cdir = z["central"] + central
+        end = struct.pack(
+            zipfile.structEndArchive, zipfile.stringEndArchive, 0, 0,
+            z["count"] + 1, z["count"] + 1, len(cdir), len(z["locals"]) + len(local) + len(data), 0,
+        )
+        return b"".join((z["locals"], local, data, cdir, end))
+
+
+def _zip_without_document(src_docx: str, parts: DocxParts | None = None) -> dict:
+    """
+    Zip every part except word/document.xml once; render() appends document.xml last.
+    `parts` (the full template after the page-3 import) overrides the file's contents.
+    Returns the local-records blob, the central-directory records and the entry count.
+    """
+    if parts is None:
+        parts = DocxParts(src_docx)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zout:
+        infos = list(parts.infos.values())
+        for info in infos:
+            if info.filename != DOCUMENT_PART:
+                zout.writestr(info, parts.part(info.filename))
+        locals_end = buf.tell()
+        date_time = parts.infos[DOCUMENT_PART].date_time
+    blob = buf.getvalue()
+    return {
+        "locals": blob[:locals_end],
+        "central": blob[locals_end:-zipfile.sizeEndCentDir],
+        "count": len(infos) - 1,
+        "dos_datetime": _dos_datetime(date_time),
+    }
+
+
+def _xml_text(value: str) -> bytes:
+    """Character data as lxml serializes it (control characters are not allowed in XML)."""
+    value = _XML_INVALID.sub("", value)
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").encode("utf-8")
+
+
+def _tag_options(sdt, kind: str) -> dict:
+    """
+    Variants of a tagged control, keyed like FillPlan.variants: None (template), True/False
+    for checkboxes, each list entry, and sentinel templates for free text and dates.
+    """
+    options = {None: sdt}
+    if kind == "checkbox":
+        for checked in (False, True):
+            probe = deepcopy(sdt)
+            _set_checkbox(probe, checked)
+            options[checked] = probe
+        return options
+
+    if kind in ("dropdown", "combobox"):
+        for value in sdt.xpath("w:sdtPr/*/w:listItem/@w:displayText | w:sdtPr/*/w:listItem/@w:value",
+                               namespaces=NS):
+            probe = deepcopy(sdt)
+            _set_dropdown_value(probe, str(value))
+            options[str(value)] = probe
+    if kind in ("combobox", "date", "text"):
+        probe = deepcopy(sdt)
+        _set_control_text(probe, _FILL_TEXT.decode("utf-8"))
+        options[(_TEXT_KEY,)] = probe
+    if kind == "date":
+        probe = deepcopy(sdt)
+        _set_date(probe, _FILL_DATE.decode("ascii"), _FILL_TEXT.decode("utf-8"))
+        options[(_DATE_KEY, "xml")] = probe
+    return options
+
+
+def _serialize_variants(full, slots: dict) -> dict:
+    """
+    Serialize every slot variant in context (same namespaces/escaping as the rest of the
+    part): in each round one variant per slot is put where its marker is, bracketed by
+    comments, the document is serialized once and each variant's bytes are cut out.
+    slots: slot id -> (marker, {key: element | text}); returns slot id -> {key: bytes}.
+    """
+    serialized = {slot: {} for slot in slots}
+    pending = {slot: list(options.items()) for slot, (_marker, options) in slots.items()}
+    while any(pending.values()):
+        placed = {}
+        for slot, items in pending.items():
+            if not items:
+                continue
+            key, opt = items.pop()
+            marker = slots[slot][0]
+            begin = etree.Comment(f"fill-b:{slot}")
+            end = etree.Comment(f"fill-e:{slot}")
+            if isinstance(opt, str):                   # text of a w:t (glyph slots)
+                owner = marker.getparent()
+                owner.remove(marker)
+                owner.append(begin)
+                begin.tail = opt
+                owner.append(end)
+            else:
+                end.tail, marker.tail = marker.tail, None
+                marker.getparent().replace(marker, begin)
+                begin.addnext(opt)
+                opt.tail = None
+                opt.addnext(end)
+            placed[slot] = (key, opt, begin, end)
+
+        probe = _serialize(full)
+        for m in re.finditer(rb"<!--fill-b:([\w.:-]+?)-->(.*?)<!--fill-e:\1-->", probe, re.S):
+            slot = m.group(1).decode("ascii")
+            serialized[slot][placed[slot][0]] = m.group(2)
+
+        for slot, (_key, opt, begin, end) in placed.items():
+            marker = slots[slot][0]
+            owner = begin.getparent()
+            if isinstance(opt, str):
+                owner.remove(begin)
+                owner.remove(end)
+                owner.text = None
+                owner.append(marker)
+            else:
+                marker.tail, end.tail = end.tail, None
+                owner.replace(begin, marker)
+                owner.remove(opt)
+                owner.remove(end)
+    return serialized
+
+
+def compile_fill_plan(docx_template: str, full_docx_template: str | None) -> FillPlan:
+    """
+    Parse both templates once, splice the single page over page 3, and record where
+    the cc_2 dropdown, each device glyph and each tagged control sit in the serialized XML.
+    Without a full template the plan renders the single-page template itself.
+    Tags are indexed after the splice, so page 3 carries the single page's tags; the
+    ones only the replaced page had are kept in FillPlan.replaced for the error message.
+    """
+    page_parts = DocxParts(docx_template)
+    page = page_parts.xml(DOCUMENT_PART)
+    tbl = page.find(".//w:tbl", NS)
+    if tbl is None:
+        raise RuntimeError(f"No table found in {docx_template}")
+
+    # Resolve controls while `page` is still its own document (the splice moves its elements)
+    index = get_xml_index(docx_template, root=page)
+    sdt = xml_control(xml_controls(page), index, cell=(1, *DROPDOWN_CELL))
+
+    parts = page_parts
+    replaced = set()
+    if full_docx_template:
+        parts = DocxParts(full_docx_template)
+        body = parts.xml(DOCUMENT_PART).find("w:body", NS)
+        spans = page_spans(body)
+        if len(spans) >= 3:
+            start, end = spans[2]
+            replaced = {t.get(_w("val")) for el in list(body)[start:end] for t in el.iter(_w("tag"))}
+        blocks = [el for el in page.find("w:body", NS) if el.tag != _w("sectPr")]
+        full = import_blocks(parts, page_parts, blocks)
+        replace_page_blocks(full, blocks)        # moves the page elements into `full`
+    else:
+        full = page                               # single-page plan (PAGE_SPLICE)
+
+    # Replace each slot with a comment marker; variants are serialized in place later.
+    slots = {}        # slot id -> (marker comment, {key: element swapped out | w:t text})
+    kinds = {}
+    tags = {}
+
+    def tag_of(el):
+        tag_el = el.find("w:sdtPr/w:tag", NS)
+        return tag_el.get(_w("val")) if tag_el is not None else None
+
+    if sdt is not None:
+        marker = etree.Comment(_SLOT_MARK.format("cc_2"))
+        marker.tail = sdt.tail
+        sdt.getparent().replace(sdt, marker)
+        options = {None: sdt}
+        values = sdt.xpath(
+            "w:sdtPr/w:dropDownList/w:listItem/@w:displayText | w:sdtPr/w:dropDownList/w:listItem/@w:value"
+            " | w:sdtPr/w:comboBox/w:listItem/@w:displayText | w:sdtPr/w:comboBox/w:listItem/@w:value",
+            namespaces=NS,
+        )
+        for value in values:
+            filled = deepcopy(sdt)
+            _set_dropdown_value(filled, str(value))
+            options[str(value)] = filled
+        slots["cc_2"] = (marker, options)
+        kinds["cc_2"] = "list"
+        if tag_of(sdt):
+            tags.setdefault(tag_of(sdt), []).append("cc_2")
+
+    for row, col in GLYPH_CELLS:
+        tc = _cell(tbl, row, col)
+        texts = tc.findall(".//w:t", NS) if tc is not None else []
+        t = next((x for x in texts if x.text and any(b in x.text for b in _BOX_CHARS)), None)
+        if t is None:
+            continue
+        slot = f"glyph_r{row}_c{col}"
+        options = {None: t.text}
+        for checked in (False, True):
+            probe = deepcopy(tc)
+            _set_device_cell_tick(probe, checked)
+            options[checked] = probe.findall(".//w:t", NS)[texts.index(t)].text
+        marker = etree.Comment(_SLOT_MARK.format(slot))
+        t.text = None
+        t.append(marker)
+        slots[slot] = (marker, options)
+        kinds[slot] = "glyph"
+
+    # Tagged controls: a control already holding a slot above (e.g. a checkbox wrapping a
+    # glyph cell) is filled through that slot; containers of other controls are skipped.
+    tagged = []
+    for n, el in enumerate(xml_controls(full), 1):
+        tag = tag_of(el)
+        if not tag:
+            continue
+        inner = el.xpath(".//comment()[starts-with(., 'fill-slot:')]")
+        if inner:
+            tags.setdefault(tag, []).append(inner[0].text.split(":", 1)[1])
+            continue
+        kind = _control_kind(el)
+        if kind is None or el.find(".//w:sdt", NS) is not None:
+            continue
+        tagged.append((f"sdt_{n}", tag, kind, el))
+    for slot, tag, kind, el in tagged:
+        marker = etree.Comment(_SLOT_MARK.format(slot))
+        marker.tail = el.tail
+        el.getparent().replace(el, marker)
+        slots[slot] = (marker, _tag_options(el, kind))
+        kinds[slot] = kind
+        tags.setdefault(tag, []).append(slot)
+
+    # Serialize once with markers, then cut them out and remember their offsets.
+    marked = _serialize(full)
+    found = sorted(
+        (marked.index(f"<!--{_SLOT_MARK.format(slot)}-->".encode("ascii")), slot) for slot in slots
+    )
+    source, offsets, prev, removed = [], [], 0, 0
+    for pos, slot in found:
+        mark_len = len(f"<!--{_SLOT_MARK.format(slot)}-->".encode("ascii"))
+        source.append(marked[prev:pos])
+        offsets.append((pos - removed, slot))
+        prev = pos + mark_len
+        removed += mark_len
+    source.append(marked[prev:])
+    source_xml = b"".join(source)
+
+    serialized = _serialize_variants(full, slots)
+    for slot, (_marker, options) in slots.items():
+        if (_DATE_KEY, "xml") in options:
+            fmt = options[None].find("w:sdtPr/w:date/w:dateFormat", NS)
+            serialized[slot][(_DATE_KEY,)] = fmt.get(_w("val")) if fmt is not None else None
+
+    return FillPlan(source_xml, offsets, serialized, _zip_without_document(full_docx_template or docx_template, parts),
+                    kinds, tags, replaced - set(tags))
+
+
+def get_fill_plan(docx_template: str, full_docx_template: str | None) -> FillPlan:
+    """
+    Cached compile_fill_plan(); recompiled when either template file changes on disk.
+    """
+    key = tuple(
+        (os.path.abspath(p), os.path.getmtime(p), os.path.getsize(p))
+        for p in (docx_template, full_docx_template) if p
+    )
+    with _PLANS_LOCK:
+        plan = _PLANS.get(key)
+        if plan is None:
+            plan = compile_fill_plan(docx_template, full_docx_template)
+            paths = tuple(k[0] for k in key)
+            for stale in [k for k in _PLANS if tuple(p[0] for p in k) == paths]:
+                del _PLANS[stale]
+            _PLANS[key] = plan
+    return plan
+
+
+def _export_spliced(docx_template: str, full_docx_template: str, mapping: dict, out_dir: str,
+                    out_basename: str, abs_docx: str | None, abs_pdf: str):
+    """
+    PAGE_SPLICE: convert only the filled single page, then splice it in as page 3 of the
+    cached full-template PDF (services.pdf_splice). The full DOCX is still written when asked.
+    """
+    base_pdf = template_pdf(full_docx_template, "ooxml", lambda pdf: _docx_to_pdf(full_docx_template, pdf))
+
+    page_docx = os.path.join(out_dir, f".{out_basename}.page.docx")
+    page_pdf = os.path.join(out_dir, f".{out_basename}.page.pdf")
+    with open(page_docx, "wb") as fh:
+        fh.write(get_fill_plan(docx_template, None).render(mapping))
+    try:
+        _docx_to_pdf(page_docx, page_pdf)
+        splice_page(base_pdf, page_pdf, abs_pdf)
+    finally:
+        for tmp in (page_docx, page_pdf):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    if abs_docx:
+        with open(abs_docx, "wb") as fh:
+            fh.write(get_fill_plan(docx_template, full_docx_template).render(mapping))
+
+
+def fill_and_export(
+    docx_template: str,
+    full_docx_template: str,
+    mapping: dict,
+    out_dir: str,
+    out_basename: str,
+    export_docx: bool = True
+) -> dict:
+    """
+    OOXML counterpart of services.word_fill.fill_and_export (same arguments, same result keys).
+
+    mapping example:
+    {
+      "projectLevel": "L2",         # or None for placeholder
+      "ticks": { "glyph_r16_c2": true, ... },  # may include r16..r20
+      "fields": { "capa_associated_select_one_combo": "Yes", ... }  # optional, by tag
+    }
+
+    The templates are compiled once into a FillPlan; each call only splices the
+    pre-serialized bytes and writes the DOCX.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    abs_docx = os.path.join(out_dir, f"{out_basename}.docx")
+    abs_pdf  = os.path.join(out_dir, f"{out_basename}.pdf")
+
+    # tag fields may sit on any page, so they need the full-document render
+    if AppConfig.PAGE_SPLICE and not mapping.get("fields"):
+        _export_spliced(docx_template, full_docx_template, mapping, out_dir, out_basename,
+                        abs_docx if export_docx else None, abs_pdf)
+    else:
+        plan = get_fill_plan(docx_template, full_docx_template)
+
+        # DOCX is always needed as the PDF source
+        docx_path = abs_docx if export_docx else os.path.join(out_dir, f".{out_basename}.tmp.docx")
+        with open(docx_path, "wb") as fh:
+            fh.write(plan.render(mapping))
+        try:
+            _docx_to_pdf(docx_path, abs_pdf)
+        finally:
+            if not export_docx and os.path.exists(docx_path):
+                os.remove(docx_path)
+
+    rel_pdf = relpath_from_output(abs_pdf)
+    result = {"rel_pdf_path": rel_pdf}
+    if export_docx:
+        rel_docx = relpath_from_output(abs_docx)
+        result["rel_docx_path"] = rel_docx
+    return result
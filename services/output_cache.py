@@ -0,0 +1,194 @@
+"""
+services/output_cache.py
+------------------------
+Content-addressed cache of filled outputs (PDF/DOCX).
+
+Key = sha256(template file digests, backend, normalized mapping). Distinct mappings are few
+(a handful of project levels x 20 ticks) and batches repeat them, so a hit replaces a
+whole Word/engine run with a hard link (or copy) into the batch folder.
+
+Layout: OUTPUT_CACHE_DIR/<key[:2]>/<key>.pdf|.docx|.json (json = render seconds, for stats)
+Eviction: least-recently-used (file mtime, touched on every hit) once the total size
+exceeds OUTPUT_CACHE_MAX_BYTES.
+
+Functions:
+- normalize_mapping(mapping): canonical form used for hashing
+- file_digest(path): sha256 of a file (memoized per path + mtime + size)
+- cache_key(backend, template_paths, mapping)
+- lookup(key, out_dir, out_basename, export_docx) -> result dict | None
+- store(key, result, seconds)
+- stats(): hits / misses / stores / evictions / saved_seconds / bytes
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from config import AppConfig
+from services.form_fields import normalize_fields
+from services.storage import link_or_copy, relpath_from_output
+from services.tick_grid import TickGrid
+from services.validation import normalize_project_level
+
+_EXTS = (".pdf", ".docx", ".json")
+
+_LOCK = threading.Lock()
+_DIGESTS: dict = {}          # (path, mtime, size) -> sha256 hex
+_INDEX = None                # OrderedDict key -> bytes, oldest first
+_TOTAL = 0
+_STATS = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "saved_seconds": 0.0}
+
+
+def file_digest(path: str) -> str:
+    st = os.stat(path)
+    fkey = (os.path.abspath(path), st.st_mtime, st.st_size)
+    with _LOCK:
+        digest = _DIGESTS.get(fkey)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with _LOCK:
+            _DIGESTS[fkey] = digest
+    return digest
+
+
+def normalize_mapping(mapping: dict) -> dict:
+    """
+    Canonical mapping: unknown project levels behave like the placeholder, the ticks
+    (dict or TickGrid) become their 20-bit integer, and tag fields (services.form_fields)
+    appear only when some are set, so field-less mappings keep their keys.
+    """
+    out = {
+        "projectLevel": normalize_project_level(mapping.get("projectLevel")),
+        "ticks": TickGrid.coerce(mapping.get("ticks")).bits,
+    }
+    fields = normalize_fields(mapping.get("fields"))
+    if fields:
+        out["fields"] = fields
+    return out
+
+
+def cache_key(backend: str, template_paths, mapping: dict) -> str:
+    payload = {
+        "backend": backend,
+        "templates": [file_digest(p) for p in template_paths],
+        "mapping": normalize_mapping(mapping),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _entry_base(key: str) -> str:
+    return os.path.join(AppConfig.OUTPUT_CACHE_DIR, key[:2], key)
+
+
+def _entry_size(base: str) -> int:
+    return sum(os.path.getsize(base + ext) for ext in _EXTS if os.path.exists(base + ext))
+
+
+def _load_index():
+    """Scan the cache dir once per process (oldest mtime first)."""
+    global _INDEX, _TOTAL
+    if _INDEX is not None:
+        return
+    entries = []
+    root = AppConfig.OUTPUT_CACHE_DIR
+    if os.path.isdir(root):
+        for sub in os.listdir(root):
+            d = os.path.join(root, sub)
+            if not os.path.isdir(d):
+                continue
+            for name in os.listdir(d):
+                if name.endswith(".pdf"):
+                    base = os.path.join(d, name[:-4])
+                    entries.append((os.path.getmtime(base + ".pdf"), name[:-4], _entry_size(base)))
+    entries.sort()
+    _INDEX = OrderedDict((key, size) for _mt, key, size in entries)
+    _TOTAL = sum(_INDEX.values())
+
+
+def lookup(key: str, out_dir: str, out_basename: str, export_docx: bool) -> dict | None:
+    """
+    On a hit, hard-link/copy the cached files to out_dir/<out_basename>.* and return the
+    usual {"rel_pdf_path", "rel_docx_path"} dict; None on a miss.
+    """
+    base = _entry_base(key)
+    need = [".pdf"] + ([".docx"] if export_docx else [])
+    if not all(os.path.exists(base + ext) for ext in need):
+        with _LOCK:
+            _STATS["misses"] += 1
+        return None
+
+    os.makedirs(out_dir, exist_ok=True)
+    result = {}
+    for ext in need:
+        dst = os.path.join(out_dir, f"{out_basename}{ext}")
+        link_or_copy(base + ext, dst)
+        result["rel_pdf_path" if ext == ".pdf" else "rel_docx_path"] = relpath_from_output(dst)
+
+    seconds = 0.0
+    try:
+        with open(base + ".json", "r", encoding="utf-8") as fh:
+            seconds = float(json.load(fh).get("seconds", 0.0))
+    except Exception:
+        pass
+    try:
+        os.utime(base + ".pdf")              # LRU touch
+    except OSError:
+        pass
+    with _LOCK:
+        _STATS["hits"] += 1
+        _STATS["saved_seconds"] += seconds
+        _load_index()
+        if key in _INDEX:
+            _INDEX.move_to_end(key)
+    return result
+
+
+def store(key: str, result: dict, seconds: float):
+    """Add freshly rendered outputs (paths from `result`) to the cache, then evict to the cap."""
+    global _TOTAL
+    base = _entry_base(key)
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    for field, ext in (("rel_docx_path", ".docx"), ("rel_pdf_path", ".pdf")):   # .pdf last: marks entry complete
+        rel = result.get(field)
+        if not rel:
+            continue
+        tmp = f"{base}{ext}.{os.getpid()}.{threading.get_ident()}.tmp"
+        link_or_copy(os.path.join(AppConfig.OUTPUT_DIR, rel), tmp)
+        os.replace(tmp, base + ext)
+    with open(base + ".json", "w", encoding="utf-8") as fh:
+        json.dump({"seconds": round(seconds, 4)}, fh)
+
+    with _LOCK:
+        _STATS["stores"] += 1
+        _load_index()
+        _TOTAL -= _INDEX.pop(key, 0)
+        _INDEX[key] = _entry_size(base)
+        _TOTAL += _INDEX[key]
+        while _TOTAL > AppConfig.OUTPUT_CACHE_MAX_BYTES and len(_INDEX) > 1:
+            old, size = _INDEX.popitem(last=False)
+            _TOTAL -= size
+            _STATS["evictions"] += 1
+            for ext in _EXTS:
+                try:
+                    os.remove(_entry_base(old) + ext)
+                except OSError:
+                    pass
+
+
+def stats() -> dict:
+    with _LOCK:
+        _load_index()
+        out = dict(_STATS)
+        out["entries"] = len(_INDEX)
+        out["bytes"] = _TOTAL
+        out["max_bytes"] = AppConfig.OUTPUT_CACHE_MAX_BYTES
+    lookups = out["hits"] + out["misses"]
+    out["hit_ratio"] = round(out["hits"] / lookups, 4) if lookups else 0.0
+    out["saved_seconds"] = round(out["saved_seconds"], 3)
+    return out
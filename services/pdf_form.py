@@ -0,0 +1,512 @@
+"""
+services/pdf_form.py
+--------------------
+AcroForm backend: the reference template as a fillable PDF form whose fields carry the
+overlay ids (checkboxes glyph_r16_c2 .. glyph_r20_c5, combo box cc_2), filled per row
+without Word and without re-rendering anything.
+
+Form template:
+  AppConfig.FORM_PDF_PATH when set (any AcroForm PDF of the whole document with fields named
+  by those ids, e.g. one exported from the tagged template and adjusted by hand), else
+  generated once per (full template PDF, OVERLAY_MAP_PATH) version into PAGE_CACHE_DIR: the
+  full template PDF (services.pdf_stamp.full_template_pdf) plus one incremental update adding
+  a widget per overlay position on page 3 (same geometry as services.pdf_stamp draws) and
+  the /AcroForm dictionary. Output is therefore the whole document, like com/ooxml.
+
+Per row (FormPlan.render), an incremental update of the form template like the stamp
+backend: only the field objects whose value differs from the template are appended
+(/V + /AS for checkboxes, /V + a prebuilt appearance stream per list entry for cc_2).
+With flatten=True (AppConfig.FORM_FLATTEN) the same appearances are drawn into the page
+content instead and the fields are dropped from /Annots and /AcroForm, so the result is
+a plain PDF that reads the same everywhere. Tag fields (mapping["fields"]) have no
+positions here: a mapping with any raises FieldTagError, as with "stamp".
+
+Pipelines/Functions:
+- fill_and_export(docx_template, full_docx_template, mapping, out_dir, out_basename, export_docx=True)
+    Same contract as the other fill backends; writes the PDF only (no DOCX in this mode).
+- build_form(base_pdf, overlay, first_page=0) -> form PDF bytes
+- form_template(full_docx_template) -> path of the form template in use
+- get_form_plan(form_pdf) -> FormPlan (cached per file version)
+- FormPlan.render(mapping, flatten=False) -> PDF bytes
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+
+from config import AppConfig
+from services.pdf_splice import REPLACE_INDEX
+from services.pdf_stamp import (
+    TICK_CHAR, TICK_SIZE, _pdf_str, _rgb, _serialize, _stream_obj, full_template_pdf, reject_fields,
+)
+from services.storage import relpath_from_output
+from services.tick_grid import GLYPH_BITS, TickGrid
+
+try:
+    from pypdf import PdfReader
+    from pypdf.generic import (
+        ArrayObject, BooleanObject, DictionaryObject, IndirectObject, NameObject, TextStringObject,
+    )
+except Exception:
+    PdfReader = None
+
+DROPDOWN_ID = "cc_2"
+_COMBO_FLAGS = 1 << 17              # /Ff Combo
+_TICK_BOX = 13                      # checkbox widget size (pt); the tick glyph sits at (1, 2)
+_ON, _OFF = "/Yes", "/Off"
+_DA_SIZE = re.compile(rb"([\d.]+)\s+Tf")
+_DA_COLOR = re.compile(rb"([\d.]+\s+[\d.]+\s+[\d.]+)\s+rg")
+
+_PLANS: dict = {}
+_PLANS_LOCK = threading.Lock()
+_BUILD_LOCK = threading.Lock()
+
+
+def _require_pypdf():
+    if PdfReader is None:
+        raise RuntimeError("pypdf not installed. pip install pypdf")
+
+
+def _ref(num: int, gen: int = 0) -> IndirectObject:
+    return IndirectObject(num, gen, None)
+
+
+def _obj(num: int, body: bytes, gen: int = 0) -> bytes:
+    return b"%d %d obj\n%s\nendobj\n" % (num, gen, body)
+
+
+def _xobject(num: int, width: float, height: float, ops: bytes, resources: bytes = b"") -> bytes:
+    return (b"%d 0 obj\n<< /Type /XObject /Subtype /Form /BBox [0 0 %.2f %.2f] /Resources << %s >> /Length %d >>\n"
+            b"stream\n%s\nendstream\nendobj\n" % (num, width, height, resources, len(ops), ops))
+
+
+class _Base:
+    """A base PDF opened for one incremental update: bytes, reader, trailer entries."""
+
+    def __init__(self, path: str):
+        _require_pypdf()
+        with open(path, "rb") as fh:
+            self.data = fh.read()
+        self.reader = PdfReader(io.BytesIO(self.data))
+        m = re.search(rb"startxref\s+(\d+)\s+%%EOF\s*$", self.data[-1024:])
+        if not m:
+            raise RuntimeError(f"Cannot locate startxref in {path}")
+        self.prev_xref = int(m.group(1))
+        trailer = self.reader.trailer
+        self.size = int(trailer["/Size"])
+        tail = b"/Root " + _serialize(trailer.raw_get("/Root"))
+        if "/Info" in trailer:
+            tail += b" /Info " + _serialize(trailer.raw_get("/Info"))
+        if "/ID" in trailer:
+            ids = trailer["/ID"]
+            tail += b" /ID [<%s> <%s>]" % (bytes(ids[0].original_bytes).hex().encode(),
+                                          bytes(ids[1].original_bytes).hex().encode())
+        self.trailer_tail = tail
+
+    def update(self, objs: list[tuple[int, int, bytes]], size: int) -> bytes:
+        """Base bytes + the given (num, gen, serialized object) + xref section."""
+        out = [self.data if self.data.endswith(b"\n") else self.data + b"\n"]
+        pos = len(out[0])
+        offsets = {}
+        for num, gen, data in objs:
+            offsets[num] = (pos, gen)
+            out.append(data)
+            pos += len(data)
+        out.append(b"xref\n")
+        for num in sorted(offsets):
+            off, gen = offsets[num]
+            out.append(b"%d 1\n%010d %05d n \n" % (num, off, gen))
+        out.append(b"trailer\n<< /Size %d %s /Prev %d >>\nstartxref\n%d\n%%%%EOF\n"
+                   % (size, self.trailer_tail, self.prev_xref, pos))
+        return b"".join(out)
+
+
+def _acroform_owner(reader):
+    """(object holding /AcroForm, its reference, the /AcroForm dict, its own reference or None)."""
+    root_ref = reader.trailer.raw_get("/Root")
+    root = root_ref.get_object()
+    raw = root.raw_get("/AcroForm") if "/AcroForm" in root else None
+    if isinstance(raw, IndirectObject):
+        return root, root_ref, raw.get_object(), raw
+    return root, root_ref, (raw if raw is not None else DictionaryObject()), None
+
+
+# ---------------------------
+# Form template
+# ---------------------------
+def build_form(base_pdf: str, overlay: dict, first_page: int = 0) -> bytes:
+    """
+    The base PDF plus one incremental update: a checkbox widget per overlay tick, a combo
+    box per overlay dropdown (entries = overlay values after the placeholder, empty
+    appearance so the printed placeholder shows) and an /AcroForm listing them. Overlay
+    page n goes on page first_page + n of the base PDF (0-based first_page).
+    """
+    base = _Base(base_pdf)
+    reader = base.reader
+    nums = iter(range(base.size, 1 << 30))
+    helv, zapf, on_ap, off_ap = next(nums), next(nums), next(nums), next(nums)
+    objs = [
+        (helv, 0, _obj(helv, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")),
+        (zapf, 0, _obj(zapf, b"<< /Type /Font /Subtype /Type1 /BaseFont /ZapfDingbats >>")),
+        (on_ap, 0, _xobject(on_ap, _TICK_BOX, _TICK_BOX,
+                            b"q BT /ZaDb %d Tf 0 g 1 2 Td (%s) Tj ET Q" % (TICK_SIZE, TICK_CHAR.encode()),
+                            b"/Font << /ZaDb %d 0 R >>" % zapf)),
+        (off_ap, 0, _xobject(off_ap, _TICK_BOX, _TICK_BOX, b"")),
+    ]
+
+    fields = []
+    for key, spec in (overlay.get("pages") or {}).items():
+        page = reader.pages[first_page + int(key) - 1]
+        ref = page.indirect_reference
+        w, h = float(page.mediabox.width), float(page.mediabox.height)
+        x0, y0 = float(page.mediabox.left), float(page.mediabox.bottom)
+
+        def at(nx, ny):
+            return x0 + nx * w, y0 + h - ny * h     # overlay origin is top-left
+
+        widgets = []
+        dd = spec.get("dropdown")
+        if dd:
+            style = (dd.get("styles") or {}).get("selected") or {}
+            size_pt = float(style.get("fontSizePt") or 10)
+            x, y = at(dd["x"], dd["y"])
+            baseline = y - dd.get("h", 0) * h * 0.8
+            values = dd.get("values") or [""]
+            cover_w = max(dd.get("w", 0) * w, len(values[0]) * size_pt * 0.5) + 2
+            box_h = size_pt * 1.3
+            llx, lly = x - 1, baseline - size_pt * 0.3
+            num, blank = next(nums), next(nums)
+            objs.append((blank, 0, _xobject(blank, cover_w, box_h, b"")))
+            opts = b" ".join(_pdf_str(v) for v in values[1:])
+            objs.append((num, 0, _obj(num, (
+                b"<< /Type /Annot /Subtype /Widget /F 4 /P %d %d R /Rect [%.2f %.2f %.2f %.2f]"
+                b" /FT /Ch /Ff %d /T %s /Opt [%s] /DA (/Helv %.1f Tf %s rg) /AP << /N %d 0 R >> >>"
+            ) % (ref.idnum, ref.generation, llx, lly, llx + cover_w, lly + box_h, _COMBO_FLAGS,
+                 _pdf_str(dd.get("id") or DROPDOWN_ID), opts, size_pt, _rgb(style.get("color")).encode(), blank))))
+            widgets.append(num)
+
+        for t in spec.get("ticks") or []:
+            if t["id"] not in GLYPH_BITS:
+                continue
+            x, y = at(t["x"], t["y"])
+            num = next(nums)
+            objs.append((num, 0, _obj(num, (
+                b"<< /Type /Annot /Subtype /Widget /F 4 /P %d %d R /Rect [%.2f %.2f %.2f %.2f]"
+                b" /FT /Btn /T %s /V /Off /AS /Off /MK << /CA (%s) >> /DA (/ZaDb 0 Tf 0 g)"
+                b" /AP << /N << /Yes %d 0 R /Off %d 0 R >> >> >>"
+            ) % (ref.idnum, ref.generation, x - 1, y - 2, x - 1 + _TICK_BOX, y - 2 + _TICK_BOX,
+                 _pdf_str(t["id"]), TICK_CHAR.encode(), on_ap, off_ap))))
+            widgets.append(num)
+
+        annots = page.get("/Annots")
+        annots = list(annots.get_object()) if annots is not None else []
+        new_page = DictionaryObject(page)
+        new_page[NameObject("/Annots")] = ArrayObject(annots + [_ref(n) for n in widgets])
+        objs.append((ref.idnum, ref.generation, _obj(ref.idnum, _serialize(new_page), ref.generation)))
+        fields.extend(widgets)
+
+    # /AcroForm: existing fields + ours, default resources for the field fonts
+    root, root_ref, acro, acro_ref = _acroform_owner(reader)
+    acro = DictionaryObject(acro)
+    acro[NameObject("/Fields")] = ArrayObject(list(acro.get("/Fields", ArrayObject())) + [_ref(n) for n in fields])
+    dr = DictionaryObject()
+    dr[NameObject("/Font")] = DictionaryObject({NameObject("/Helv"): _ref(helv), NameObject("/ZaDb"): _ref(zapf)})
+    acro[NameObject("/DR")] = dr
+    acro[NameObject("/DA")] = TextStringObject("/Helv 0 Tf 0 g")
+    acro[NameObject("/NeedAppearances")] = BooleanObject(False)
+    acro_num = next(nums)
+    objs.append((acro_num, 0, _obj(acro_num, _serialize(acro))))
+    root = DictionaryObject(root)
+    root[NameObject("/AcroForm")] = _ref(acro_num)
+    objs.append((root_ref.idnum, root_ref.generation, _obj(root_ref.idnum, _serialize(root), root_ref.generation)))
+    return base.update(objs, next(nums))
+
+
+def form_template(full_docx_template: str) -> str:
+    """
+    AppConfig.FORM_PDF_PATH, or the form generated from the full template PDF + OVERLAY_MAP_PATH
+    (cached by content hash in PAGE_CACHE_DIR; built on first use per version).
+    """
+    if AppConfig.FORM_PDF_PATH:
+        return AppConfig.FORM_PDF_PATH
+    base_pdf = full_template_pdf(full_docx_template)
+    h = hashlib.sha256()
+    for p in (base_pdf, AppConfig.OVERLAY_MAP_PATH):
+        with open(p, "rb") as fh:
+            h.update(fh.read())
+    path = os.path.join(AppConfig.PAGE_CACHE_DIR, f"{h.hexdigest()[:32]}_form.pdf")
+    if os.path.exists(path):
+        return path
+    with _BUILD_LOCK:
+        if not os.path.exists(path):
+            with open(AppConfig.OVERLAY_MAP_PATH, "r", encoding="utf-8") as fh:
+                overlay = json.load(fh)
+            data = build_form(base_pdf, overlay, REPLACE_INDEX)
+            os.makedirs(AppConfig.PAGE_CACHE_DIR, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+    return path
+
+
+# ---------------------------
+# Filling
+# ---------------------------
+def _terminal_fields(fields, parent_name: str = ""):
+    """(full name, field dict, [widget dicts]) for every terminal field under `fields`."""
+    for ref in fields or []:
+        field = ref.get_object()
+        name = field.get("/T")
+        full = f"{parent_name}.{name}" if parent_name and name else (name or parent_name)
+        kids = field.get("/Kids")
+        if kids and any("/T" in k.get_object() for k in kids):
+            yield from _terminal_fields(kids, full)
+        elif kids:
+            yield full, field, [k.get_object() for k in kids]
+        else:
+            yield full, field, [field]
+
+
+def _rewrite(obj, **entries) -> tuple[int, int, bytes]:
+    ref = obj.indirect_reference
+    new = DictionaryObject(obj)
+    for key, value in entries.items():
+        new[NameObject(f"/{key}")] = value
+    return ref.idnum, ref.generation, _obj(ref.idnum, _serialize(new), ref.generation)
+
+
+def _on_state(widget) -> str:
+    """A checkbox's "on" appearance state name (the /AP /N key that is not /Off)."""
+    ap = widget.get("/AP")
+    states = ap.get_object().get("/N") if ap is not None else None
+    return next((str(k) for k in (states or {}) if k != _OFF), _ON)
+
+
+def _normal_ap(widget, state: str | None = None):
+    """Reference of a widget's normal appearance (for `state` when it has several)."""
+    ap = widget.get("/AP")
+    if ap is None or "/N" not in ap:
+        return None
+    n = ap.get_object().raw_get("/N")
+    if isinstance(n, IndirectObject) and "/BBox" in n.get_object():
+        return n
+    states = n.get_object()
+    return states.raw_get(state) if state and state in states else None
+
+
+def _place(widget, ap_ref, bbox=None) -> tuple | None:
+    """
+    (appearance reference, operators drawing it into the widget's /Rect with its BBox
+    mapped onto the Rect), or None when the widget shows nothing in that state.
+    """
+    if ap_ref is None or (bbox is None and not ap_ref.get_object().get_data().strip()):
+        return None
+    llx, lly, urx, ury = (float(v) for v in widget["/Rect"])
+    bx0, by0, bx1, by1 = bbox or (float(v) for v in ap_ref.get_object()["/BBox"])
+    sx = (urx - llx) / (bx1 - bx0) if bx1 != bx0 else 1.0
+    sy = (ury - lly) / (by1 - by0) if by1 != by0 else 1.0
+    ops = b"q %.4f 0 0 %.4f %.2f %.2f cm /Ff%d Do Q\n" % (sx, sy, llx - bx0 * sx, lly - by0 * sy, ap_ref.idnum)
+    return ap_ref, ops
+
+
+class FormPlan:
+    """
+    Precompiled fills for one form PDF: the serialized field objects for every state
+    (checked/unchecked per glyph, one per cc_2 entry), and for flattening the rewritten
+    pages, the placement operators per state and the /AcroForm without our fields.
+    """
+
+    def __init__(self, form_pdf: str):
+        base = self.base = _Base(form_pdf)
+        reader = base.reader
+        root, root_ref, acro, acro_ref = _acroform_owner(reader)
+        nums = iter(range(base.size, 1 << 30))
+        helv = next(nums)
+        self.static_objs = [(helv, 0, _obj(helv, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica"
+                                                 b" /Encoding /WinAnsiEncoding >>"))]
+
+        # per field: serialized objects for each state, and (widget, _place(...)) per state
+        self.glyphs = []            # [(bit, {checked: [objs]}, {checked: [draws]}, checked now)]
+        self.dropdown = None        # ({value: [objs]}, {value: [draws]}, value now); None = no value
+        ours = set()                # (idnum, gen) of our field and widget objects
+        for name, field, widgets in _terminal_fields(acro.get("/Fields")):
+            if name in GLYPH_BITS:
+                on = _on_state(widgets[0])
+                states, draws = {}, {}
+                for checked in (False, True):
+                    state = NameObject(on if checked else _OFF)
+                    objs = [] if field is widgets[0] else [_rewrite(field, V=state)]
+                    objs += [_rewrite(w, V=state, AS=state) if w is field else _rewrite(w, AS=state) for w in widgets]
+                    states[checked] = objs
+                    draws[checked] = [(w, _place(w, _normal_ap(w, state))) for w in widgets]
+                current = str(field.get("/V", _OFF)) != _OFF
+                self.glyphs.append((GLYPH_BITS[name], states, draws, current))
+            elif name == DROPDOWN_ID:
+                states, draws = {None: []}, {None: [(w, _place(w, _normal_ap(w))) for w in widgets]}
+                size, color = self._da(field)
+                for entry in field.get("/Opt") or []:
+                    entry = entry.get_object() if isinstance(entry, IndirectObject) else entry
+                    value = str(entry[0] if isinstance(entry, ArrayObject) else entry)
+                    shown = str(entry[1] if isinstance(entry, ArrayObject) else entry)
+                    objs, placed = [], []
+                    if field is not widgets[0]:
+                        objs.append(_rewrite(field, V=TextStringObject(value)))
+                    for w in widgets:
+                        llx, lly, urx, ury = (float(v) for v in w["/Rect"])
+                        ap = next(nums)
+                        ops = (b"/Tx BMC q 1 1 1 rg 0 0 %.2f %.2f re f BT /Helv %.1f Tf %s rg 1 %.2f Td %s Tj ET Q EMC"
+                               % (urx - llx, ury - lly, size, color, size * 0.3, _pdf_str(shown)))
+                        self.static_objs.append((ap, 0, _xobject(ap, urx - llx, ury - lly, ops,
+                                                                 b"/Font << /Helv %d 0 R >>" % helv)))
+                        apd = DictionaryObject({NameObject("/N"): _ref(ap)})
+                        objs.append(_rewrite(w, V=TextStringObject(value), AP=apd) if w is field else _rewrite(w, AP=apd))
+                        placed.append((w, _place(w, _ref(ap), (0, 0, urx - llx, ury - lly))))
+                    states[value] = objs
+                    draws[value] = placed
+                current = str(field["/V"]) if "/V" in field else None
+                self.dropdown = (states, draws, current)
+            else:
+                continue
+            ours.add((field.indirect_reference.idnum, field.indirect_reference.generation))
+            ours.update((w.indirect_reference.idnum, w.indirect_reference.generation) for w in widgets)
+        self.size = next(nums)
+        self._flatten_frame(reader, root, root_ref, acro, acro_ref, ours)
+
+    @staticmethod
+    def _da(field) -> tuple[float, bytes]:
+        da = str(field.get("/DA", "")).encode("latin-1", "replace")
+        m = _DA_SIZE.search(da)
+        size = float(m.group(1)) if m and float(m.group(1)) > 0 else 10.0
+        c = _DA_COLOR.search(da)
+        return size, c.group(1) if c else b"0 0 0"
+
+    def _flatten_frame(self, reader, root, root_ref, acro, acro_ref, ours: set):
+        """Pages with our widgets rewritten once: no widget annotations, an overlay stream slot."""
+        self.flat_objs = []
+        self.flat_pages = {}        # page (idnum, gen) -> overlay object number
+        self.page_of = {}           # widget (idnum, gen) -> page (idnum, gen)
+        nums = iter(range(self.size, 1 << 30))
+        q_num = next(nums)
+        self.flat_objs.append((q_num, 0, _stream_obj(q_num, b"q")))
+        aps = {}
+        for draws in [g[2] for g in self.glyphs] + ([self.dropdown[1]] if self.dropdown else []):
+            for placed in draws.values():
+                for _w, draw in placed:
+                    if draw is not None:
+                        aps[draw[0].idnum] = draw[0]
+        for page in reader.pages:
+            annots = page.get("/Annots")
+            annots = list(annots.get_object()) if annots is not None else []
+            keep = [a for a in annots if (a.idnum, a.generation) not in ours]
+            if len(keep) == len(annots):
+                continue
+            ref = page.indirect_reference
+            for a in annots:
+                self.page_of[(a.idnum, a.generation)] = (ref.idnum, ref.generation)
+            overlay_num = next(nums)
+            contents = page.get("/Contents")
+            if isinstance(contents, IndirectObject) and isinstance(contents.get_object(), ArrayObject):
+                contents = contents.get_object()
+            originals = list(contents) if isinstance(contents, ArrayObject) else ([contents] if contents else [])
+            new_page = DictionaryObject(page)
+            new_page[NameObject("/Contents")] = ArrayObject([_ref(q_num), *originals, _ref(overlay_num)])
+            if keep:
+                new_page[NameObject("/Annots")] = ArrayObject(keep)
+            else:
+                del new_page["/Annots"]
+            resources = DictionaryObject(page.get("/Resources", DictionaryObject()).get_object())
+            xobjects = DictionaryObject(resources.get("/XObject", DictionaryObject()).get_object())
+            for num, ap in aps.items():
+                xobjects[NameObject(f"/Ff{num}")] = ap
+            resources[NameObject("/XObject")] = xobjects
+            new_page[NameObject("/Resources")] = resources
+            self.flat_objs.append((ref.idnum, ref.generation, _obj(ref.idnum, _serialize(new_page), ref.generation)))
+            self.flat_pages[(ref.idnum, ref.generation)] = overlay_num
+
+        acro = DictionaryObject(acro)
+        acro[NameObject("/Fields")] = ArrayObject(
+            [f for f in acro.get("/Fields", ArrayObject()) if (f.idnum, f.generation) not in ours]
+        )
+        if acro_ref is not None:
+            self.flat_objs.append((acro_ref.idnum, acro_ref.generation,
+                                   _obj(acro_ref.idnum, _serialize(acro), acro_ref.generation)))
+        else:
+            root = DictionaryObject(root)
+            root[NameObject("/AcroForm")] = acro
+            self.flat_objs.append((root_ref.idnum, root_ref.generation,
+                                   _obj(root_ref.idnum, _serialize(root), root_ref.generation)))
+        self.flat_size = next(nums)
+
+    def _states(self, mapping: dict):
+        """(glyph entries with their wanted state, wanted cc_2 value or None)."""
+        bits = TickGrid.coerce(mapping.get("ticks")).bits
+        glyphs = [(entry, bool(bits >> entry[0] & 1)) for entry in self.glyphs]
+        value = None
+        if self.dropdown is not None:
+            level = mapping.get("projectLevel")
+            value = level if level is not None and level in self.dropdown[0] else self.dropdown[2]
+        return glyphs, value
+
+    def render(self, mapping: dict, flatten: bool = False) -> bytes:
+        glyphs, value = self._states(mapping)
+        if flatten:
+            return self._render_flat(glyphs, value)
+        objs = []
+        for (_bit, states, _draws, current), checked in glyphs:
+            if checked != current:
+                objs.extend(states[checked])
+        if self.dropdown is not None and value != self.dropdown[2]:
+            objs.extend(self.dropdown[0][value])
+        if not objs:
+            return self.base.data
+        return self.base.update(list(self.static_objs) + objs, self.size)
+
+    def _render_flat(self, glyphs, value) -> bytes:
+        ops = {page: [b"Q\n"] for page in self.flat_pages}
+        placed = [p for (_b, _s, draws, _c), checked in glyphs for p in draws[checked]]
+        if self.dropdown is not None:
+            placed += self.dropdown[1].get(value, [])
+        for widget, draw in placed:
+            key = self.page_of.get((widget.indirect_reference.idnum, widget.indirect_reference.generation))
+            if draw is not None and key in ops:
+                ops[key].append(draw[1])
+        overlays = [(num, 0, _stream_obj(num, b"".join(ops[page]))) for page, num in self.flat_pages.items()]
+        return self.base.update(list(self.static_objs) + self.flat_objs + overlays, self.flat_size)
+
+
+def get_form_plan(form_pdf: str) -> FormPlan:
+    key = (os.path.abspath(form_pdf), os.path.getmtime(form_pdf), os.path.getsize(form_pdf))
+    with _PLANS_LOCK:
+        plan = _PLANS.get(key)
+        if plan is None:
+            plan = FormPlan(form_pdf)
+            _PLANS.clear()
+            _PLANS[key] = plan
+    return plan
+
+
+def fill_and_export(
+    docx_template: str,
+    full_docx_template: str,
+    mapping: dict,
+    out_dir: str,
+    out_basename: str,
+    export_docx: bool = True
+) -> dict:
+    """
+    Fill the form template (form_template(full_docx_template)) with the mapping; flattened with
+    AppConfig.FORM_FLATTEN. No DOCX is produced; tag fields raise FieldTagError.
+    """
+    reject_fields(mapping, "form")
+    os.makedirs(out_dir, exist_ok=True)
+    abs_pdf = os.path.join(out_dir, f"{out_basename}.pdf")
+
+    plan = get_form_plan(form_template(full_docx_template))
+    with open(abs_pdf, "wb") as fh:
+        fh.write(plan.render(mapping, flatten=AppConfig.FORM_FLATTEN))
+
+    return {"rel_pdf_path": relpath_from_output(abs_pdf)}
@@ -0,0 +1,248 @@
+"""
+services/pdf_merge.py
+---------------------
+One merged PDF per batch, with a bookmark per document.
+
+Batch outputs are near-identical: same fonts, same images, same unchanged pages. The
+merger copies every object of every input page into one file, content-addressed: an
+object (with its references already renumbered) whose bytes were written before is not
+written again, so shared fonts / images / unchanged content streams appear once and the
+result is a fraction of the summed input size.
+
+Objects are written as soon as they are copied (inputs are read one at a time, the output
+is never held in memory); the page tree, outline and xref follow at the end.
+
+Functions:
+- MergedPdfWriter(out_path): .add(title, pdf_path), .close() -> stats
+- merge_pdfs(entries, out_path) -> stats   (entries = [(bookmark title, pdf path)])
+- ObjectCopier: the renumbering/dedup copy, shared with services.pdf_splice
+"""
+
+import hashlib
+import io
+import os
+
+try:
+    from pypdf import PdfReader
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, StreamObject
+except Exception:
+    PdfReader = None
+
+_CATALOG, _PAGES, _OUTLINES = 1, 2, 3
+_INHERITED = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+_PAGE_SKIP = ("/Parent", "/B", "/StructParents")      # re-parented; beads/struct tree not copied
+
+
+def _serialize(obj) -> bytes:
+    buf = io.BytesIO()
+    obj.write_to_stream(buf)
+    return buf.getvalue()
+
+
+def _text_string(text: str) -> bytes:
+    try:
+        raw = text.encode("latin-1")
+        if all(32 <= b < 127 for b in raw):
+            return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+    except UnicodeEncodeError:
+        pass
+    return b"<feff" + text.encode("utf-16-be").hex().encode() + b">"
+
+
+class ObjectCopier:
+    """
+    Copies pages and everything they reference from input PDFs into an output numbered
+    from `first_num`; subclasses decide where emitted objects go (_emit).
+    With dedup, an object whose serialized bytes were emitted before is reused.
+    Reference cycles below a page (rare) are emitted unshared.
+    """
+
+    def __init__(self, first_num: int, dedup: bool = True):
+        self._next = first_num
+        self._dedup = dedup
+        self._by_hash = {}
+        self.stats = {"objects": 0, "shared": 0}
+
+    def _emit(self, num: int, body: bytes):
+        raise NotImplementedError
+
+    def _alloc(self) -> int:
+        num = self._next
+        self._next += 1
+        return num
+
+    def _value(self, v, memo: dict, active: dict):
+        if isinstance(v, IndirectObject):
+            return IndirectObject(self._copy(v, memo, active), 0, None)
+        if isinstance(v, StreamObject):
+            raise ValueError("direct stream object")
+        if isinstance(v, DictionaryObject):
+            out = DictionaryObject()
+            for k, item in v.items():
+                out[NameObject(k)] = self._value(item, memo, active)
+            return out
+        if isinstance(v, ArrayObject):
+            return ArrayObject([self._value(item, memo, active) for item in v])
+        return v
+
+    def _body(self, obj, memo: dict, active: dict) -> bytes:
+        if isinstance(obj, StreamObject):
+            raw = obj._data
+            head = DictionaryObject()
+            for k, item in obj.items():
+                if k != "/Length":
+                    head[NameObject(k)] = self._value(item, memo, active)
+            return b"%s\nstream\n%s\nendstream" % (
+                _serialize(head)[:-2] + b" /Length %d >>" % len(raw), raw
+            )
+        return _serialize(self._value(obj, memo, active))
+
+    def _copy(self, ref, memo: dict, active: dict) -> int:
+        key = (ref.idnum, ref.generation)
+        if key in memo:
+            return memo[key]
+        if key in active:
+            # cycle: fix this object's number now; it is emitted unshared once complete
+            if active[key] is None:
+                active[key] = self._alloc()
+            return active[key]
+
+        active[key] = None
+        body = self._body(ref.get_object(), memo, active)
+        pinned = active.pop(key)
+        if pinned is not None:
+            num = pinned
+            self._emit(num, body)
+        elif not self._dedup:
+            num = self._alloc()
+            self._emit(num, body)
+        else:
+            digest = hashlib.sha256(body).digest()
+            num = self._by_hash.get(digest)
+            if num is None:
+                num = self._alloc()
+                self._by_hash[digest] = num
+                self._emit(num, body)
+            else:
+                self.stats["shared"] += 1
+        memo[key] = num
+        return num
+
+    def copy_pages(self, reader, parent_num: int, parent_gen: int = 0) -> list[int]:
+        """
+        Emit every page of `reader` (fresh numbers, inherited attributes made explicit,
+        /Parent set to the given Pages node) and return the new page numbers.
+        """
+        memo, active = {}, {}
+        pages = []
+        for page in reader.pages:
+            num = self._alloc()
+            if page.indirect_reference is not None:
+                memo[(page.indirect_reference.idnum, page.indirect_reference.generation)] = num
+            pages.append((num, page))
+
+        for num, page in pages:
+            d = DictionaryObject()
+            for k, v in page.items():
+                if k not in _PAGE_SKIP:
+                    d[NameObject(k)] = self._value(v, memo, active)
+            parent = page.get("/Parent")
+            while parent is not None:
+                parent = parent.get_object()
+                for k in _INHERITED:
+                    if k not in d and k in parent:
+                        d[NameObject(k)] = self._value(parent.raw_get(k), memo, active)
+                parent = parent.get("/Parent")
+            d[NameObject("/Parent")] = IndirectObject(parent_num, parent_gen, None)
+            self._emit(num, _serialize(d))
+        return [num for num, _page in pages]
+
+
+class MergedPdfWriter(ObjectCopier):
+    """
+    Streaming, deduplicating PDF concatenation. Page objects are always written fresh
+    (a page may appear only once in the page tree); everything below them is shared.
+    """
+
+    def __init__(self, out_path: str):
+        if PdfReader is None:
+            raise RuntimeError("pypdf not installed. pip install pypdf")
+        super().__init__(_OUTLINES + 1)
+        self.path = out_path
+        self._part = out_path + ".part"
+        self._fh = open(self._part, "wb")
+        self._pos = 0
+        self._offsets = {}
+        self._kids = []
+        self._marks = []            # (title, first page number)
+        self.stats.update({"documents": 0, "pages": 0, "input_bytes": 0})
+        self._write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data: bytes):
+        self._fh.write(data)
+        self._pos += len(data)
+
+    def _emit(self, num: int, body: bytes):
+        self._offsets[num] = self._pos
+        self._write(b"%d 0 obj\n%s\nendobj\n" % (num, body))
+        self.stats["objects"] += 1
+
+    # ---- public
+    def add(self, title: str, pdf_path: str):
+        """Append every page of `pdf_path` under one bookmark `title`."""
+        pages = self.copy_pages(PdfReader(pdf_path), _PAGES)
+        self._kids.extend(pages)
+        if pages:
+            self._marks.append((title, pages[0]))
+        self.stats["documents"] += 1
+        self.stats["pages"] += len(pages)
+        self.stats["input_bytes"] += os.path.getsize(pdf_path)
+
+    def close(self) -> dict:
+        """Write page tree, outline, catalog, xref; move the file into place. Returns stats."""
+        kids = b" ".join(b"%d 0 R" % n for n in self._kids)
+        self._emit(_PAGES, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self._kids)))
+
+        items = [self._alloc() for _ in self._marks]
+        for i, ((title, page_num), num) in enumerate(zip(self._marks, items)):
+            links = b""
+            if i > 0:
+                links += b" /Prev %d 0 R" % items[i - 1]
+            if i + 1 < len(items):
+                links += b" /Next %d 0 R" % items[i + 1]
+            self._emit(num, b"<< /Title %s /Parent %d 0 R%s /Dest [%d 0 R /Fit] >>"
+                       % (_text_string(title), _OUTLINES, links, page_num))
+        if items:
+            self._emit(_OUTLINES, b"<< /Type /Outlines /First %d 0 R /Last %d 0 R /Count %d >>"
+                       % (items[0], items[-1], len(items)))
+        else:
+            self._emit(_OUTLINES, b"<< /Type /Outlines /Count 0 >>")
+        self._emit(_CATALOG, b"<< /Type /Catalog /Pages %d 0 R /Outlines %d 0 R /PageMode /UseOutlines >>"
+                   % (_PAGES, _OUTLINES))
+
+        xref_at = self._pos
+        rows = [b"xref\n0 %d\n0000000000 65535 f \n" % self._next]
+        rows += [b"%010d 00000 n \n" % self._offsets[n] for n in range(1, self._next)]
+        self._write(b"".join(rows))
+        self._write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                    % (self._next, _CATALOG, xref_at))
+        self._fh.close()
+        os.replace(self._part, self.path)
+        self.stats["output_bytes"] = self._pos
+        return dict(self.stats)
+
+    def abort(self):
+        self._fh.close()
+        if os.path.exists(self._part):
+            os.remove(self._part)
+
+
+def merge_pdfs(entries, out_path: str) -> dict:
+    writer = MergedPdfWriter(out_path)
+    try:
+        for title, pdf_path in entries:
+            writer.add(title, pdf_path)
+    except Exception:
+        writer.abort()
+        raise
+    return writer.close()
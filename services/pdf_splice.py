@@ -0,0 +1,173 @@
+"""
+services/pdf_splice.py
+----------------------
+Page-splice export: only the filled page is exported per row; every other page comes
+from a PDF of the full template rendered once per template version.
+
+  cached   cache/pages/<sha256(full template, engine)>.pdf   (pages 1, 2, 4..n reused as-is)
+  per row  filled single page -> one-page PDF -> replaces page index 2 of the cached PDF
+
+The splice is an incremental update of the cached PDF (like services.pdf_stamp): the
+template bytes are copied unchanged and only the new page's objects, the rewritten parent
+Pages node and a new xref are appended, so the cost follows one page, not the document.
+Base PDFs with cross-reference streams fall back to a full pypdf rewrite (the
+_new_app_01/services/pdf_replace.replace_pdf_page approach).
+
+Assumes page 3 of the full template is exactly one PDF page and that the single-page
+template renders like page 3 does in the full document (same page setup/headers).
+
+Functions:
+- template_pdf(full_docx_template, engine, export) -> cached PDF path (export(pdf_path) renders it)
+- get_splice_plan(base_pdf, index=2) -> SplicePlan (cached per file version)
+- SplicePlan.render(page_pdf) -> PDF bytes
+- splice_page(base_pdf, page_pdf, out_pdf, index=2)
+"""
+
+import io
+import os
+import re
+import threading
+
+from config import AppConfig
+from services.output_cache import file_digest
+from services.pdf_merge import ObjectCopier, _serialize
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject
+except Exception:
+    PdfReader = None
+
+REPLACE_INDEX = 2                 # 0-based: page 3
+
+_PLANS: dict = {}
+_PLANS_LOCK = threading.Lock()
+_EXPORT_LOCK = threading.Lock()
+
+
+def template_pdf(full_docx_template: str, engine: str, export) -> str:
+    """
+    Path of the full template rendered to PDF by `engine`; `export(pdf_path)` produces it
+    on the first call per template version (content hash, so a touched file is not re-rendered).
+    """
+    digest = file_digest(full_docx_template)
+    path = os.path.join(AppConfig.PAGE_CACHE_DIR, f"{digest[:32]}_{engine}.pdf")
+    if os.path.exists(path):
+        return path
+    with _EXPORT_LOCK:
+        if not os.path.exists(path):
+            os.makedirs(AppConfig.PAGE_CACHE_DIR, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.pdf"
+            try:
+                export(tmp)
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+    return path
+
+
+class _UpdateWriter(ObjectCopier):
+    """Collects emitted objects (numbered above the base /Size) for one incremental update."""
+
+    def __init__(self, first_num: int, start_pos: int):
+        super().__init__(first_num, dedup=False)
+        self.chunks = []
+        self.offsets = {}
+        self.pos = start_pos
+
+    def _emit(self, num: int, body: bytes, gen: int = 0):
+        data = b"%d %d obj\n%s\nendobj\n" % (num, gen, body)
+        self.offsets[num] = (self.pos, gen)
+        self.chunks.append(data)
+        self.pos += len(data)
+        self.stats["objects"] += 1
+
+
+class SplicePlan:
+    """
+    Precomputed incremental-update frame for one base PDF: where the replaced page sits in
+    its parent's /Kids, the parent node to rewrite, and the trailer entries to carry over.
+    """
+
+    def __init__(self, base_pdf: str, index: int = REPLACE_INDEX):
+        if PdfReader is None:
+            raise RuntimeError("pypdf not installed. pip install pypdf")
+        with open(base_pdf, "rb") as fh:
+            self.base = fh.read()
+        self.base_path = base_pdf
+        self.index = index
+        reader = PdfReader(io.BytesIO(self.base))
+        if index >= len(reader.pages):
+            raise RuntimeError(f"{base_pdf} has {len(reader.pages)} pages; cannot replace page {index + 1}")
+
+        m = re.search(rb"startxref\s+(\d+)\s+%%EOF\s*$", self.base[-1024:])
+        self.prev_xref = int(m.group(1)) if m else None
+        # incremental classic xref only on top of a classic xref table
+        self.incremental = bool(m) and self.base[self.prev_xref:self.prev_xref + 4] == b"xref"
+
+        page = reader.pages[index]
+        ref = page.indirect_reference
+        parent_ref = page.raw_get("/Parent")
+        parent = parent_ref.get_object()
+        kids = parent["/Kids"]
+        self.kid_pos = next(i for i, k in enumerate(kids) if (k.idnum, k.generation) == (ref.idnum, ref.generation))
+        self.parent_ref = (parent_ref.idnum, parent_ref.generation)
+        self.parent = DictionaryObject(parent)
+        self.kids = list(kids)
+        self.size = int(reader.trailer["/Size"])
+
+        trailer = reader.trailer
+        tail = b"/Root " + _serialize(trailer.raw_get("/Root"))
+        if "/Info" in trailer:
+            tail += b" /Info " + _serialize(trailer.raw_get("/Info"))
+        self.trailer_tail = tail
+
+    def render(self, page_pdf: str) -> bytes:
+        if not self.incremental:
+            return self._rewrite(page_pdf)
+
+        head = self.base if self.base.endswith(b"\n") else self.base + b"\n"
+        w = _UpdateWriter(self.size, len(head))
+        page_num = w.copy_pages(PdfReader(page_pdf), *self.parent_ref)[0]
+
+        kids = list(self.kids)
+        kids[self.kid_pos] = IndirectObject(page_num, 0, None)
+        parent = DictionaryObject(self.parent)
+        parent[NameObject("/Kids")] = ArrayObject(kids)
+        w._emit(self.parent_ref[0], _serialize(parent), gen=self.parent_ref[1])
+
+        xref = [b"xref\n"]
+        for num in sorted(w.offsets):
+            off, gen = w.offsets[num]
+            xref.append(b"%d 1\n%010d %05d n \n" % (num, off, gen))
+        xref.append(b"trailer\n<< /Size %d %s /Prev %d >>\nstartxref\n%d\n%%%%EOF\n"
+                    % (w._next, self.trailer_tail, self.prev_xref, w.pos))
+        return b"".join([head, *w.chunks, *xref])
+
+    def _rewrite(self, page_pdf: str) -> bytes:
+        src = PdfReader(io.BytesIO(self.base))
+        rep = PdfReader(page_pdf).pages[0]
+        writer = PdfWriter()
+        for i, page in enumerate(src.pages):
+            writer.add_page(rep if i == self.index else page)
+        buf = io.BytesIO()
+        writer.write(buf)
+        return buf.getvalue()
+
+
+def get_splice_plan(base_pdf: str, index: int = REPLACE_INDEX) -> SplicePlan:
+    key = (os.path.abspath(base_pdf), os.path.getmtime(base_pdf), os.path.getsize(base_pdf), index)
+    with _PLANS_LOCK:
+        plan = _PLANS.get(key)
+        if plan is None:
+            plan = SplicePlan(base_pdf, index)
+            _PLANS.clear()
+            _PLANS[key] = plan
+    return plan
+
+
+def splice_page(base_pdf: str, page_pdf: str, out_pdf: str, index: int = REPLACE_INDEX):
+    data = get_splice_plan(base_pdf, index).render(page_pdf)
+    with open(out_pdf, "wb") as fh:
+        fh.write(data)
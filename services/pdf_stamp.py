@@ -0,0 +1,277 @@
+"""
+services/pdf_stamp.py
+---------------------
+Direct PDF stamping driven by overlay_map.json (no Word, no DOCX round trip).
+
+The overlay map already positions cc_2 and every glyph_r*_c* on page 3 for the browser
+preview; here the same positions are drawn server-side onto page 3 of the full template
+PDF (services.pdf_splice.template_pdf, rendered once per template version by LibreOffice
+and shared with the ooxml page splice), so the output is the whole document like the
+com/ooxml backends produce. Tag fields (mapping["fields"]) have no overlay positions:
+a mapping with any raises FieldTagError; use the com or ooxml backend for them.
+
+Output is the base PDF plus one incremental-update section: the original bytes (every page,
+font and image) are reused byte-for-byte and only the stamped page object, a small overlay
+content stream and a new xref are appended. Everything but the overlay operators is
+precomputed per (base PDF, overlay map), so a row costs microseconds.
+
+Pipelines/Functions:
+- fill_and_export(docx_template, full_docx_template, mapping, out_dir, out_basename, export_docx=True)
+    Same contract as the other fill backends; writes the PDF only (no DOCX in this mode).
+- full_template_pdf(full_docx_template) -> cached PDF of the full template
+- reject_fields(mapping, backend): FieldTagError for a mapping with tag fields
+- get_stamp_plan(base_pdf, overlay_map_path, first_page=0) -> StampPlan (cached, rebuilt when a file changes)
+- StampPlan.render(mapping) -> PDF bytes
+"""
+
+import io
+import json
+import os
+import re
+import threading
+
+from config import AppConfig
+from services.form_fields import FieldTagError, normalize_fields
+from services.pdf_splice import REPLACE_INDEX, template_pdf
+from services.soffice_pool import docx_to_pdf
+from services.storage import relpath_from_output
+from services.tick_grid import GLYPH_BITS, TickGrid
+
+try:
+    from pypdf import PdfReader
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject
+except Exception:
+    PdfReader = None
+
+TICK_CHAR = "3"             # ZapfDingbats a19 = ✓ (same mark as the browser preview)
+TICK_SIZE = 14              # preview draws 14 units at scale 1 (1 unit = 1 pt)
+_HELV = "/FStampH"
+_ZAPF = "/FStampZ"
+
+_PLANS: dict = {}
+_PLANS_LOCK = threading.Lock()
+
+
+def _pdf_str(text: str) -> bytes:
+    s = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return b"(" + s.encode("cp1252", "replace") + b")"
+
+
+def _rgb(color: str | None) -> str:
+    c = (color or "#000000").lstrip("#")
+    if len(c) != 6:
+        return "0 0 0"
+    return " ".join(f"{int(c[i:i + 2], 16) / 255:.3f}" for i in (0, 2, 4))
+
+
+def _serialize(obj) -> bytes:
+    buf = io.BytesIO()
+    obj.write_to_stream(buf)
+    return buf.getvalue()
+
+
+def _stream_obj(num: int, data: bytes) -> bytes:
+    return b"%d 0 obj\n<< /Length %d >>\nstream\n%s\nendstream\nendobj\n" % (num, len(data), data)
+
+
+class StampPlan:
+    """
+    Precompiled incremental update for one base PDF + overlay map; overlay page n is drawn
+    on page first_page + n of the base PDF (0-based first_page).
+
+    New objects (numbered from the base trailer's /Size):
+      q-stream (shared), Helvetica, ZapfDingbats, then one overlay stream per stamped page.
+    Stamped page objects are rewritten with /Contents [q, original..., overlay] and the
+    two stamp fonts added to their resources.
+    """
+
+    def __init__(self, base_pdf: str, overlay: dict, first_page: int = 0):
+        if PdfReader is None:
+            raise RuntimeError("pypdf not installed. pip install pypdf")
+        with open(base_pdf, "rb") as fh:
+            self.base = fh.read()
+        reader = PdfReader(io.BytesIO(self.base))
+
+        m = re.search(rb"startxref\s+(\d+)\s+%%EOF\s*$", self.base[-1024:])
+        if not m:
+            raise RuntimeError(f"Cannot locate startxref in {base_pdf}")
+        self.prev_xref = int(m.group(1))
+
+        trailer = reader.trailer
+        size = int(trailer["/Size"])
+        q_num, helv_num, zapf_num = size, size + 1, size + 2
+        next_num = size + 3
+
+        self.static_objs = [
+            (q_num, _stream_obj(q_num, b"q")),
+            (helv_num, b"%d 0 obj\n<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica"
+                       b" /Encoding /WinAnsiEncoding >>\nendobj\n" % helv_num),
+            (zapf_num, b"%d 0 obj\n<< /Type /Font /Subtype /Type1 /BaseFont /ZapfDingbats >>\nendobj\n" % zapf_num),
+        ]
+
+        # Per stamped page: rewritten page object + the ops each mapping value contributes
+        self.pages = []
+        for key, spec in (overlay.get("pages") or {}).items():
+            page = reader.pages[first_page + int(key) - 1]
+            ref = page.indirect_reference
+            w = float(page.mediabox.width)
+            h = float(page.mediabox.height)
+            x0 = float(page.mediabox.left)
+            y0 = float(page.mediabox.bottom)
+            overlay_num = next_num
+            next_num += 1
+
+            contents = page.get("/Contents")
+            if isinstance(contents, IndirectObject) and isinstance(contents.get_object(), ArrayObject):
+                contents = contents.get_object()
+            originals = list(contents) if isinstance(contents, ArrayObject) else ([contents] if contents else [])
+
+            new_page = DictionaryObject(page)
+            new_page[NameObject("/Contents")] = ArrayObject(
+                [IndirectObject(q_num, 0, None), *originals, IndirectObject(overlay_num, 0, None)]
+            )
+            resources = DictionaryObject(page.get("/Resources", DictionaryObject()).get_object())
+            fonts = DictionaryObject(resources.get("/Font", DictionaryObject()).get_object())
+            fonts[NameObject(_HELV)] = IndirectObject(helv_num, 0, None)
+            fonts[NameObject(_ZAPF)] = IndirectObject(zapf_num, 0, None)
+            resources[NameObject("/Font")] = fonts
+            new_page[NameObject("/Resources")] = resources
+            page_obj = b"%d %d obj\n%s\nendobj\n" % (ref.idnum, ref.generation, _serialize(new_page))
+
+            def at(nx, ny):
+                return x0 + nx * w, y0 + h - ny * h     # overlay origin is top-left
+
+            dropdown = {}
+            dd = spec.get("dropdown")
+            if dd:
+                style = (dd.get("styles") or {}).get("selected") or {}
+                size_pt = float(style.get("fontSizePt") or 10)
+                x, y = at(dd["x"], dd["y"])
+                box_h = dd.get("h", 0) * h
+                baseline = y - box_h * 0.8
+                placeholder = (dd.get("values") or [""])[0]
+                cover_w = max(dd.get("w", 0) * w, len(placeholder) * size_pt * 0.5)
+                for value in (dd.get("values") or [])[1:]:
+                    dropdown[value] = (
+                        b"q 1 1 1 rg %.2f %.2f %.2f %.2f re f Q\n" % (x - 1, baseline - size_pt * 0.3, cover_w + 2, size_pt * 1.3)
+                        + b"BT %s %.1f Tf %s rg %.2f %.2f Td %s Tj ET\n"
+                        % (_HELV.encode(), size_pt, _rgb(style.get("color")).encode(), x, baseline, _pdf_str(value))
+                    )
+
+            ticks = []          # [(TickGrid bit, ops)]
+            for t in spec.get("ticks") or []:
+                if t["id"] not in GLYPH_BITS:
+                    continue
+                x, y = at(t["x"], t["y"])
+                ticks.append((GLYPH_BITS[t["id"]], b"BT %s %d Tf 0 0 0 rg %.2f %.2f Td (%s) Tj ET\n" % (
+                    _ZAPF.encode(), TICK_SIZE, x, y, TICK_CHAR.encode()
+                )))
+
+            self.pages.append({
+                "ref": (ref.idnum, ref.generation),
+                "page_obj": page_obj,
+                "overlay_num": overlay_num,
+                "dropdown": dropdown,
+                "ticks": ticks,
+            })
+
+        self.size = next_num
+        tail = b"/Root " + _serialize(trailer.raw_get("/Root"))
+        if "/Info" in trailer:
+            tail += b" /Info " + _serialize(trailer.raw_get("/Info"))
+        if "/ID" in trailer:
+            ids = trailer["/ID"]
+            tail += b" /ID [<%s> <%s>]" % (bytes(ids[0].original_bytes).hex().encode(),
+                                          bytes(ids[1].original_bytes).hex().encode())
+        self.trailer_tail = tail
+
+    def overlay_ops(self, page: dict, mapping: dict) -> bytes:
+        ops = [b"Q\n"]
+        level = mapping.get("projectLevel")
+        if level in page["dropdown"]:
+            ops.append(page["dropdown"][level])
+        bits = TickGrid.coerce(mapping.get("ticks")).bits
+        for bit, op in page["ticks"]:
+            if bits >> bit & 1:
+                ops.append(op)
+        return b"".join(ops)
+
+    def render(self, mapping: dict) -> bytes:
+        out = [self.base if self.base.endswith(b"\n") else self.base + b"\n"]
+        pos = len(out[0])
+        offsets = {}
+
+        objs = list(self.static_objs)
+        for page in self.pages:
+            objs.append((page["overlay_num"], _stream_obj(page["overlay_num"], self.overlay_ops(page, mapping))))
+        for num, data in objs:
+            offsets[num] = (pos, 0)
+            out.append(data)
+            pos += len(data)
+        for page in self.pages:
+            num, gen = page["ref"]
+            offsets[num] = (pos, gen)
+            out.append(page["page_obj"])
+            pos += len(page["page_obj"])
+
+        xref = [b"xref\n"]
+        for num in sorted(offsets):
+            off, gen = offsets[num]
+            xref.append(b"%d 1\n%010d %05d n \n" % (num, off, gen))
+        xref.append(b"trailer\n<< /Size %d %s /Prev %d >>\nstartxref\n%d\n%%%%EOF\n"
+                    % (self.size, self.trailer_tail, self.prev_xref, pos))
+        out.extend(xref)
+        return b"".join(out)
+
+
+def full_template_pdf(full_docx_template: str) -> str:
+    """The full template as PDF (LibreOffice; cached in PAGE_CACHE_DIR per template version)."""
+    return template_pdf(full_docx_template, "ooxml", lambda pdf: docx_to_pdf(full_docx_template, pdf))
+
+
+def reject_fields(mapping: dict, backend: str):
+    """Raise FieldTagError when the mapping carries tag fields (no positions to draw them at)."""
+    fields = normalize_fields(mapping.get("fields"))
+    if fields:
+        raise FieldTagError(
+            f"field tag(s) not supported by the {backend} backend (use com or ooxml): {', '.join(sorted(fields))}"
+        )
+
+
+def get_stamp_plan(base_pdf: str, overlay_map_path: str, first_page: int = 0) -> StampPlan:
+    key = tuple(
+        (os.path.abspath(p), os.path.getmtime(p), os.path.getsize(p)) for p in (base_pdf, overlay_map_path)
+    ) + (first_page,)
+    with _PLANS_LOCK:
+        plan = _PLANS.get(key)
+        if plan is None:
+            with open(overlay_map_path, "r", encoding="utf-8") as fh:
+                overlay = json.load(fh)
+            plan = StampPlan(base_pdf, overlay, first_page)
+            _PLANS.clear()
+            _PLANS[key] = plan
+    return plan
+
+
+def fill_and_export(
+    docx_template: str,
+    full_docx_template: str,
+    mapping: dict,
+    out_dir: str,
+    out_basename: str,
+    export_docx: bool = True
+) -> dict:
+    """
+    Stamp the mapping onto page 3 of the full template PDF at the AppConfig.OVERLAY_MAP_PATH
+    positions. No DOCX is produced (PDF-only mode); tag fields raise FieldTagError.
+    """
+    reject_fields(mapping, "stamp")
+    os.makedirs(out_dir, exist_ok=True)
+    abs_pdf = os.path.join(out_dir, f"{out_basename}.pdf")
+
+    base_pdf = full_template_pdf(full_docx_template)
+    plan = get_stamp_plan(base_pdf, AppConfig.OVERLAY_MAP_PATH, REPLACE_INDEX)
+    with open(abs_pdf, "wb") as fh:
+        fh.write(plan.render(mapping))
+
+    return {"rel_pdf_path": relpath_from_output(abs_pdf)}
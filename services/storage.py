@@ -5,15 +5,27 @@ Filesystem helpers:
 - ensure_dirs(): create OUTPUT_DIR if missing
 - make_batch_folder(batch_id): create output subfolder per batch
 - safe_filename(name): sanitize base names
+- link_or_copy(src, dst): hard link (same volume) or copy
+- discard(path): remove a file about to be rewritten, so a hard link to it keeps its bytes
 - zip_outputs(pdf_relpaths, out_dir, zip_name): zip given files and return relative path
+- ZipBuilder(out_dir, zip_name): ZIP grown one file at a time as batch items finish
+- stream_zip(abs_paths): ZIP bytes generated on the fly (no archive on disk)
+
+Already-compressed files (PDF, DOCX, images) are STORED in archives written to disk:
+deflating them again costs CPU for a few percent at best. stream_zip() deflates every
+entry: its sink cannot seek back to fill in sizes and CRC, so entries carry data
+descriptors, which many unzip tools do not accept on STORED entries.
 """
 
 import os
 import re
+import shutil
+import threading
 import zipfile
 from config import AppConfig
 
 SAFE_RE = re.compile(r"[^A-Za-z0-9._-]+")
+STORED_EXTS = (".pdf", ".docx", ".zip", ".png", ".jpg", ".jpeg")
 
 def ensure_dirs():
     os.makedirs(AppConfig.OUTPUT_DIR, exist_ok=True)
@@ -35,6 +47,29 @@ def safe_filename(name: str) -> str:
     base = SAFE_RE.sub("_", name.strip())
     return base or "file"
 
+def link_or_copy(src: str, dst: str):
+    """
+    Place `src` at `dst` as a hard link (no data written) or, across volumes, a copy.
+    Outputs are never modified in place (renders discard() the old file first), so sharing
+    one inode is safe.
+    """
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+def discard(path: str):
+    """
+    Remove `path` if present. Writers truncate in place (open(path, "wb"), Word SaveAs2,
+    soffice), which would rewrite every hard link to the file, e.g. an output cache entry.
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
 def relpath_from_output(abs_path: str) -> str:
     """
     Convert absolute path inside OUTPUT_DIR to a relative path for /download route.
@@ -43,6 +78,9 @@ def relpath_from_output(abs_path: str) -> str:
     rel = os.path.relpath(os.path.abspath(abs_path), base)
     return rel.replace(os.sep, "/")
 
+def _compress_type(path: str) -> int:
+    return zipfile.ZIP_STORED if path.lower().endswith(STORED_EXTS) else zipfile.ZIP_DEFLATED
+
 def zip_outputs(pdf_relpaths, out_dir, zip_name="batch.zip") -> str:
     """
     Create a ZIP of given relative PDF paths (relative to OUTPUT_DIR).
@@ -53,5 +91,80 @@ def zip_outputs(pdf_relpaths, out_dir, zip_name="batch.zip") -> str:
         for rel in pdf_relpaths:
             abs_f = os.path.join(AppConfig.OUTPUT_DIR, rel)
             if os.path.exists(abs_f):
-                z.write(abs_f, arcname=os.path.basename(abs_f))
+                z.write(abs_f, arcname=os.path.basename(abs_f), compress_type=_compress_type(abs_f))
     return relpath_from_output(zip_abspath)
+
+class ZipBuilder:
+    """
+    Batch ZIP written while the batch runs: add() appends one finished file (read right
+    after it was rendered, while still in the page cache), close() writes the central
+    directory. The archive lives at <zip_name>.part until close(), so a half-built ZIP is
+    never served.
+    """
+
+    def __init__(self, out_dir: str, zip_name: str = "batch.zip"):
+        self.path = os.path.join(out_dir, zip_name)
+        self._part = self.path + ".part"
+        self._zip = zipfile.ZipFile(self._part, "w", compression=zipfile.ZIP_DEFLATED)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def add(self, abs_path: str):
+        if not os.path.exists(abs_path):
+            return
+        with self._lock:
+            self._zip.write(abs_path, arcname=os.path.basename(abs_path), compress_type=_compress_type(abs_path))
+            self.count += 1
+
+    def close(self) -> str:
+        """Finish the archive and return its relative path (for /download)."""
+        with self._lock:
+            self._zip.close()
+            os.replace(self._part, self.path)
+        return relpath_from_output(self.path)
+
+    def abort(self):
+        with self._lock:
+            try:
+                self._zip.close()
+            finally:
+                if os.path.exists(self._part):
+                    os.remove(self._part)
+
+class _ChunkSink:
+    """Write-only stream for zipfile; no tell()/seek(), so entries use data descriptors."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def stream_zip(abs_paths, chunk_size: int = 1 << 20):
+    """
+    Yield a ZIP of `abs_paths` (any iterable; it may block while a batch is still
+    running) as bytes chunks, without writing the archive anywhere.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        for abs_f in abs_paths:
+            if not os.path.exists(abs_f):
+                continue
+            info = zipfile.ZipInfo.from_file(abs_f, arcname=os.path.basename(abs_f))
+            info.compress_type = zipfile.ZIP_DEFLATED      # data descriptor: never STORED
+            with open(abs_f, "rb") as src, z.open(info, "w") as dst:
+                for chunk in iter(lambda: src.read(chunk_size), b""):
+                    dst.write(chunk)
+                    if sink.chunks:
+                        yield sink.take()
+            yield sink.take()               # data descriptor
+    yield sink.take()                       # central directory
@@ -0,0 +1,138 @@
+"""
+services/tick_grid.py
+---------------------
+TickGrid: the 20 device ticks (rows 16..20 x columns 2..5 of the template table) as one
+20-bit integer.
+
+Bit order is row-major, bit 0 = glyph_r16_c2, bit 3 = glyph_r16_c5, bit 19 = glyph_r20_c5
+(the order of the device_r*_c* CSV columns). Hashing, comparing and normalizing a mapping
+is then integer work; the string forms exist only at the edges.
+
+Forms:
+- JSON / overlay ids: {"glyph_r16_c2": true, ...}   TickGrid.from_ticks() / .to_ticks()
+- CSV columns:        {"device_r16_c2": "true", ...} TickGrid.from_csv_row() / .to_csv_row()
+
+A grid only records which boxes are ticked: an absent or false tick means the same thing,
+an empty box (the engines clear a box the template itself has ticked).
+"""
+
+from services.validation import parse_bool
+
+ROWS = tuple(range(16, 21))
+COLS = tuple(range(2, 6))
+CELLS = tuple((r, c) for r in ROWS for c in COLS)                  # bit i -> CELLS[i]
+GLYPH_IDS = tuple(f"glyph_r{r}_c{c}" for r, c in CELLS)
+CSV_COLUMNS = tuple(f"device_r{r}_c{c}" for r, c in CELLS)
+
+GLYPH_BITS = {g: i for i, g in enumerate(GLYPH_IDS)}
+CELL_BITS = {cell: i for i, cell in enumerate(CELLS)}
+_ROW_MASK = (1 << len(COLS)) - 1
+
+
+def _bit(row: int, col: int) -> int:
+    try:
+        return CELL_BITS[(row, col)]
+    except KeyError:
+        raise IndexError(f"No device tick at row {row}, col {col}") from None
+
+
+class TickGrid:
+    """Immutable 20-bit set of ticked cells."""
+
+    __slots__ = ("bits",)
+
+    def __init__(self, bits: int = 0):
+        self.bits = int(bits) & ((1 << len(CELLS)) - 1)
+
+    # ---- conversions
+    @classmethod
+    def coerce(cls, value) -> "TickGrid":
+        """TickGrid | int | {"glyph_r*_c*": bool} | None -> TickGrid (what a mapping's "ticks" may hold)."""
+        if isinstance(value, TickGrid):
+            return value
+        if isinstance(value, int):
+            return cls(value)
+        return cls.from_ticks(value or {})
+
+    @classmethod
+    def from_ticks(cls, ticks: dict) -> "TickGrid":
+        """Unknown ids are ignored (same as the fill engines always did)."""
+        bits = 0
+        for glyph_id, checked in ticks.items():
+            i = GLYPH_BITS.get(glyph_id)
+            if i is not None and checked:
+                bits |= 1 << i
+        return cls(bits)
+
+    def to_ticks(self) -> dict:
+        """All 20 ids with a bool each."""
+        return {g: bool(self.bits >> i & 1) for i, g in enumerate(GLYPH_IDS)}
+
+    @classmethod
+    def from_csv_row(cls, row: dict) -> "TickGrid":
+        bits = 0
+        for i, col in enumerate(CSV_COLUMNS):
+            if parse_bool(row.get(col)):
+                bits |= 1 << i
+        return cls(bits)
+
+    def to_csv_row(self) -> dict:
+        return {col: "true" if self.bits >> i & 1 else "false" for i, col in enumerate(CSV_COLUMNS)}
+
+    # ---- accessors
+    def get(self, row: int, col: int) -> bool:
+        return bool(self.bits >> _bit(row, col) & 1)
+
+    def __getitem__(self, cell: tuple[int, int]) -> bool:
+        return self.get(*cell)
+
+    def with_tick(self, row: int, col: int, checked: bool = True) -> "TickGrid":
+        flag = 1 << _bit(row, col)
+        return TickGrid(self.bits | flag if checked else self.bits & ~flag)
+
+    def row(self, row: int) -> int:
+        """4-bit mask of one row (bit 0 = column 2)."""
+        return self.bits >> _bit(row, COLS[0]) & _ROW_MASK
+
+    def with_row(self, row: int, mask: int) -> "TickGrid":
+        shift = _bit(row, COLS[0])
+        return TickGrid(self.bits & ~(_ROW_MASK << shift) | (mask & _ROW_MASK) << shift)
+
+    def mirror_row(self, src_row: int, dst_row: int) -> "TickGrid":
+        """Copy the ticks of src_row onto dst_row (same columns)."""
+        return self.with_row(dst_row, self.row(src_row))
+
+    def row_ticks(self, row: int) -> dict:
+        """{"glyph_r<row>_c<col>": bool} for one row."""
+        mask = self.row(row)
+        return {f"glyph_r{row}_c{c}": bool(mask >> j & 1) for j, c in enumerate(COLS)}
+
+    def cells(self):
+        """(row, col) of every ticked cell, in bit order."""
+        bits = self.bits
+        while bits:
+            low = bits & -bits
+            yield CELLS[low.bit_length() - 1]
+            bits ^= low
+
+    def glyph_ids(self) -> list[str]:
+        return [f"glyph_r{r}_c{c}" for r, c in self.cells()]
+
+    # ---- value semantics
+    def __int__(self) -> int:
+        return self.bits
+
+    def __bool__(self) -> bool:
+        return bool(self.bits)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, TickGrid) and other.bits == self.bits
+
+    def __hash__(self) -> int:
+        return hash(self.bits)
+
+    def __reduce__(self):
+        return TickGrid, (self.bits,)
+
+    def __repr__(self) -> str:
+        return f"TickGrid(0x{self.bits:05x})"
@@ -8,15 +8,18 @@ Functions:
 - parse_bool(s): robust bool parser for CSV cells
 """
 
+PROJECT_LEVELS = ("L1", "L2L", "L2", "L3L")
+TRUE_VALUES = frozenset(("1", "true", "yes", "y", "t"))
+FALSE_VALUES = frozenset(("", "0", "false", "no", "n", "f"))     # what a strict CSV check accepts as "unticked"
+
 def normalize_project_level(value: str | None) -> str | None:
     if not value:
         return None
     v = str(value).strip()
-    allowed = {"L1", "L2L", "L2", "L3L"}
-    return v if v in allowed else None
+    return v if v in PROJECT_LEVELS else None
 
 def parse_bool(s) -> bool:
     if s is None:
         return False
     v = str(s).strip().lower()
-    return v in ("1", "true", "yes", "y", "t")
+    return v in TRUE_VALUES
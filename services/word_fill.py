@@ -6,62 +6,88 @@ Word COM automation (Windows + installed Word required).
 Pipelines/Functions:
 - fill_and_export(docx_template, full_docx_template, mapping, out_dir, out_basename, export_docx=True)
     Orchestrates: open single-page template -> set dropdown (cc_2) -> set device ticks
-    -> paste that page over page 3 of full_docx_template -> save DOCX/PDF -> return paths.
+    -> copy that page over page 3 of full_docx_template -> save DOCX/PDF -> return paths.
 
-- _open_word() / _quit_word(app): manage Word app lifecycle
+- _fill_in_word(app, ...): the fill itself, run on a pooled Word instance (services.word_pool)
+    With AppConfig.PAGE_SPLICE only the filled page is exported to PDF and spliced into a
+    cached PDF of the full template (services.pdf_splice); the full document is only
+    assembled when a DOCX is requested.
 - _open_doc(app, path) / _close_doc(doc)
-- _find_cc_in_cell(doc, table_index, row, col): locate content-control in a specific cell
+- _template_doc(app, path) / _release_doc(doc): templates, kept open per worker with
+    AppConfig.WORD_PIN_TEMPLATES (services.word_pool.pinned_document) instead of reopened per job
+- _find_cc_in_cell(doc, table_index, row, col, index): locate content-control in a specific cell
+    (one ContentControls.Item() call via services.cc_index; linear scan only without an index)
 - _set_dropdown_value(cc, value): choose an entry by Text
 - _set_device_cell_tick(...): write ☐/☒ (U+2610/U+2612)
-- _replace_page3_with_doc_content(app, src_doc, full_path): returns opened full doc after replacement
+- _template_ticks(doc, path): TickGrid of the boxes the template itself has ticked (read
+    once per template file), so unticked cells are only written where ☐ must replace ☒
+- _set_fields(doc, docx_template, full_doc, full_docx_template, fields): mapping["fields"]
+    {tag: value} through each document's tag index; page 3 tags from the single page
+- _set_cc_value(cc, value): set one checkbox / list / date / text control
+- _replace_page3_with_doc_content(app, src_doc, full_path, full_doc=None): returns opened full doc after replacement
+    (Range.FormattedText transfer, no clipboard)
+- _page_range(doc, page): Range of one page
 """
 
 import os
 import threading
-import pythoncom  # required for COM in multithreaded environments
-import win32com.client as com
 
+from config import AppConfig
+from services.cc_index import com_control, get_com_index
+from services.form_fields import check_tags, is_checked, normalize_fields
+from services.pdf_splice import splice_page, template_pdf
 from services.storage import relpath_from_output
-
-# Global mutex to serialize COM access
-_WORD_LOCK = threading.Lock()
+from services.tick_grid import CELLS, TickGrid
+from services.word_pool import pinned_document, run_in_word
 
 # Word constants
-_wdFormatPDF = 17           # SaveAs2 format for PDF
+_wdExportFormatPDF = 17     # ExportAsFixedFormat format for PDF
 _wdGoToPage = 1             # wdGoToPage
 _wdGoToAbsolute = 1         # wdGoToAbsolute
+_wdContentControlCheckBox = 8
+_wdContentControlDate = 6
+_wdContentControlDropdownList = 4
+_wdContentControlComboBox = 3
 
 CHECKED_CHAR = "☒"          # U+2612: box with X  (required)
 UNCHECKED_CHAR = "☐"        # U+2610: empty box
 
-def _open_word():
-    pythoncom.CoInitialize()
-    app = com.DispatchEx("Word.Application")
-    app.Visible = False
-    app.DisplayAlerts = 0
-    return app
-
-def _quit_word(app):
-    try:
-        app.Quit()
-    finally:
-        pythoncom.CoUninitialize()
-
 def _open_doc(app, path: str):
     return app.Documents.Open(os.path.abspath(path))
 
 def _close_doc(doc):
     doc.Close(SaveChanges=False)
 
+def _template_doc(app, path: str):
+    """
+    A template to fill: with AppConfig.WORD_PIN_TEMPLATES the worker's already open copy
+    (reverted in place after the job by services.word_pool), else a fresh Documents.Open.
+    """
+    if AppConfig.WORD_PIN_TEMPLATES:
+        return pinned_document(path)
+    return _open_doc(app, path)
+
+def _release_doc(doc):
+    """Counterpart of _template_doc: pinned templates stay open for the next job."""
+    if not AppConfig.WORD_PIN_TEMPLATES:
+        _close_doc(doc)
+
+def _save_pdf(doc, pdf_path: str):
+    # ExportAsFixedFormat leaves the document bound to its file (SaveAs2 would rename it)
+    doc.ExportAsFixedFormat(os.path.abspath(pdf_path), _wdExportFormatPDF)
+
 def _cell_range(doc, table_index: int, row: int, col: int):
     tbl = doc.Tables.Item(table_index)
     cell = tbl.Rows.Item(row).Cells.Item(col)
     return cell.Range  # includes end-of-cell marker characters
 
-def _find_cc_in_cell(doc, table_index: int, row: int, col: int):
+def _find_cc_in_cell(doc, table_index: int, row: int, col: int, index=None):
     """
     Return the first ContentControl whose Range is fully inside the given table cell.
+    With a ContentControlIndex this is a dict hit + one COM call instead of a scan.
     """
+    if index is not None:
+        return com_control(doc, index, cell=(table_index, row, col))
     cell_rng = _cell_range(doc, table_index, row, col)
     cstart, cend = cell_rng.Start, cell_rng.End
     for i in range(1, doc.ContentControls.Count + 1):
@@ -141,35 +167,165 @@ def _set_device_cell_tick(doc, table_index: int, row: int, col: int, checked: bo
     except Exception:
         pass
 
-def _replace_page3_with_doc_content(app, src_doc, full_path: str):
+_TEMPLATE_TICKS = {}        # (abspath, mtime, size) -> TickGrid ticked in the template
+_TEMPLATE_TICKS_LOCK = threading.Lock()
+
+def _template_ticks(doc, path: str) -> TickGrid:
+    """Boxes already ☒/☑ in the template at `path`, read from the pristine `doc` on first use."""
+    key = (os.path.abspath(path), os.path.getmtime(path), os.path.getsize(path))
+    with _TEMPLATE_TICKS_LOCK:
+        grid = _TEMPLATE_TICKS.get(key)
+    if grid is None:
+        bits = 0
+        for i, (row, col) in enumerate(CELLS):
+            try:
+                core = _strip_cell_end(_cell_range(doc, 1, row, col).Text)
+            except Exception:
+                continue
+            if CHECKED_CHAR in core or "☑" in core:
+                bits |= 1 << i
+        grid = TickGrid(bits)
+        with _TEMPLATE_TICKS_LOCK:
+            for stale in [k for k in _TEMPLATE_TICKS if k[0] == key[0]]:
+                del _TEMPLATE_TICKS[stale]
+            _TEMPLATE_TICKS[key] = grid
+    return grid
+
+def _set_cc_value(cc, value):
     """
-    Copies src_doc.Content (single page) and pastes it over page 3 of the full template.
-    Returns the opened 'full' document object (caller is responsible to close it).
+    Checkbox -> Checked; dropdown -> list entry (others ignored); combobox -> list entry
+    or free text; date / text -> Range.Text.
     """
-    # Copy source page to clipboard
-    src_doc.Content.Copy()
+    try:
+        kind = cc.Type
+        if kind == _wdContentControlCheckBox:
+            cc.Checked = is_checked(value)
+            return
+        value = str(value)
+        if kind in (_wdContentControlDropdownList, _wdContentControlComboBox):
+            entries = cc.DropdownListEntries
+            for j in range(1, entries.Count + 1):
+                e = entries.Item(j)
+                if e.Text == value or getattr(e, "Value", None) == value:
+                    e.Select()
+                    return
+            if kind == _wdContentControlDropdownList:
+                return
+        cc.Range.Text = value
+    except Exception:
+        pass
 
-    full_doc = _open_doc(app, full_path)
-    full_doc.Activate()
-    sel = app.Selection
+def _set_fields(doc, docx_template: str, full_doc, full_docx_template: str, fields: dict):
+    """
+    Fill tag fields before the splice. Page 3 of the output is the single page, so its
+    tags are set in `doc` and travel with it; in the full template only the controls
+    outside page 3 (the page the splice overwrites) are set. Each tag resolves through the
+    template's cached index (services.cc_index): one dict hit and one ContentControls.Item()
+    call per control. Tags neither document can take raise FieldTagError before any write.
+    """
+    fields = normalize_fields(fields)
+    page_tags = get_com_index(doc, docx_template).by_tag
+    full_tags = get_com_index(full_doc, full_docx_template).by_tag
+    page3 = _page_range(full_doc, 3)
+    start, end = page3.Start, page3.End
+
+    targets, replaced = {}, set()
+    for tag in fields:
+        controls = [doc.ContentControls.Item(pos) for pos in page_tags.get(tag, ())]
+        for pos in full_tags.get(tag, ()):
+            cc = full_doc.ContentControls.Item(pos)
+            if start <= cc.Range.Start < end:
+                replaced.add(tag)
+            else:
+                controls.append(cc)
+        if controls:
+            targets[tag] = controls
+    check_tags(fields, targets, replaced)
+
+    for tag, controls in targets.items():
+        for cc in controls:
+            _set_cc_value(cc, fields[tag])
+
+def _page_range(doc, page: int):
+    """
+    Range of page `page` (1-based): its start up to the start of the next page, or the end
+    of the document on the last page. Document.GoTo moves no selection and needs no window.
+    """
+    start = doc.GoTo(What=_wdGoToPage, Which=_wdGoToAbsolute, Count=page).Start
+    end = doc.GoTo(What=_wdGoToPage, Which=_wdGoToAbsolute, Count=page + 1).Start
+    if end <= start:            # GoTo past the last page stays on the last page
+        end = doc.Content.End
+    return doc.Range(Start=start, End=end)
 
-    # Go to page 3 start
-    sel.GoTo(What=_wdGoToPage, Which=_wdGoToAbsolute, Count=3)
-    start = sel.Start
+def _replace_page3_with_doc_content(app, src_doc, full_path: str, full_doc=None):
+    """
+    Replaces page 3 of the full template (opened here unless the caller passes it already
+    open) with src_doc.Content (single page), formatting included.
+    The transfer is range-to-range (Range.FormattedText) inside the Word instance: no
+    clipboard, so pooled instances can splice side by side.
+    Returns the 'full' document object (caller is responsible to close it).
+    """
+    if full_doc is None:
+        full_doc = _open_doc(app, full_path)
+    _page_range(full_doc, 3).FormattedText = src_doc.Content.FormattedText
+    return full_doc
 
-    # Try to get start of page 4; if not present, use end of document
+def _export_pdf_in_word(app, docx_path: str, pdf_path: str):
+    doc = _template_doc(app, docx_path)
     try:
-        sel.GoTo(What=_wdGoToPage, Which=_wdGoToAbsolute, Count=4)
-        end = sel.Start
-    except Exception:
-        end = full_doc.Content.End
+        _save_pdf(doc, pdf_path)
+    finally:
+        _release_doc(doc)
 
-    # Replace that range with the source page
-    rng = full_doc.Range(Start=start, End=end)
-    rng.Select()
-    app.Selection.Paste()
+def _fill_in_word(app, docx_template: str, full_docx_template: str, mapping: dict,
+                  abs_docx: str, abs_pdf: str, export_docx: bool, page_pdf: str | None = None):
+    # 1) Open single-page working template and fill it
+    doc = _template_doc(app, docx_template)
+    full_doc = None
+    try:
+        # Dropdown at Table(1), Row(2), Col(2)
+        index = get_com_index(doc, docx_template)
+        cc = _find_cc_in_cell(doc, table_index=1, row=2, col=2, index=index)
+        if cc:
+            _set_dropdown_value(cc, mapping.get("projectLevel"))
+
+        # Device ticks: ticked cells get ☒; unticked ones only need a write where the
+        # template itself has a ticked box (☐ replaces it)
+        ticks = TickGrid.coerce(mapping.get("ticks"))
+        clear = TickGrid(_template_ticks(doc, docx_template).bits & ~ticks.bits)   # before any write
+        for row, col in ticks.cells():
+            _set_device_cell_tick(doc, table_index=1, row=row, col=col, checked=True)
+        for row, col in clear.cells():
+            _set_device_cell_tick(doc, table_index=1, row=row, col=col, checked=False)
+
+        # PAGE_SPLICE: export just this page; the caller splices it into the cached full PDF
+        if page_pdf:
+            _save_pdf(doc, page_pdf)
+            if not export_docx:
+                return
 
-    return full_doc
+        # Tag fields: page 3 controls come from the single page, the rest from the full
+        # template outside page 3 (filled before the splice, while its tag index still
+        # matches the file; the splice then brings the filled page 3 along)
+        if mapping.get("fields"):
+            full_doc = _template_doc(app, full_docx_template)
+            _set_fields(doc, docx_template, full_doc, full_docx_template, mapping["fields"])
+
+        # 2) Copy the filled page over page 3 of the full template
+        if full_doc is None:
+            full_doc = _template_doc(app, full_docx_template)
+        full_doc = _replace_page3_with_doc_content(app, doc, full_docx_template, full_doc)
+
+        # 3) Save (from the full_doc)
+        if not page_pdf:
+            _save_pdf(full_doc, abs_pdf)              # PDF
+        if export_docx:
+            full_doc.SaveAs2(abs_docx)                # DOCX
+    finally:
+        # 4) Close (or, pinned, leave for the pool to revert) the docs; Word stays up
+        if full_doc is not None:
+            _release_doc(full_doc)
+        _release_doc(doc)
 
 def fill_and_export(
     docx_template: str,
@@ -185,51 +341,34 @@ def fill_and_export(
     mapping example:
     {
       "projectLevel": "L2",         # or None for placeholder
-      "ticks": { "glyph_r16_c2": true, ... }  # may include r16..r20
+      "ticks": { "glyph_r16_c2": true, ... },  # r16..r20, or a TickGrid
+      "fields": { "capa_associated_select_one_combo": "Yes", ... }  # optional, by tag
     }
 
-    We fill the single-page template, then paste that page over page 3 of the full template,
-    and save PDF/DOCX from the full template.
+    We fill the single-page template, then copy that page over page 3 of the full template,
+    and save PDF/DOCX from the full template. Runs on a pooled Word worker.
     """
     os.makedirs(out_dir, exist_ok=True)
     abs_docx = os.path.join(out_dir, f"{out_basename}.docx")
     abs_pdf  = os.path.join(out_dir, f"{out_basename}.pdf")
 
-    with _WORD_LOCK:
-        app = _open_word()
+    # tag fields may sit on any page, so they need the full-document export
+    if AppConfig.PAGE_SPLICE and not mapping.get("fields"):
+        base_pdf = template_pdf(
+            full_docx_template, "com",
+            lambda pdf: run_in_word(_export_pdf_in_word, full_docx_template, pdf),
+        )
+        page_pdf = os.path.join(out_dir, f".{out_basename}.page.pdf")
         try:
-            # 1) Open single-page working template and fill it
-            doc = _open_doc(app, docx_template)
-
-            # Dropdown at Table(1), Row(2), Col(2)
-            cc = _find_cc_in_cell(doc, table_index=1, row=2, col=2)
-            if cc:
-                _set_dropdown_value(cc, mapping.get("projectLevel"))
-
-            # Device ticks (IDs like glyph_r16_c2, glyph_r17_c5, ...)
-            ticks = mapping.get("ticks") or {}
-            for glyph_id, checked in ticks.items():
-                try:
-                    parts = glyph_id.replace("glyph_r", "").split("_c")
-                    row = int(parts[0]); col = int(parts[1])
-                except Exception:
-                    continue
-                _set_device_cell_tick(doc, table_index=1, row=row, col=col, checked=bool(checked))
-
-            # 2) Paste the filled page over page 3 of the full template
-            full_doc = _replace_page3_with_doc_content(app, doc, full_docx_template)
-
-            # 3) Save (from the full_doc)
-            if export_docx:
-                full_doc.SaveAs2(abs_docx)                # DOCX
-            full_doc.SaveAs2(abs_pdf, FileFormat=_wdFormatPDF)  # PDF
-
-            # 4) Close docs
-            _close_doc(full_doc)
-            _close_doc(doc)
-
+            run_in_word(_fill_in_word, docx_template, full_docx_template, mapping,
+                        abs_docx, abs_pdf, export_docx, page_pdf)
+            splice_page(base_pdf, page_pdf, abs_pdf)
         finally:
-            _quit_word(app)
+            if os.path.exists(page_pdf):
+                os.remove(page_pdf)
+    else:
+        run_in_word(_fill_in_word, docx_template, full_docx_template, mapping,
+                    abs_docx, abs_pdf, export_docx)
 
     rel_pdf = relpath_from_output(abs_pdf)
     result = {"rel_pdf_path": rel_pdf}
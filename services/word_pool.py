@@ -0,0 +1,655 @@
+"""
+services/word_pool.py
+---------------------
+Pool of long-lived Word workers (instead of launch-and-quit per document).
+
+Each worker is a thread that owns one Word instance for its whole life: COM objects are
+apartment-bound, so jobs are handed to the worker thread and run there.
+
+Pipelines/Functions:
+- get_word_pool(): process-wide pool built from AppConfig (WORD_POOL_*)
+- run_in_word(fn, *args, timeout=None, **kwargs): run fn(app, *args, **kwargs) on a pooled Word instance
+- WordPool(backend, size, max_jobs, timeout): the pool itself
+    - warm-up: every worker starts its instance (and runs backend.warm_up) before taking jobs
+    - recycling: an instance is restarted after `max_jobs` jobs
+    - health checks: backend.is_alive(app) before each job; dead instances are replaced
+    - backend.reset(app, keep) after each job closes anything the job left open
+    - pinned templates: pinned_document(path) hands a job the worker's already open copy
+      of a template; after the job it is reverted in place (Undo) instead of being
+      closed, so a template is parsed once per Word instance, not once per job. A job's
+      SaveAs2 leaves the document saved as that job's output; the next job's SaveAs2 moves
+      it on, and only a worker left idle for _IDLE_RELEASE seconds saves it once more to a
+      scratch file so the last output is not held open
+    - timeouts: a call past its deadline fails with WordCallTimeout; the watchdog kills
+      that Word process and starts a replacement worker ("killed" in stats; "kill_failed"
+      when the process id is unknown or the kill did not go through)
+- ComWordBackend: real Word via pywin32 (Windows); the process id of each instance comes
+    from its main window (unique Caption, class OpusApp), else from the WINWORD.EXE
+    processes that appeared around its DispatchEx
+- FakeWordBackend: in-process stand-in so pool logic can run on Linux
+
+One pool per process owns every Word automation call, so its size is the one limit on
+concurrent Word instances.
+"""
+
+import hashlib
+import itertools
+import os
+import queue
+import shutil
+import signal
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+from config import AppConfig
+
+
+class WordBackend:
+    """
+    Minimal interface the pool needs. All methods are called on the worker thread.
+    """
+
+    def start(self):
+        raise NotImplementedError
+
+    def stop(self, app):
+        raise NotImplementedError
+
+    def warm_up(self, app):
+        pass
+
+    def is_alive(self, app) -> bool:
+        return True
+
+    def reset(self, app, keep=()):
+        """Close every document except those in `keep` (pinned templates)."""
+        pass
+
+    def open_pinned(self, app, path: str):
+        """Open a template to keep for many jobs; returns the document."""
+        raise NotImplementedError
+
+    def revert(self, doc) -> bool:
+        """Undo everything done to a pinned document; False if it must be reopened."""
+        return False
+
+    def fingerprint(self, doc):
+        """Cheap summary of a document's content, compared before and after a revert."""
+        return None
+
+    def rebind(self, doc, path: str):
+        raise NotImplementedError
+
+    def pid(self, app) -> int | None:
+        """OS process id of the instance, if known (called on the worker thread)."""
+        return None
+
+    def kill(self, app, pid: int | None) -> bool:
+        """
+        Force the instance down from another thread (the watchdog); no COM calls.
+        True once it is killed, False when it cannot be (e.g. no process id).
+        """
+        raise NotImplementedError
+
+
+class ComWordBackend(WordBackend):
+    """Word.Application over COM (one process per worker)."""
+
+    def __init__(self):
+        self._start_lock = threading.Lock()     # one DispatchEx at a time: the PID diff stays unambiguous
+        self._pids = {}                          # Caption -> pid seen appearing at start (or None)
+
+    def start(self):
+        import pythoncom
+        import win32com.client as com
+
+        pythoncom.CoInitialize()
+        with self._start_lock:
+            before = _word_pids()
+            app = com.DispatchEx("Word.Application")
+            new = _word_pids() - before
+        app.Visible = False
+        app.DisplayAlerts = 0
+        caption = f"word-pool-{os.getpid()}-{next(_CAPTIONS)}"
+        app.Caption = caption
+        self._pids[caption] = new.pop() if len(new) == 1 else None
+        return app
+
+    def stop(self, app):
+        import pythoncom
+
+        try:
+            self._pids.pop(app.Caption, None)
+        except Exception:
+            pass
+        try:
+            app.Quit(SaveChanges=0)
+        except Exception:
+            pass
+        finally:
+            pythoncom.CoUninitialize()
+
+    def warm_up(self, app):
+        # First Documents.Add loads Normal.dotm and fonts; pay that before the first job.
+        doc = app.Documents.Add()
+        doc.Close(SaveChanges=False)
+
+    def is_alive(self, app) -> bool:
+        try:
+            app.Documents.Count
+            return True
+        except Exception:
+            return False
+
+    def reset(self, app, keep=()):
+        keep_names = {doc.FullName.lower() for doc in keep}
+        for i in range(app.Documents.Count, 0, -1):
+            doc = app.Documents.Item(i)
+            if doc.FullName.lower() not in keep_names:
+                doc.Close(SaveChanges=False)
+
+    def open_pinned(self, app, path: str):
+        doc = app.Documents.Open(os.path.abspath(path), ReadOnly=True, AddToRecentFiles=False)
+        doc.UndoClear()
+        return doc
+
+    def revert(self, doc) -> bool:
+        for _ in range(_MAX_UNDO):
+            if not doc.Undo():
+                break
+        else:
+            return False
+        doc.UndoClear()
+        return True
+
+    def fingerprint(self, doc):
+        return (doc.ContentControls.Count, hash(doc.Content.Text))
+
+    def rebind(self, doc, path: str):
+        """A pinned document saved under an output name is saved again under `path`, releasing that file."""
+        doc.SaveAs2(os.path.abspath(path), AddToRecentFiles=False)
+
+    def pid(self, app) -> int | None:
+        """Word.Application has no Hwnd; its main window is found by the Caption set in start()."""
+        import win32gui
+        import win32process
+
+        caption = app.Caption
+        hwnd = win32gui.FindWindow("OpusApp", caption)
+        if hwnd:
+            return win32process.GetWindowThreadProcessId(hwnd)[1]
+        return self._pids.get(caption)
+
+    def kill(self, app, pid: int | None) -> bool:
+        if not pid:
+            return False
+        os.kill(pid, signal.SIGTERM)        # TerminateProcess on Windows
+        return True
+
+
+_CAPTIONS = itertools.count(1)
+
+
+def _word_pids() -> set:
+    """Process ids of the running WINWORD.EXE processes (empty when they cannot be listed)."""
+    import win32api
+    import win32con
+    import win32process
+
+    pids = set()
+    for pid in win32process.EnumProcesses():
+        try:
+            handle = win32api.OpenProcess(
+                win32con.PROCESS_QUERY_INFORMATION | win32con.PROCESS_VM_READ, False, pid)
+        except Exception:
+            continue
+        try:
+            exe = win32process.GetModuleFileNameEx(handle, 0)
+        except Exception:
+            continue
+        finally:
+            win32api.CloseHandle(handle)
+        if os.path.basename(exe).lower() == "winword.exe":
+            pids.add(pid)
+    return pids
+
+
+class FakeWordApp:
+    """Stand-in for Word.Application used by FakeWordBackend."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self):
+        self.id = next(self._ids)
+        self.alive = True
+        self.jobs = 0
+        self.warmed = False
+        self.documents = []
+
+
+class FakeDocument:
+    """Stand-in for a Word Document: counts edits so revert can be observed."""
+
+    def __init__(self, path: str):
+        self.FullName = os.path.abspath(path)
+        self.changes = 0
+
+
+class FakeWordBackend(WordBackend):
+    """In-process backend: no Word, no COM. Jobs receive a FakeWordApp."""
+
+    def __init__(self):
+        self.started = 0
+        self.stopped = 0
+        self.opened = 0
+
+    def start(self):
+        self.started += 1
+        return FakeWordApp()
+
+    def stop(self, app):
+        self.stopped += 1
+        app.alive = False
+
+    def warm_up(self, app):
+        app.warmed = True
+
+    def is_alive(self, app) -> bool:
+        return app.alive
+
+    def reset(self, app, keep=()):
+        app.jobs += 1
+        app.documents = [d for d in app.documents if d in keep]
+
+    def open_pinned(self, app, path: str):
+        self.opened += 1
+        doc = FakeDocument(path)
+        app.documents.append(doc)
+        return doc
+
+    def revert(self, doc) -> bool:
+        doc.changes = 0
+        return True
+
+    def fingerprint(self, doc):
+        return doc.changes
+
+    def rebind(self, doc, path: str):
+        doc.FullName = os.path.abspath(path)
+
+    def kill(self, app, pid: int | None) -> bool:
+        app.alive = False
+        return True
+
+
+_BACKENDS = {"com": ComWordBackend, "fake": FakeWordBackend}
+
+_MAX_UNDO = 1000                    # undo steps before a pinned document is reopened instead
+_IDLE_RELEASE = 2.0                 # idle seconds before pinned documents let go of the last output file
+_local = threading.local()          # .pinned: the PinnedDocuments of the current worker thread
+
+
+class PinnedDocuments:
+    """
+    Templates one worker keeps open across jobs (worker thread only). A document is
+    reverted after every job that used it; if the revert fails, or its content no longer
+    matches the state it was opened in, it is closed and reopened on next use. A template
+    that changes on disk is reopened as well. A document a job saved under an output name
+    stays bound to that file until release() (called by an idle worker) rebinds it.
+    """
+
+    def __init__(self, backend: WordBackend, app, scratch_dir: str):
+        self.backend = backend
+        self.app = app
+        self.scratch_dir = scratch_dir
+        self._docs = {}             # abspath -> {doc, file (mtime, size), pristine fingerprint, name, bound}
+        self._used = set()
+        self.stats = {"opened": 0, "reused": 0, "reopened": 0, "rebound": 0}
+
+    def get(self, path: str):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        fkey = (st.st_mtime, st.st_size)
+        entry = self._docs.get(path)
+        if entry is not None and entry["file"] != fkey:
+            self._drop(path)
+            entry = None
+        if entry is None:
+            doc = self.backend.open_pinned(self.app, path)
+            entry = self._docs[path] = {
+                "doc": doc, "file": fkey, "pristine": self.backend.fingerprint(doc), "name": doc.FullName,
+                "bound": False,
+            }
+            self.stats["opened"] += 1
+        else:
+            self.stats["reused"] += 1
+        self._used.add(path)
+        return entry["doc"]
+
+    def documents(self) -> list:
+        return [entry["doc"] for entry in self._docs.values()]
+
+    def _drop(self, path: str):
+        doc = self._docs.pop(path)["doc"]
+        try:
+            doc.Close(SaveChanges=False)
+        except Exception:
+            pass
+
+    def revert(self):
+        for path in self._used:
+            entry = self._docs.get(path)
+            if entry is None:
+                continue
+            doc = entry["doc"]
+            try:
+                ok = self.backend.revert(doc) and self.backend.fingerprint(doc) == entry["pristine"]
+                # SaveAs2 by the job bound it to an output file; the next SaveAs2 or release() moves it off
+                entry["bound"] = ok and (entry["bound"] or doc.FullName != entry["name"])
+            except Exception:
+                ok = False
+            if not ok:
+                self.stats["reopened"] += 1
+                self._drop(path)
+        self._used.clear()
+
+    def bound(self) -> bool:
+        """True while some document is still saved under a job's output name."""
+        return any(entry["bound"] for entry in self._docs.values())
+
+    def release(self):
+        """Rebind every document still saved under an output name to a scratch file."""
+        for path, entry in list(self._docs.items()):
+            if not entry["bound"]:
+                continue
+            try:
+                digest = hashlib.sha1(path.encode("utf-8")).hexdigest()[:8]
+                self.backend.rebind(entry["doc"], os.path.join(self.scratch_dir, f"{digest}_{os.path.basename(path)}"))
+                entry["name"] = entry["doc"].FullName
+                entry["bound"] = False
+                self.stats["rebound"] += 1
+            except Exception:
+                self.stats["reopened"] += 1
+                self._drop(path)
+
+    def close(self):
+        for path in list(self._docs):
+            self._drop(path)
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+
+def pinned_document(path: str):
+    """
+    The calling worker's open copy of the template at `path`, in its pristine state.
+    Only valid inside a job running on the pool (fn passed to run_in_word); do not close it.
+    """
+    pinned = getattr(_local, "pinned", None)
+    if pinned is None:
+        raise RuntimeError("pinned_document() called outside a Word pool worker")
+    return pinned.get(path)
+
+
+class WordCallTimeout(TimeoutError):
+    """A Word call ran past its timeout; its instance was killed and replaced."""
+
+
+_STOP = object()
+
+
+class _Worker:
+    """One worker thread and the Word instance it owns (fields read by the watchdog)."""
+
+    __slots__ = ("name", "thread", "app", "pid", "pinned", "job", "deadline", "retired")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.thread = None
+        self.app = None
+        self.pid = None
+        self.pinned = None          # PinnedDocuments of the current instance
+        self.job = None             # (future, fn, args, kwargs, timeout) while running
+        self.deadline = None
+        self.retired = False
+
+
+class WordPool:
+    """
+    N worker threads, each owning one Word instance from `backend`.
+    run() blocks until a worker has executed the job and returns its result (or raises).
+
+    Every call has a deadline (`timeout`, per pool or per call). A watchdog thread fails
+    calls past their deadline with WordCallTimeout, kills their Word process (a COM call
+    blocked in a hung Word cannot be interrupted from Python) and starts a replacement
+    worker, so the pool keeps its size. The stuck thread exits once its call returns.
+    """
+
+    def __init__(self, backend: WordBackend, size: int = 1, max_jobs: int = 50,
+                 timeout: float | None = None, watch_interval: float = 1.0):
+        self.backend = backend
+        self.size = max(1, int(size))
+        self.max_jobs = max(1, int(max_jobs))
+        self.timeout = timeout if timeout and timeout > 0 else None
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = []
+        self._names = itertools.count(1)
+        self._closed = threading.Event()
+        self.stats = {"jobs": 0, "failed": 0, "starts": 0, "recycled": 0, "unhealthy": 0,
+                      "timeouts": 0, "killed": 0, "kill_failed": 0, "templates_opened": 0, "templates_reused": 0,
+                      "templates_reopened": 0, "templates_rebound": 0}
+        ready = [self._spawn() for _ in range(self.size)]
+        for ev in ready:
+            ev.wait()
+        self._watchdog = None
+        if watch_interval:
+            self._watchdog = threading.Thread(target=self._watch, args=(watch_interval,),
+                                              name="word-watchdog", daemon=True)
+            self._watchdog.start()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _spawn(self) -> threading.Event:
+        w = _Worker(f"word-worker-{next(self._names)}")
+        ev = threading.Event()
+        w.thread = threading.Thread(target=self._worker, args=(w, ev), name=w.name, daemon=True)
+        with self._lock:
+            self._workers.append(w)
+        w.thread.start()
+        return ev
+
+    def _pinned_stats(self, pinned: "PinnedDocuments"):
+        with self._lock:
+            for key, n in pinned.stats.items():
+                self.stats[f"templates_{key}"] += n
+            pinned.stats = dict.fromkeys(pinned.stats, 0)
+
+    def _start(self, w: _Worker):
+        w.app = self.backend.start()
+        self._count("starts")
+        w.pinned = _local.pinned = PinnedDocuments(self.backend, w.app, tempfile.mkdtemp(prefix="word-pinned-"))
+        try:
+            w.pid = self.backend.pid(w.app)
+        except Exception:
+            w.pid = None
+        self.backend.warm_up(w.app)
+
+    def _stop(self, w: _Worker):
+        app, w.app, w.pid = w.app, None, None
+        pinned, w.pinned, _local.pinned = w.pinned, None, None
+        if pinned is not None:
+            self._pinned_stats(pinned)
+            if app is not None and not w.retired:
+                pinned.close()
+            else:
+                shutil.rmtree(pinned.scratch_dir, ignore_errors=True)
+        if app is None:
+            return
+        try:
+            self.backend.stop(app)
+        except Exception:
+            pass
+
+    def _worker(self, w: _Worker, ready: threading.Event):
+        try:
+            self._start(w)
+        except Exception:
+            self._stop(w)   # retried when the first job arrives
+        ready.set()
+
+        done = 0
+        while not w.retired:
+            job = self._next_job(w)
+            if job is _STOP:
+                break
+            fut, fn, args, kwargs, timeout = job
+            if not fut.set_running_or_notify_cancel():
+                continue
+            with self._lock:
+                w.job = job
+                w.deadline = time.monotonic() + timeout if timeout else None
+            try:
+                if w.app is None or not self.backend.is_alive(w.app):
+                    if w.app is not None:
+                        self._count("unhealthy")
+                        self._stop(w)
+                    done = 0
+                    self._start(w)
+                result = fn(w.app, *args, **kwargs)
+            except BaseException as e:
+                self._count("failed")
+                _settle(fut, exception=e)
+            else:
+                _settle(fut, result=result)
+            finally:
+                with self._lock:
+                    w.job = w.deadline = None
+                self._count("jobs")
+                done += 1
+
+            if w.retired:
+                break       # the watchdog killed this instance and started a replacement
+            if w.app is not None:
+                try:
+                    if w.pinned is not None:
+                        w.pinned.revert()
+                    self.backend.reset(w.app, keep=w.pinned.documents() if w.pinned else ())
+                except Exception:
+                    pass
+                if w.pinned is not None:
+                    self._pinned_stats(w.pinned)
+                if done >= self.max_jobs:
+                    self._count("recycled")
+                    self._stop(w)
+                    done = 0
+                    try:
+                        self._start(w)
+                    except Exception:
+                        self._stop(w)
+
+        self._stop(w)
+        with self._lock:
+            if w in self._workers:
+                self._workers.remove(w)
+
+    def _next_job(self, w: _Worker):
+        """
+        The next queued job. While a pinned document is still saved as the last job's
+        output, an idle wait first times out and rebinds it (one extra save per idle spell,
+        not per job: back-to-back jobs move it with their own SaveAs2).
+        """
+        if w.pinned is not None and w.pinned.bound():
+            try:
+                return self._jobs.get(timeout=_IDLE_RELEASE)
+            except queue.Empty:
+                w.pinned.release()
+                self._pinned_stats(w.pinned)
+        return self._jobs.get()
+
+    def _watch(self, interval: float):
+        while not self._closed.wait(interval):
+            now = time.monotonic()
+            with self._lock:
+                hung = [w for w in self._workers
+                        if not w.retired and w.deadline is not None and now > w.deadline]
+                for w in hung:
+                    w.retired = True
+                    self._workers.remove(w)
+            for w in hung:
+                fut, fn, _args, _kwargs, timeout = w.job or (None, None, None, None, None)
+                self._count("timeouts")
+                if fut is not None:
+                    name = getattr(fn, "__name__", "Word call")
+                    _settle(fut, exception=WordCallTimeout(f"{name} timed out after {timeout:g}s on {w.name}"))
+                if w.app is not None:
+                    try:
+                        killed = self.backend.kill(w.app, w.pid)
+                    except Exception:
+                        killed = False
+                    self._count("killed" if killed else "kill_failed")
+                if not self._closed.is_set():
+                    self._spawn()
+
+    def submit(self, fn, *args, timeout: float | None = None, **kwargs) -> Future:
+        """Queue fn(app, *args, **kwargs); `timeout` (seconds) overrides the pool's for this call."""
+        fut = Future()
+        self._jobs.put((fut, fn, args, kwargs, timeout if timeout is not None else self.timeout))
+        return fut
+
+    def run(self, fn, *args, timeout: float | None = None, **kwargs):
+        return self.submit(fn, *args, timeout=timeout, **kwargs).result()
+
+    def shutdown(self):
+        self._closed.set()
+        with self._lock:
+            workers = list(self._workers)
+        for _ in workers:
+            self._jobs.put(_STOP)
+        for w in workers:
+            w.thread.join()
+
+
+def _settle(fut: Future, result=None, exception: BaseException | None = None):
+    """Complete `fut` unless the watchdog (or the worker) already did."""
+    try:
+        if exception is not None:
+            fut.set_exception(exception)
+        else:
+            fut.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_word_pool() -> WordPool:
+    """
+    Lazily build the shared pool from AppConfig.WORD_POOL_BACKEND / _SIZE / _MAX_JOBS
+    and WORD_CALL_TIMEOUT. Every Word automation call of the app goes through it.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            name = AppConfig.WORD_POOL_BACKEND
+            if name not in _BACKENDS:
+                raise ValueError(f"Unknown WORD_POOL_BACKEND {name!r}; expected one of {tuple(_BACKENDS)}")
+            _POOL = WordPool(
+                _BACKENDS[name](),
+                size=AppConfig.WORD_POOL_SIZE,
+                max_jobs=AppConfig.WORD_POOL_MAX_JOBS,
+                timeout=AppConfig.WORD_CALL_TIMEOUT,
+            )
+        return _POOL
+
+
+def run_in_word(fn, *args, timeout: float | None = None, **kwargs):
+    """
+    Run fn(app, *args, **kwargs) on a pooled Word instance and return its result.
+    Raises WordCallTimeout when the call exceeds `timeout` (default WORD_CALL_TIMEOUT).
+    """
+    return get_word_pool().run(fn, *args, timeout=timeout, **kwargs)
@@ -6,7 +6,7 @@
  * Exposes:
  * - fetchOverlayMap()
  * - exportSingle(stateSnapshot, companyId)
- * - processCsv(file)
+ * - processCsv(file, onProgress)  (queues a /batch job, follows it until done)
  */
 
 export async function fetchOverlayMap() {
@@ -30,12 +30,47 @@ export async function exportSingle(stateSnapshot, companyId = "company") {
   return res.json();
 }
 
-export async function processCsv(file) {
+export async function processCsv(file, onProgress) {
   const form = new FormData();
   form.append("file", file);
   const res = await fetch("/batch", { method: "POST", body: form });
   if (!res.ok) throw new Error("Batch failed");
-  return res.json();
+  const job = await res.json();
+
+  const final = window.EventSource
+    ? await followJobEvents(job, onProgress)
+    : await pollJob(job, onProgress);
+  if (final.status !== "done") throw new Error(final.error || "Batch failed");
+  return final;
+}
+
+function followJobEvents(job, onProgress) {
+  return new Promise((resolve) => {
+    const es = new EventSource(job.events_url);
+    const progress = (e) => onProgress && onProgress(JSON.parse(e.data));
+    es.addEventListener("status", progress);
+    es.addEventListener("progress", progress);
+    es.addEventListener("done", (e) => {
+      es.close();
+      resolve(JSON.parse(e.data));
+    });
+    // stream dropped (proxy, restart): fall back to polling the status URL
+    es.onerror = () => {
+      es.close();
+      resolve(pollJob(job, onProgress));
+    };
+  });
+}
+
+async function pollJob(job, onProgress, intervalMs = 1000) {
+  for (;;) {
+    const res = await fetch(job.status_url);
+    if (!res.ok) throw new Error("Batch status unavailable");
+    const state = await res.json();
+    if (onProgress) onProgress(state);
+    if (state.status === "done" || state.status === "failed") return state;
+    await new Promise((r) => setTimeout(r, intervalMs));
+  }
 }
 
 export async function extractFromInput(file) {
@@ -395,7 +395,10 @@ function getPdfUrlFromQuery() {
 
       try {
         showBusy("Processing CSV…");
-        const resp = await processCsv(file);
+        const resp = await processCsv(file, (job) => {
+          if (job?.total != null)
+            showBusy(`Processing CSV… ${job.processed ?? 0}/${job.total}`);
+        });
 
         if (batchInitial) batchInitial.classList.add("hidden");
         if (batchResults) batchResults.classList.remove("hidden");
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+FULL_PAGES = 5
+
+
+@pytest.fixture
+def full_template_pdf(tmp_path, monkeypatch):
+    """
+    Seed PAGE_CACHE_DIR with a FULL_PAGES-page stand-in for the full template PDF (page 3 =
+    static/pdf/reference_template.pdf, the others blank) so the PDF-only backends run
+    without LibreOffice. Returns the cached path.
+    """
+    pypdf = pytest.importorskip("pypdf")
+    from config import AppConfig
+    from services.pdf_splice import REPLACE_INDEX, template_pdf
+
+    monkeypatch.setattr(AppConfig, "PAGE_CACHE_DIR", str(tmp_path / "pages"))
+    page = pypdf.PdfReader(os.path.join(ROOT, "static", "pdf", "reference_template.pdf")).pages[0]
+
+    def export(pdf_path):
+        writer = pypdf.PdfWriter()
+        for i in range(FULL_PAGES):
+            if i == REPLACE_INDEX:
+                writer.add_page(page)
+            else:
+                writer.add_blank_page(float(page.mediabox.width), float(page.mediabox.height))
+        with open(pdf_path, "wb") as fh:
+            writer.write(fh)
+
+    return template_pdf(AppConfig.FULL_DOCX_TEMPLATE_PATH, "ooxml", export)
@@ -0,0 +1,57 @@
+"""Batch rows rendered on the process pool are cached (and counted) by the parent."""
+
+import io
+import os
+import types
+
+import pytest
+
+pytest.importorskip("pypdf")
+
+from config import AppConfig
+from services import csv_batch, output_cache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE = os.path.join(ROOT, "Batch_Sample_CSV__preview_.csv")
+
+
+@pytest.fixture
+def cache_env(tmp_path, monkeypatch, full_template_pdf):
+    monkeypatch.setattr(AppConfig, "OUTPUT_DIR", str(tmp_path / "output"))
+    monkeypatch.setattr(AppConfig, "OUTPUT_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(AppConfig, "OUTPUT_CACHE_ENABLED", True)
+    monkeypatch.setattr(AppConfig, "FILL_BACKEND", "stamp")
+    monkeypatch.setattr(AppConfig, "BATCH_DEDUP", False)
+    monkeypatch.setattr(output_cache, "_INDEX", None)
+    monkeypatch.setattr(output_cache, "_TOTAL", 0)
+    monkeypatch.setattr(output_cache, "_STATS", dict.fromkeys(output_cache._STATS, 0))
+    return tmp_path
+
+
+def _run(batch: str, tmp_path, workers=2):
+    upload = types.SimpleNamespace(stream=io.BytesIO(open(SAMPLE, "rb").read()))
+    out_dir = str(tmp_path / "output" / batch)
+    return csv_batch.process_csv(upload, AppConfig.DOCX_TEMPLATE_PATH, AppConfig.FULL_DOCX_TEMPLATE_PATH,
+                                 out_dir, export_docx=False, workers=workers)
+
+
+def test_process_pool_rows_are_cached_in_parent(cache_env):
+    first = _run("b1", cache_env)
+    rendered = len(first["items"])
+    assert rendered >= 2 and not first["failed"]
+    stats = output_cache.stats()
+    assert stats["stores"] == stats["misses"] and stats["entries"] > 0 and stats["bytes"] > 0
+
+    second = _run("b2", cache_env)
+    assert len(second["items"]) == rendered
+    assert output_cache.stats()["hits"] == rendered
+
+
+def test_byte_cap_holds_across_workers(cache_env, monkeypatch):
+    monkeypatch.setattr(AppConfig, "OUTPUT_CACHE_MAX_BYTES", 1)
+    _run("b1", cache_env, workers=3)
+    stats = output_cache.stats()
+    assert stats["entries"] == 1 and stats["evictions"] == stats["stores"] - 1
+
+    on_disk = [n for _d, _s, names in os.walk(AppConfig.OUTPUT_CACHE_DIR) for n in names if n.endswith(".pdf")]
+    assert len(on_disk) == 1
@@ -0,0 +1,66 @@
+"""Batch CSV schema: missing columns read as empty cells, placeholder levels as no level."""
+
+import io
+import os
+
+from services.csv_ingest import load_table
+from services.tick_grid import CSV_COLUMNS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _table(text: str):
+    return load_table(io.BytesIO(text.encode("utf-8")))
+
+
+def test_missing_device_columns_are_unticked():
+    table = _table("company_id,project_level_dropdown,device_r16_c2\nAcme,L2,true\nBeta,L1,\n")
+    assert table.errors == {}
+    assert table.levels == ["L2", "L1"]
+    assert table.ticks[0].glyph_ids() == ["glyph_r16_c2"]
+    assert table.ticks[1].bits == 0
+
+
+def test_only_company_column():
+    table = _table("company_id,notes\nAcme,x\n,y\n")
+    assert table.errors == {}
+    assert table.company_ids == ["Acme", "row_2"]
+    assert table.levels == [None, None]
+    assert all(t.bits == 0 for t in table.ticks)
+
+
+def test_placeholder_level_is_no_level():
+    table = _table("company_id,project_level_dropdown\nAcme,Choose an item.\nBeta,L9\n")
+    assert table.errors == {}
+    assert table.levels == [None, None]
+
+
+def test_invalid_boolean_still_rejects_the_row():
+    header = ",".join(("company_id", "project_level_dropdown") + CSV_COLUMNS)
+    row = ",".join(["Acme", "L2", "maybe"] + [""] * (len(CSV_COLUMNS) - 1))
+    table = _table(f"{header}\n{row}\n")
+    assert list(table.errors) == [1]
+    assert "not a boolean" in table.errors[1][0]
+
+
+def test_short_row_reads_missing_cells_as_empty():
+    table = _table("company_id,project_level_dropdown,device_r16_c2,device_r16_c3\nAcme,L2,true\n")
+    assert table.errors == {}
+    assert table.ticks[0].glyph_ids() == ["glyph_r16_c2"]
+
+
+def test_long_row_is_rejected():
+    table = _table("company_id,project_level_dropdown\nAcme,L2,extra\n")
+    assert table.errors == {1: ["expected 2 fields, got 3"]}
+
+
+def test_now2_sample_loads():
+    with open(os.path.join(ROOT, "docs", "now2.csv"), "rb") as fh:
+        table = load_table(fh)
+    assert table.rows == 1 and table.errors == {}
+    assert table.company_ids == ["cmp_001"] and table.levels == ["L2"]
+    assert table.ticks[0].glyph_ids() == ["glyph_r16_c2", "glyph_r16_c5", "glyph_r17_c5",
+                                          "glyph_r18_c5", "glyph_r19_c3", "glyph_r20_c2"]
+    fields = table.fields[0]
+    assert fields["capa_associated_select_one_combo"] == "Yes"
+    assert fields["insert_other_chk"] is True and "epd_ecr_gepc_chk_2" not in fields
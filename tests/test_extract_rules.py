@@ -0,0 +1,69 @@
+"""Rule-based /extract: region lines read per label, unsure phrasing left to the LLM."""
+
+import zipfile
+
+import pytest
+
+pytest.importorskip("lxml")
+
+from config import AppConfig
+from services.extract_rules import extract
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+HEADING = object()          # next paragraph is a heading (ends the regions section)
+
+
+def _docx(tmp_path, *paragraphs) -> str:
+    body, heading = [], False
+    for p in paragraphs:
+        if p is HEADING:
+            heading = True
+            continue
+        ppr = '<w:pPr><w:outlineLvl w:val="1"/></w:pPr>' if heading else ""
+        body.append(f'<w:p>{ppr}<w:r><w:t xml:space="preserve">{p}</w:t></w:r></w:p>')
+        heading = False
+    body = "".join(body)
+    path = tmp_path / "input.docx"
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("word/document.xml", f'<w:document xmlns:w="{W_NS}"><w:body>{body}</w:body></w:document>')
+    return str(path)
+
+
+def _regions(tmp_path, line: str):
+    result = extract(_docx(tmp_path, f"Region(s) in scope: {line}", HEADING, "1.0 Medical: Yes"))
+    in_scope = {label for label, on in result["regions"].items() if on}
+    return in_scope, result["detail"]["regions"]
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("N. America: Yes, EMEA: No, LATAM: No, APAC: No", {"N. America"}),
+    ("North America (Yes); EMEA (No)", {"N. America"}),
+    ("EMEA: No, APAC: Yes", {"APAC"}),
+    ("not EMEA, only N. America", {"N. America"}),
+    ("N. America, excluding EMEA", {"N. America"}),
+])
+def test_unsure_multi_label_lines_go_to_the_llm(tmp_path, line, expected):
+    in_scope, confidence = _regions(tmp_path, line)
+    assert in_scope == expected
+    assert confidence < AppConfig.EXTRACT_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("North America, EMEA", {"N. America", "EMEA"}),
+    ("EMEA | No", set()),
+    ("Yes - APAC", {"APAC"}),
+    ("None", set()),
+])
+def test_clear_lines_keep_full_confidence(tmp_path, line, expected):
+    in_scope, confidence = _regions(tmp_path, line)
+    assert in_scope == expected
+    assert confidence >= AppConfig.EXTRACT_MIN_CONFIDENCE
+
+
+def test_yes_no_rows_of_a_section(tmp_path):
+    result = extract(_docx(tmp_path, "Region(s) in scope:", "N. America: Yes", "EMEA: No", "APAC: Yes",
+                           HEADING, "1.0 Medical: No"))
+    assert result["regions"] == {"N. America": True, "EMEA": False, "LATAM": False, "APAC": True}
+    assert result["medical"] is False and result["confidence"] == 1.0
@@ -0,0 +1,66 @@
+"""Tag fields through the OOXML FillPlan: page 3 tags come from the single page."""
+
+import io
+import os
+import zipfile
+
+import pytest
+
+pytest.importorskip("lxml")
+from lxml import etree
+
+from services.docx_splice import extract_page
+from services.form_fields import FIELD_COLUMNS, FieldTagError
+from services.ooxml_fill import W_NS, compile_fill_plan
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TAGGED = os.path.join(ROOT, "Downloaded_Documents", "refernce_template_tagged_02.docx")
+SINGLE = os.path.join(ROOT, "reference_template.docx")
+
+
+def _w(tag):
+    return f"{{{W_NS}}}{tag}"
+
+
+def _control_text(docx: bytes, tag: str) -> str:
+    with zipfile.ZipFile(io.BytesIO(docx)) as z:
+        root = etree.fromstring(z.read("word/document.xml"))
+    for tag_el in root.iter(_w("tag")):
+        if tag_el.get(_w("val")) == tag:
+            sdt = tag_el.getparent().getparent()
+            return "".join(sdt.find(_w("sdtContent")).itertext())
+    raise AssertionError(f"no control tagged {tag!r} in the output")
+
+
+@pytest.fixture(scope="module")
+def tagged_page(tmp_path_factory):
+    path = tmp_path_factory.mktemp("templates") / "page3.docx"
+    path.write_bytes(extract_page(TAGGED, 3))
+    return str(path)
+
+
+def test_page3_field_column_reads_back(tagged_page):
+    tag, _label = FIELD_COLUMNS["capa_associated_combo"]
+    plan = compile_fill_plan(tagged_page, TAGGED)
+    docx = plan.render({"fields": {tag: "Yes"}})
+    assert _control_text(docx, tag) == "Yes"
+
+
+def test_page3_checkbox_field_reads_back(tagged_page):
+    tag, _label = FIELD_COLUMNS["top_epd_epd"]
+    plan = compile_fill_plan(tagged_page, TAGGED)
+    assert _control_text(plan.render({}), tag) == "☐"
+    assert _control_text(plan.render({"fields": {tag: True}}), tag) == "☒"
+
+
+def test_tag_lost_to_the_page3_splice_raises():
+    plan = compile_fill_plan(SINGLE, TAGGED)
+    tag, _label = FIELD_COLUMNS["capa_associated_combo"]
+    with pytest.raises(FieldTagError, match="page 3"):
+        plan.render({"fields": {tag: "Yes"}})
+
+
+def test_unknown_tag_raises(tagged_page):
+    plan = compile_fill_plan(tagged_page, TAGGED)
+    with pytest.raises(FieldTagError, match="no_such_tag"):
+        plan.render({"fields": {"no_such_tag": "x"}})
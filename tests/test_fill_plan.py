@@ -0,0 +1,90 @@
+"""OOXML FillPlan: rendered DOCX bytes read back through the template's own cells."""
+
+import io
+import os
+import zipfile
+
+import pytest
+
+pytest.importorskip("lxml")
+from lxml import etree
+
+from services.docx_splice import page_spans
+from services.ooxml_fill import (CHECKED_CHAR, DROPDOWN_CELL, GLYPH_CELLS, NS, UNCHECKED_CHAR, W_NS, _cell,
+                                 compile_fill_plan)
+from services.tick_grid import TickGrid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SINGLE = os.path.join(ROOT, "reference_template.docx")
+FULL = os.path.join(ROOT, "reference_template_full.docx")
+
+
+def _device_table(docx: bytes, page: int):
+    """First table of page `page` (1 for a single-page document, 3 for the spliced page)."""
+    with zipfile.ZipFile(io.BytesIO(docx)) as z:
+        body = etree.fromstring(z.read("word/document.xml")).find("w:body", NS)
+    start, end = page_spans(body)[page - 1]
+    return next(tbl for el in list(body)[start:end] for tbl in el.iter(f"{{{W_NS}}}tbl"))
+
+
+def _boxes(docx: bytes, page: int = 1) -> dict:
+    """glyph id -> box character of that device cell."""
+    tbl = _device_table(docx, page)
+    out = {}
+    for row, col in GLYPH_CELLS:
+        text = "".join(_cell(tbl, row, col).itertext())
+        out[f"glyph_r{row}_c{col}"] = next(ch for ch in text if ch in (CHECKED_CHAR, UNCHECKED_CHAR, "☑"))
+    return out
+
+
+def test_unticked_clears_a_box_the_template_has_ticked(tmp_path):
+    ticked = tmp_path / "all_ticked.docx"
+    ticked.write_bytes(compile_fill_plan(SINGLE, None).render({"ticks": TickGrid((1 << 20) - 1)}))
+    assert set(_boxes(ticked.read_bytes()).values()) == {CHECKED_CHAR}
+
+    plan = compile_fill_plan(str(ticked), None)
+    boxes = _boxes(plan.render({"ticks": {"glyph_r17_c3": True, "glyph_r16_c2": False}}))
+    assert boxes.pop("glyph_r17_c3") == CHECKED_CHAR
+    assert set(boxes.values()) == {UNCHECKED_CHAR}
+    assert set(_boxes(plan.render({})).values()) == {UNCHECKED_CHAR}
+
+
+def _parts(docx: bytes) -> dict:
+    with zipfile.ZipFile(io.BytesIO(docx)) as z:
+        assert z.testzip() is None
+        return {name: z.read(name) for name in z.namelist()}
+
+
+def _dropdown_text(docx: bytes, page: int = 1) -> str:
+    tc = _cell(_device_table(docx, page), *DROPDOWN_CELL)
+    return "".join(tc.find(".//w:sdt/w:sdtContent", NS).itertext())
+
+
+@pytest.mark.parametrize("full", [None, FULL])
+def test_render_round_trip(full):
+    plan = compile_fill_plan(SINGLE, full)
+    mapping = {"projectLevel": "L2", "ticks": {"glyph_r16_c2": True, "glyph_r20_c5": True}}
+    docx = plan.render(mapping)
+    parts = _parts(docx)
+    assert parts["word/document.xml"] == plan.render_xml(mapping)
+
+    with zipfile.ZipFile(full or SINGLE) as z:
+        template = {name: z.read(name) for name in z.namelist()}
+    assert set(parts) >= set(template)
+    if full is None:
+        assert {n: b for n, b in parts.items() if n != "word/document.xml"} == \
+               {n: b for n, b in template.items() if n != "word/document.xml"}
+
+    page = 1 if full is None else 3
+    assert _dropdown_text(docx, page) == "L2"
+    boxes = _boxes(docx, page)
+    assert {g for g, ch in boxes.items() if ch == CHECKED_CHAR} == {"glyph_r16_c2", "glyph_r20_c5"}
+
+
+def test_empty_mapping_renders_the_template_state():
+    plan = compile_fill_plan(SINGLE, None)
+    with open(SINGLE, "rb") as fh:
+        template = fh.read()
+    docx = plan.render({})
+    assert _boxes(docx) == _boxes(template)
+    assert _dropdown_text(docx) == _dropdown_text(template)
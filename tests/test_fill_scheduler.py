@@ -0,0 +1,70 @@
+"""FillScheduler: interactive exports first, bulk slots round-robin over batches."""
+
+import threading
+import time
+
+import pytest
+
+from services.fill_scheduler import FillScheduler
+
+
+def _queue(scheduler, lane, key, order):
+    def run():
+        ticket = scheduler.acquire(lane, key)
+        order.append(key if lane == "bulk" else lane)
+        scheduler.release(ticket)
+
+    depth = scheduler.stats()["lanes"][lane]["queued"]
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    deadline = time.monotonic() + 5
+    while scheduler.stats()["lanes"][lane]["queued"] == depth:     # queued before the next one
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+    return t
+
+
+def test_batches_take_turns_and_interactive_goes_first():
+    scheduler = FillScheduler(slots=1)
+    held = scheduler.acquire("bulk", "A")
+    order = []
+    threads = [_queue(scheduler, "bulk", "A", order) for _ in range(3)]
+    threads += [_queue(scheduler, "bulk", "B", order) for _ in range(2)]
+    threads.append(_queue(scheduler, "interactive", None, order))
+
+    scheduler.release(held)
+    for t in threads:
+        t.join(5)
+    assert order == ["interactive", "A", "B", "A", "B", "A"]
+
+    stats = scheduler.stats()
+    assert stats["busy"] == 0 and stats["batches_waiting"] == 0
+    assert stats["lanes"]["bulk"]["granted"] == 6 and stats["lanes"]["interactive"]["granted"] == 1
+
+
+def test_slots_bound_concurrency():
+    scheduler = FillScheduler(slots=2)
+    lock = threading.Lock()
+    running = peak = 0
+
+    def row(key):
+        nonlocal running, peak
+        with scheduler.slot("bulk", key):
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+
+    threads = [threading.Thread(target=row, args=(i % 3,)) for i in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert peak == 2 and scheduler.stats()["busy"] == 0
+
+
+def test_unknown_lane():
+    with pytest.raises(ValueError):
+        FillScheduler().acquire("urgent")
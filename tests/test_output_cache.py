@@ -0,0 +1,42 @@
+"""Cache hits are hard links into the output folder; re-rendering there must not touch the entry."""
+
+import pytest
+
+pytest.importorskip("pypdf")
+
+from config import AppConfig
+from services import fill_backend, output_cache
+
+A = {"projectLevel": "L1", "ticks": {"glyph_r16_c2": True}}
+B = {"projectLevel": "L3", "ticks": {"glyph_r20_c5": True}}
+
+
+@pytest.fixture
+def cache_env(tmp_path, monkeypatch, full_template_pdf):
+    monkeypatch.setattr(AppConfig, "OUTPUT_DIR", str(tmp_path / "output"))
+    monkeypatch.setattr(AppConfig, "OUTPUT_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(AppConfig, "OUTPUT_CACHE_ENABLED", True)
+    monkeypatch.setattr(output_cache, "_INDEX", None)
+    monkeypatch.setattr(output_cache, "_TOTAL", 0)
+    monkeypatch.setattr(output_cache, "_STATS", dict.fromkeys(output_cache._STATS, 0))
+    return tmp_path / "output"
+
+
+def _fill(out_dir, mapping):
+    result = fill_backend.fill_and_export(AppConfig.DOCX_TEMPLATE_PATH, AppConfig.FULL_DOCX_TEMPLATE_PATH,
+                                          mapping, str(out_dir), "row", export_docx=False, backend="stamp")
+    return (out_dir / "row.pdf").read_bytes(), result
+
+
+def test_rerender_over_cache_hit_keeps_entry(cache_env):
+    rendered_a, _ = _fill(cache_env / "first", A)
+    _fill(cache_env / "hit", A)                 # hit: hit/row.pdf is a link to the entry of A
+    assert output_cache.stats()["hits"] == 1
+
+    rendered_b, _ = _fill(cache_env / "hit", B)     # miss: rendered over the linked file
+    assert rendered_b != rendered_a
+
+    again, _ = _fill(cache_env / "third", A)
+    assert output_cache.stats()["hits"] == 2
+    assert again == rendered_a
+    assert (cache_env / "first" / "row.pdf").read_bytes() == rendered_a
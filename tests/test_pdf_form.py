@@ -0,0 +1,47 @@
+"""The AcroForm backend writes the whole document with the fields on page 3."""
+
+import io
+
+import pytest
+
+pypdf = pytest.importorskip("pypdf")
+
+from conftest import FULL_PAGES
+from services import pdf_form
+from services.form_fields import FieldTagError
+from services.pdf_splice import REPLACE_INDEX
+
+MAPPING = {"projectLevel": "L2", "ticks": {"glyph_r16_c2": True}}
+
+
+def _fill(tmp_path, mapping):
+    return pdf_form.fill_and_export("", pdf_form.AppConfig.FULL_DOCX_TEMPLATE_PATH, mapping,
+                                    str(tmp_path / "out"), "row", export_docx=False)
+
+
+@pytest.mark.parametrize("flatten", [False, True])
+def test_output_is_the_full_document(tmp_path, monkeypatch, full_template_pdf, flatten):
+    monkeypatch.setattr(pdf_form.AppConfig, "FORM_PDF_PATH", "")
+    monkeypatch.setattr(pdf_form.AppConfig, "FORM_FLATTEN", flatten)
+    _fill(tmp_path, MAPPING)
+    data = (tmp_path / "out" / "row.pdf").read_bytes()
+    assert data.startswith(open(full_template_pdf, "rb").read())
+
+    reader = pypdf.PdfReader(io.BytesIO(data))
+    assert len(reader.pages) == FULL_PAGES
+    assert all("/Annots" not in reader.pages[i] for i in range(FULL_PAGES) if i != REPLACE_INDEX)
+    if flatten:
+        annots = reader.pages[REPLACE_INDEX].get("/Annots") or []
+        assert not any(a.get_object().get("/Subtype") == "/Widget" for a in annots)
+        assert not reader.get_fields()
+    else:
+        values = {k: str(v.get("/V")) for k, v in reader.get_fields().items()}
+        assert values["glyph_r16_c2"] != "/Off" and values["glyph_r16_c3"] == "/Off"
+        assert values["cc_2"] == "L2"
+
+
+def test_tag_fields_are_rejected(tmp_path, monkeypatch, full_template_pdf):
+    monkeypatch.setattr(pdf_form.AppConfig, "FORM_PDF_PATH", "")
+    with pytest.raises(FieldTagError, match="capa_associated_select_one_combo"):
+        _fill(tmp_path, {**MAPPING, "fields": {"capa_associated_select_one_combo": "Yes"}})
+    assert not (tmp_path / "out" / "row.pdf").exists()
@@ -0,0 +1,38 @@
+"""The stamp backend writes the whole document with page 3 stamped."""
+
+import io
+
+import pytest
+
+pypdf = pytest.importorskip("pypdf")
+
+from conftest import FULL_PAGES
+from services import pdf_stamp
+from services.form_fields import FieldTagError
+from services.pdf_splice import REPLACE_INDEX
+
+MAPPING = {"projectLevel": "L2", "ticks": {"glyph_r16_c2": True}}
+
+
+def _fill(tmp_path, mapping):
+    return pdf_stamp.fill_and_export("", pdf_stamp.AppConfig.FULL_DOCX_TEMPLATE_PATH, mapping,
+                                     str(tmp_path / "out"), "row", export_docx=False)
+
+
+def test_output_is_the_full_document(tmp_path, full_template_pdf):
+    _fill(tmp_path, MAPPING)
+    data = (tmp_path / "out" / "row.pdf").read_bytes()
+    base = open(full_template_pdf, "rb").read()
+    assert data.startswith(base)                # incremental update: every base byte reused
+
+    reader = pypdf.PdfReader(io.BytesIO(data))
+    assert len(reader.pages) == FULL_PAGES
+    stamped = reader.pages[REPLACE_INDEX].get_contents().get_data()
+    assert b"/FStampZ" in stamped and b"(L2) Tj" in stamped
+    assert all(reader.pages[i].get_contents() is None for i in range(FULL_PAGES) if i != REPLACE_INDEX)
+
+
+def test_tag_fields_are_rejected(tmp_path, full_template_pdf):
+    with pytest.raises(FieldTagError, match="capa_associated_select_one_combo"):
+        _fill(tmp_path, {**MAPPING, "fields": {"capa_associated_select_one_combo": "Yes"}})
+    assert not (tmp_path / "out" / "row.pdf").exists()
@@ -0,0 +1,16 @@
+"""_new_app_01 runs its own copies of shared services; they must not drift from services/."""
+
+import filecmp
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHARED = ("docx_splice", "extract_rules", "llm_cache", "soffice_pool", "word_pool")
+
+
+@pytest.mark.parametrize("module", SHARED)
+def test_sub_app_copy_matches(module):
+    ours = os.path.join(ROOT, "services", f"{module}.py")
+    theirs = os.path.join(ROOT, "_new_app_01", "services", f"{module}.py")
+    assert filecmp.cmp(ours, theirs, shallow=False), f"copy {module}.py into _new_app_01/services"
@@ -0,0 +1,23 @@
+"""Streamed ZIPs: entries go through an unseekable sink, so none may be STORED."""
+
+import io
+import os
+import zipfile
+
+from services.storage import stream_zip
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PDF = os.path.join(ROOT, "static", "pdf", "reference_template.pdf")
+
+
+def test_stream_zip_deflates_every_entry(tmp_path):
+    note = tmp_path / "notes.txt"
+    note.write_text("row 1\n" * 100)
+    data = b"".join(stream_zip([PDF, str(note), str(tmp_path / "missing.pdf")], chunk_size=4096))
+
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        assert z.namelist() == ["reference_template.pdf", "notes.txt"]
+        assert all(i.compress_type == zipfile.ZIP_DEFLATED for i in z.infolist())
+        assert z.testzip() is None
+        assert z.read("reference_template.pdf") == open(PDF, "rb").read()
+        assert z.read("notes.txt") == note.read_bytes()
@@ -0,0 +1,124 @@
+"""WordPool on the in-process FakeWordBackend: timeouts, kills and recycling."""
+
+import tempfile
+import threading
+import time
+
+import pytest
+
+from services import word_pool
+from services.word_pool import FakeWordBackend, WordCallTimeout, WordPool, pinned_document
+
+
+class _UnkillableBackend(FakeWordBackend):
+    """Like Word before its process id is known: the kill cannot go through."""
+
+    def kill(self, app, pid):
+        return False
+
+
+def _hang(app, release: threading.Event):
+    release.wait(5)
+    return app.id
+
+
+def _wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize("backend_cls, counter", [(FakeWordBackend, "killed"), (_UnkillableBackend, "kill_failed")])
+def test_timeout_counts_only_real_kills(backend_cls, counter):
+    pool = WordPool(backend_cls(), size=1, timeout=0.1, watch_interval=0.02)
+    release = threading.Event()
+    try:
+        with pytest.raises(WordCallTimeout):
+            pool.run(_hang, release)
+        _wait_for(lambda: pool.stats[counter] == 1)
+        assert pool.stats["timeouts"] == 1
+        other = "kill_failed" if counter == "killed" else "killed"
+        assert pool.stats[other] == 0
+        # the replacement worker takes the next job on a fresh instance
+        assert pool.run(lambda app: app.alive, timeout=5)
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def _save_pinned(app, template, out_path):
+    doc = pinned_document(template)
+    doc.changes += 1
+    doc.FullName = out_path          # what SaveAs2 does to the open document
+    return doc
+
+
+def test_pinned_template_is_rebound_only_when_idle(tmp_path, monkeypatch):
+    monkeypatch.setattr(word_pool, "_IDLE_RELEASE", 0.1)
+    template = tmp_path / "template.docx"
+    template.write_bytes(b"docx")
+    backend = FakeWordBackend()
+    pool = WordPool(backend, size=1, watch_interval=0)
+    try:
+        futures = [pool.submit(_save_pinned, str(template), str(tmp_path / f"out{i}.docx")) for i in range(5)]
+        docs = [f.result(timeout=5) for f in futures]
+        assert len({id(d) for d in docs}) == 1 and backend.opened == 1
+        # back-to-back jobs move the document with their own save: no extra rebind
+        assert pool.stats["templates_rebound"] == 0
+
+        _wait_for(lambda: pool.stats["templates_rebound"] == 1)
+        assert docs[0].FullName.startswith(tempfile.gettempdir())
+        assert docs[0].changes == 0
+    finally:
+        pool.shutdown()
+
+
+def test_warm_up_and_recycling_after_max_jobs():
+    backend = FakeWordBackend()
+    pool = WordPool(backend, size=1, max_jobs=3, watch_interval=0)
+    try:
+        apps = [pool.run(lambda app: (app.id, app.warmed)) for _ in range(7)]
+        assert all(warmed for _id, warmed in apps)
+        ids = [app_id for app_id, _ in apps]
+        assert ids[:3] == [ids[0]] * 3 and ids[3:6] == [ids[3]] * 3 and ids[6] != ids[3] != ids[0]
+        assert pool.stats["recycled"] == 2 and backend.started == 3 and backend.stopped == 2
+    finally:
+        pool.shutdown()
+
+
+def test_dead_instance_is_replaced_and_failures_do_not_stop_the_worker():
+    pool = WordPool(FakeWordBackend(), size=1, watch_interval=0)
+
+    def crash(app):
+        app.alive = False
+        raise RuntimeError("Word went away")
+
+    try:
+        first = pool.run(lambda app: app.id)
+        with pytest.raises(RuntimeError, match="went away"):
+            pool.run(crash)
+        assert pool.run(lambda app: app.id) != first
+        assert pool.stats["failed"] == 1 and pool.stats["unhealthy"] == 1 and pool.stats["jobs"] == 3
+    finally:
+        pool.shutdown()
+
+
+def test_pinned_template_reverted_between_jobs(tmp_path):
+    template = tmp_path / "template.docx"
+    template.write_bytes(b"docx")
+    backend = FakeWordBackend()
+    pool = WordPool(backend, size=1, watch_interval=0)
+
+    def edit(app):
+        doc = pinned_document(str(template))
+        seen = doc.changes
+        doc.changes += 3
+        return seen
+
+    try:
+        assert [pool.run(edit) for _ in range(3)] == [0, 0, 0]
+        assert backend.opened == 1
+        assert pool.stats["templates_opened"] == 1 and pool.stats["templates_reused"] == 2
+    finally:
+        pool.shutdown()